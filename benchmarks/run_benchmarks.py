@@ -0,0 +1,226 @@
+"""
+Stage-level benchmarks for the sales pipeline
+
+    python -m benchmarks.run_benchmarks --rows 1e4 --rows 1e5
+    python -m benchmarks.run_benchmarks --rows 1e5 --update-baseline
+
+Each stage is timed on its own and its peak traced allocation is recorded;
+results are compared with benchmarks/baseline.json and any stage whose
+throughput drops (or memory grows) by more than --tolerance is flagged
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_data import write_synthetic_file, stub_catalog
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    parse_transactions,
+    validate_and_filter,
+    parse_and_validate,
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products,
+    build_sales_snapshot
+)
+from utils.api_handler import create_product_mapping, enrich_sales_data
+from utils.report_generator import generate_sales_report
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def pipeline_stages(data_file, report_file):
+    """
+    Returns: list of (stage name, function(context) -> output, input key)
+    Every stage reads what it needs from the context, so each one can be
+    timed without re-running the stages before it
+    """
+
+    mapping = create_product_mapping(stub_catalog())
+
+    return [
+        ("read_sales_data", lambda c: read_sales_data(data_file), None),
+        ("parse_transactions", lambda c: parse_transactions(c["read_sales_data"]), "read_sales_data"),
+        ("validate_and_filter", lambda c: validate_and_filter(c["parse_transactions"])[0], "parse_transactions"),
+        # The fused stage every pipeline path runs instead of the two above
+        ("parse_and_validate", lambda c: parse_and_validate(c["read_sales_data"])[0], "read_sales_data"),
+        ("calculate_total_revenue", lambda c: calculate_total_revenue(c["validate_and_filter"]), "validate_and_filter"),
+        ("region_wise_sales", lambda c: region_wise_sales(c["validate_and_filter"]), "validate_and_filter"),
+        ("top_selling_products", lambda c: top_selling_products(c["validate_and_filter"]), "validate_and_filter"),
+        ("customer_analysis", lambda c: customer_analysis(c["validate_and_filter"]), "validate_and_filter"),
+        ("daily_sales_trend", lambda c: daily_sales_trend(c["validate_and_filter"]), "validate_and_filter"),
+        ("find_peak_sales_day", lambda c: find_peak_sales_day(c["validate_and_filter"]), "validate_and_filter"),
+        ("low_performing_products", lambda c: low_performing_products(c["validate_and_filter"]), "validate_and_filter"),
+        ("build_sales_snapshot", lambda c: build_sales_snapshot(c["validate_and_filter"]), "validate_and_filter"),
+        ("enrich_sales_data", lambda c: enrich_sales_data(c["validate_and_filter"], mapping), "validate_and_filter"),
+        ("generate_sales_report", lambda c: generate_sales_report(
+            c["validate_and_filter"], c["enrich_sales_data"], report_file,
+            snapshot=c["build_sales_snapshot"]), "validate_and_filter"),
+    ]
+
+
+def _run_quietly(fn, context):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(context)
+
+
+def measure_stage(fn, context, trace_memory=True, repeat=3):
+    """
+    Returns: (output, best seconds of `repeat` runs, peak traced bytes or None)
+    The timed runs are separate from the traced run, since tracemalloc
+    itself slows allocation-heavy code down
+    """
+
+    seconds = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        output = _run_quietly(fn, context)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        _run_quietly(fn, context)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return output, seconds, peak
+
+
+def run_benchmarks(rows, seed=42, trace_memory=True, repeat=3, workdir=None):
+    """
+    Returns: {stage name: {seconds, rows, rows_per_sec, peak_bytes}}
+    """
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        data_file = os.path.join(tmp, "sales_data.txt")
+        report_file = os.path.join(tmp, "sales_report.txt")
+        write_synthetic_file(data_file, rows, seed)
+
+        context = {}
+        results = {}
+        for name, fn, input_key in pipeline_stages(data_file, report_file):
+            output, seconds, peak = measure_stage(fn, context, trace_memory, repeat)
+            context[name] = output
+
+            count = rows if input_key is None else len(context[input_key])
+            results[name] = {
+                "seconds": round(seconds, 6),
+                "rows": count,
+                "rows_per_sec": round(count / seconds, 1) if seconds else None,
+                "peak_bytes": peak
+            }
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Returns: list of human-readable regression messages
+    """
+
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+
+        if previous["rows_per_sec"] and current["rows_per_sec"] is not None and \
+                current["rows_per_sec"] < previous["rows_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {current['rows_per_sec']:,.0f} rows/s vs baseline {previous['rows_per_sec']:,.0f}"
+            )
+        if previous.get("peak_bytes") and current["peak_bytes"] is not None and \
+                current["peak_bytes"] > previous["peak_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak {current['peak_bytes']:,} bytes vs baseline {previous['peak_bytes']:,}"
+            )
+    return regressions
+
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def print_results(rows, results):
+    print(f"\n{rows:,} rows")
+    print(f"{'Stage':<26} {'Seconds':>10} {'Rows/sec':>14} {'Peak MB':>10}")
+    for name, r in results.items():
+        peak = f"{r['peak_bytes'] / 1e6:,.1f}" if r["peak_bytes"] is not None else "-"
+        rate = f"{r['rows_per_sec']:,.0f}" if r["rows_per_sec"] else "-"
+        print(f"{name:<26} {r['seconds']:>10.4f} {rate:>14} {peak:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the sales pipeline")
+    parser.add_argument("--rows", type=float, action="append",
+                        help="dataset size, may be repeated (default 1e4)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="allowed fractional slowdown / memory growth before flagging")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(r) for r in (args.rows or [1e4])]
+    baseline = load_baseline(args.baseline)
+    report = {"python": platform.python_version(), "machine": platform.machine(), "sizes": {}}
+    regressions = []
+
+    for rows in sizes:
+        results = run_benchmarks(rows, args.seed, not args.no_memory, args.repeat)
+        report["sizes"][str(rows)] = results
+        print_results(rows, results)
+        regressions += [f"[{rows:,} rows] {msg}" for msg in
+                        compare_with_baseline(results, baseline.get("sizes", {}).get(str(rows), {}), args.tolerance)]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        baseline.setdefault("sizes", {}).update(report["sizes"])
+        baseline["python"] = report["python"]
+        baseline["machine"] = report["machine"]
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+
+    if regressions:
+        print("\nREGRESSIONS")
+        for msg in regressions:
+            print("-", msg)
+        return 1
+
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
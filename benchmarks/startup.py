@@ -0,0 +1,149 @@
+"""
+Start-up time budget for the command line
+
+    python main.py bench startup
+    python -m benchmarks.startup --repeat 10 --rows 1e4
+
+Each command runs as a fresh process against a small synthetic file.
+The best wall time minus a bare interpreter start-up is compared with the
+command's budget, and the commands that must stay off the network are
+checked for the HTTP stack in sys.modules. Exits 1 if anything is over
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_data import write_synthetic_file
+
+
+# Milliseconds on top of a bare `python -c pass` at the default 1,000 rows
+# (importing requests alone costs about 80 ms)
+STARTUP_BUDGET_MS = {
+    "help": 40,
+    "analyze": 60,
+    "report": 60,
+    "ingest": 60
+}
+HTTP_MODULES = ("requests", "urllib3")
+OFFLINE_COMMANDS = ("help", "analyze", "report", "ingest")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs one command the way `python main.py ...` does, then reports which
+# HTTP modules ended up imported
+_PROBE = (
+    "import sys, main\n"
+    "try:\n"
+    "    main.main(main.parse_args(sys.argv[1:]))\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    f"print('HTTP_MODULES', *[m for m in {HTTP_MODULES!r} if m in sys.modules], file=sys.stderr)\n"
+)
+
+
+def startup_commands(workdir, data_file):
+    """
+    Returns: {name: main.py arguments}, writing only inside workdir
+    """
+
+    return {
+        "help": ["--help"],
+        "analyze": ["analyze", "--data-file", data_file],
+        "report": ["report", "--data-file", data_file, "--output", os.path.join(workdir, "report.txt")],
+        "ingest": ["ingest", "--data-file", data_file, "--checkpoint", os.path.join(workdir, "checkpoint.json")]
+    }
+
+
+def time_process(args, repeat):
+    """
+    Returns: (best wall seconds, stderr of the last run)
+    """
+
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable] + args, cwd=REPO_ROOT, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result.stderr
+
+
+def loaded_http_modules(stderr):
+    for line in stderr.splitlines():
+        if line.startswith("HTTP_MODULES"):
+            return line.split()[1:]
+    return []
+
+
+def measure_startup(rows=1000, repeat=5, seed=42):
+    """
+    Returns: (interpreter seconds, {name: {'seconds', 'overhead_ms', 'budget_ms', 'http_modules'}})
+    """
+
+    interpreter, _ = time_process(["-c", "pass"], repeat)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_file = os.path.join(workdir, "sales_data.txt")
+        write_synthetic_file(data_file, rows, seed)
+
+        for name, args in startup_commands(workdir, data_file).items():
+            seconds, stderr = time_process(["-c", _PROBE] + args, repeat)
+            results[name] = {
+                "seconds": round(seconds, 4),
+                "overhead_ms": round((seconds - interpreter) * 1000, 1),
+                "budget_ms": STARTUP_BUDGET_MS[name],
+                "http_modules": loaded_http_modules(stderr)
+            }
+
+    return interpreter, results
+
+
+def check_budget(results):
+    """
+    Returns: list of budget violations (empty when everything is within budget)
+    """
+
+    problems = []
+    for name, r in results.items():
+        if r["overhead_ms"] > r["budget_ms"]:
+            problems.append(f"{name}: {r['overhead_ms']} ms over the interpreter, budget {r['budget_ms']} ms")
+        if name in OFFLINE_COMMANDS and r["http_modules"]:
+            problems.append(f"{name}: imported {', '.join(r['http_modules'])}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the command-line start-up time budget")
+    parser.add_argument("--rows", type=float, default=1000, help="rows in the synthetic input")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command (best is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    interpreter, results = measure_startup(int(args.rows), args.repeat, args.seed)
+
+    print(f"Interpreter start-up: {interpreter * 1000:.1f} ms")
+    print(f"{'Command':<10} {'Total ms':>10} {'Overhead ms':>12} {'Budget ms':>10}  HTTP stack")
+    for name, r in results.items():
+        http = ", ".join(r["http_modules"]) or "-"
+        print(f"{name:<10} {r['seconds'] * 1000:>10.1f} {r['overhead_ms']:>12.1f} {r['budget_ms']:>10}  {http}")
+
+    problems = check_budget(results)
+    if problems:
+        print("\nOVER BUDGET")
+        for msg in problems:
+            print("-", msg)
+        return 1
+
+    print("\nAll commands within the start-up budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
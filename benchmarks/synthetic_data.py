@@ -0,0 +1,106 @@
+import argparse
+import random
+
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+# Catalog and dirty-data rates taken from data/sales_data.txt
+PRODUCTS = [
+    ("P101", "Laptop", ["Premium"], 45000, 85000),
+    ("P102", "Mouse", ["Wireless"], 250, 1100),
+    ("P103", "Keyboard", ["Mechanical"], 1200, 3000),
+    ("P104", "Monitor", ["LED"], 9000, 18000),
+    ("P105", "Webcam", ["HD"], 2500, 4500),
+    ("P106", "Headphones", [], 1500, 7000),
+    ("P107", "USB Cable", [], 150, 500),
+    ("P108", "External Hard Drive", ["1TB"], 3000, 9000),
+    ("P109", "Wireless Mouse", ["Gaming"], 500, 1800),
+    ("P110", "Laptop Charger", ["65W"], 1200, 3000),
+]
+REGIONS = ["North", "South", "East", "West"]
+
+DIRTY_RATES = {
+    "name_comma": 0.25,       # Laptop,Premium
+    "price_separator": 0.06,  # 1,916
+    "zero_quantity": 0.025,
+    "negative_price": 0.025,
+    "bad_transaction_id": 0.04,
+    "bad_product_id": 0.01,
+    "bad_customer_id": 0.01,
+    "missing_customer": 0.025,
+    "missing_region": 0.0125,
+}
+
+
+def synthetic_lines(rows, seed=42, customers=None, days=30, rates=DIRTY_RATES):
+    """
+    Yields: pipe-delimited sales lines (no header) with the same kinds of
+    dirty values as the real file, reproducible for a given seed
+    """
+
+    rng = random.Random(seed)
+    random_ = rng.random
+    customers = customers or max(25, rows // 40)
+
+    for i in range(rows):
+        pid, name, variants, low, high = PRODUCTS[rng.randrange(len(PRODUCTS))]
+
+        if variants and random_() < rates["name_comma"]:
+            name = f"{name},{rng.choice(variants)}"
+
+        qty = 0 if random_() < rates["zero_quantity"] else rng.randint(1, 10)
+        price = rng.randint(low, high)
+        if random_() < rates["negative_price"]:
+            price = -price
+        price = f"{price:,}" if random_() < rates["price_separator"] else str(price)
+
+        tid = f"T{i:03d}"
+        if random_() < rates["bad_transaction_id"]:
+            tid = f"X{rng.randint(1, 999)}"
+        if random_() < rates["bad_product_id"]:
+            pid = "Q" + pid[1:]
+
+        cid = f"C{rng.randint(1, customers):03d}"
+        if random_() < rates["missing_customer"]:
+            cid = ""
+        elif random_() < rates["bad_customer_id"]:
+            cid = "D" + cid[1:]
+
+        region = "" if random_() < rates["missing_region"] else rng.choice(REGIONS)
+        date = f"2024-12-{rng.randint(1, days):02d}" if days <= 31 else \
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+        yield f"{tid}|{date}|{pid}|{name}|{qty}|{price}|{cid}|{region}"
+
+
+def write_synthetic_file(filename, rows, seed=42, **kwargs):
+    """
+    Streams a synthetic sales file to disk (memory does not grow with rows)
+    """
+
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(HEADER + "\n")
+        for line in synthetic_lines(rows, seed, **kwargs):
+            f.write(line + "\n")
+
+
+def stub_catalog():
+    """
+    Returns: product list in the API's shape whose IDs match the numeric
+    part of the synthetic ProductIDs (101-110)
+    """
+
+    return [
+        {"id": int(pid[1:]), "title": name, "category": "electronics", "brand": "Stub",
+         "price": high, "rating": 4.5}
+        for pid, name, _, _, high in PRODUCTS
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic sales_data file")
+    parser.add_argument("filename")
+    parser.add_argument("--rows", type=float, default=1e4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write_synthetic_file(args.filename, int(args.rows), args.seed)
@@ -2,93 +2,377 @@
 # SALES ANALYTICS SYSTEM - MAIN
 # ================================
 
-from utils.file_handler import read_sales_data
-from utils.data_processor import (
-    parse_transactions,
-    validate_and_filter,
-    calculate_total_revenue,
-    region_wise_sales,
-    top_selling_products,
-    customer_analysis,
-    daily_sales_trend,
-    find_peak_sales_day,
-    low_performing_products
-)
-from utils.api_handler import (
-    fetch_all_products,
-    create_product_mapping,
-    enrich_sales_data
+# Only argument parsing happens at import time; each command imports the
+# subsystems it needs, so `analyze` and `report` never load the HTTP stack
+# and `--help` stays instant (see `python main.py bench startup`)
+
+import argparse
+import sys
+
+from utils.defaults import (
+    CHECKPOINT_FILE, ANALYTICS_CHECKPOINT_FILE, CUBE_FILE, METRICS_FILE, CACHE_DIR, LIVE_SNAPSHOT_FILE,
+    STORE_FILE,
+    REPORT_FORMATS, ENRICHED_FORMATS, PROFILE_MODES,
+    TOP_MODES, DEFAULT_TOP_ERROR, DISTINCT_MODES, DEFAULT_PRECISION, DEDUP_MEMORY_LIMIT,
+    CATALOG_TTL, PRODUCT_MATCH_MODES, DEFAULT_PRODUCT_MATCH, NAME_MATCH_THRESHOLD,
+    CACHE_LIMIT, EMIT_INTERVAL, POLL_INTERVAL, ROLLING_PATTERN
 )
-from utils.report_generator import generate_sales_report
 
 DATA_FILE = "data/sales_data.txt"
+ENRICHED_FILE = "data/enriched_sales_data"
+REPORT_FILE = "output/sales_report.txt"
+
+
+def main(options=None):
+    if options is None:
+        options = parse_args([])
+    return COMMANDS[options.command](options)
+
+
+# ---------- COMMANDS ----------
+
+def run_command(options):
+    """
+    The full ten-step pipeline (also what `python main.py` with no command runs)
+    """
+
+    if options.serve:
+        return serve_command(options)
+
+    from utils.pipeline import run_pipeline
+    run_pipeline(options)
+
+
+def ingest_command(options):
+    """
+    Parses, validates and aggregates the rows appended since the last
+    checkpoint and saves the checkpoint; no catalog and no report
+    """
+
+    from utils.incremental import open_increment, commit_increment
+    from utils.ingest import sales_state_options, filters, save_sales_cube
+
+    run = open_increment(options.data_file, options.checkpoint, *filters(options),
+                         state_options=sales_state_options(options))
+    commit_increment(run, options.checkpoint)
+    summary = run['summary']
+
+    print(f"✓ Mode: {run['mode']} ({run['reason']}), read bytes {run['start']}-{run['end']}")
+    print(f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']}")
+    print(f"✓ Checkpoint saved to: {options.checkpoint}")
+    save_sales_cube(run['state'], options)
+
+
+def analyze_command(options):
+    """
+    Prints the analytics (the report without its API enrichment section)
+    With --checkpoint only rows appended since the last ingest are read;
+    with --store the appended rows are loaded into the SQLite store and the
+    analytics are queried from it, with the filters run as indexed SQL
+    """
+
+    from utils.data_processor import finalize_sales_state
+    from utils.report_generator import build_report_model
+    from utils.report_renderers import REPORT_RENDERERS
+    from utils.ingest import aggregate_input, save_sales_cube
+
+    if options.store:
+        from utils.sales_store import SalesStore
+        with SalesStore(options.store) as store:
+            store.load_file(options.data_file)
+            snapshot = store.build_sales_snapshot(region=options.region, min_amount=options.min_amount,
+                                                  max_amount=options.max_amount)
+        sys.stdout.write(REPORT_RENDERERS[options.format](build_report_model(snapshot, None)))
+        return
+
+    if options.checkpoint:
+        from utils.incremental import open_increment, commit_increment
+        from utils.ingest import sales_state_options, filters
+        run = open_increment(options.data_file, options.checkpoint, *filters(options),
+                             state_options=sales_state_options(options))
+        state = commit_increment(run, options.checkpoint)['state']
+    else:
+        state = aggregate_input(options)[0]
+
+    model = build_report_model(finalize_sales_state(state), None)
+    sys.stdout.write(REPORT_RENDERERS[options.format](model))
+    if options.cube:
+        save_sales_cube(state, options)
+
+
+def enrich_command(options):
+    """
+    Loads the product catalog and writes the enriched sales file
+    """
+
+    from utils.data_processor import iter_parse_and_validate, iter_unique_transactions
+    from utils.file_handler import iter_sales_files
+    from utils.api_handler import load_product_mapping, stream_enriched_data
+    from utils.enriched_format import ENRICHED_EXTENSIONS
+    from utils.ingest import filters, dedup_index, product_resolver
+
+    product_mapping, source = load_product_mapping(offline=options.offline, ttl=options.catalog_ttl)
+    print(f"✓ Fetched {len(product_mapping)} products (source: {source})")
+
+    enriched_file = options.enriched_file + ENRICHED_EXTENSIONS[options.enriched_format]
+    with dedup_index(options) as index:
+        valid = iter_parse_and_validate(iter_sales_files(options.data_file), *filters(options))
+        enrichment = stream_enriched_data(iter_unique_transactions(valid, index),
+                                          product_mapping, enriched_file, options.enriched_format,
+                                          resolver=product_resolver(options, product_mapping))
+
+    success_rate = (enrichment['enriched_count'] / enrichment['total']) * 100 if enrichment['total'] else 0
+    print(f"✓ Enriched {enrichment['enriched_count']}/{enrichment['total']} transactions ({success_rate:.1f}%)")
+    print(f"✓ Saved to: {enriched_file}")
+
+
+def report_command(options):
+    """
+    Writes the report in one pass over the input; the enrichment section
+    comes from the cached product catalog (left out if there is none), so
+    the API is never called
+    """
+
+    from utils.api_handler import load_product_mapping
+    from utils.data_processor import finalize_sales_state
+    from utils.report_generator import generate_sales_report
+    from utils.ingest import aggregate_input, save_sales_cube
+
+    product_mapping, source = load_product_mapping(offline=True)
+    state, summary, enrichment = aggregate_input(options, product_mapping if source != "none" else None)
+
+    paths = generate_sales_report(None, None, options.output, snapshot=finalize_sales_state(state),
+                                  enrichment=enrichment, formats=options.report_formats)
+    print(f"✓ Report saved to: {', '.join(paths.values())}")
+    save_sales_cube(state, options)
+
+
+def bench_command(options):
+    """
+    `bench startup ...` checks the startup-time budget; anything else is
+    passed to the stage benchmarks
+    """
+
+    if options.args[:1] == ["startup"]:
+        from benchmarks.startup import main as bench_main
+        return bench_main(options.args[1:])
+
+    from benchmarks.run_benchmarks import main as bench_main
+    return bench_main(options.args)
+
+
+def follow_command(options):
+    """
+    Tails the sales file (or a directory of rolling files with --watch) and
+    keeps last-hour, last-24-hour and today aggregates up to date
+    """
+
+    from utils.live_tail import follow
+    from utils.ingest import sales_state_options, filters
+
+    follow(options.watch or options.data_file, options.pattern, *filters(options),
+           state_options=sales_state_options(options), interval=options.interval,
+           poll_interval=options.poll, snapshot_file=options.snapshot_file,
+           from_start=options.from_start, duration=options.duration)
+
+
+def serve_command(options):
+    from utils.analytics_service import serve
+    from utils.ingest import sales_state_options, product_match_options, filters
+
+    serve(options.data_file, options.host, options.port, options.socket, options.offline,
+          options.catalog_ttl, sales_state_options(options), product_match_options(options),
+          filters(options))
+
+
+COMMANDS = {
+    "run": run_command,
+    "ingest": ingest_command,
+    "analyze": analyze_command,
+    "enrich": enrich_command,
+    "report": report_command,
+    "bench": bench_command,
+    "serve": serve_command,
+    "follow": follow_command
+}
+
+
+# ---------- ARGUMENTS ----------
+
+def _input_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--data-file", default=DATA_FILE,
+                        help="pipe-delimited sales file, directory of *.txt shards, or glob of shards")
+    parser.add_argument("--region", default=None, help="keep only this region")
+    parser.add_argument("--min-amount", type=float, default=None, help="keep transactions of at least this amount")
+    parser.add_argument("--max-amount", type=float, default=None, help="keep transactions of at most this amount")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false",
+                        help="keep rows whose TransactionID was already seen")
+    parser.add_argument("--dedup-limit", type=int, default=DEDUP_MEMORY_LIMIT,
+                        help="TransactionIDs held in memory before the index spills to disk")
+    return parser
+
+
+def _analysis_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--top-mode", choices=TOP_MODES, default="exact",
+                        help="rank top products/customers exactly or with fixed-memory sketches")
+    parser.add_argument("--top-error", type=float, default=DEFAULT_TOP_ERROR,
+                        help="approximate mode: max overestimate as a fraction of the total")
+    parser.add_argument("--distinct-mode", choices=DISTINCT_MODES, default="exact",
+                        help="count unique customers with exact sets or HyperLogLog sketches")
+    parser.add_argument("--distinct-precision", type=int, default=DEFAULT_PRECISION,
+                        help="approximate mode: sketch size is 2**precision bytes")
+    parser.add_argument("--cube", nargs="?", const=CUBE_FILE, default=None,
+                        help="also build the region x date x product x customer rollup cube and save it")
+    return parser
+
+
+def _catalog_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--offline", action="store_true",
+                        help="use the cached product catalog and never call the API")
+    parser.add_argument("--catalog-ttl", type=float, default=CATALOG_TTL,
+                        help="seconds before the cached product catalog is revalidated")
+    return parser
+
+
+def _match_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--product-match", choices=PRODUCT_MATCH_MODES, default=DEFAULT_PRODUCT_MATCH,
+                        help="match rows to the catalog by product name (default), by the digits "
+                             "of ProductID, or by name falling back to the ID (auto)")
+    parser.add_argument("--match-threshold", type=float, default=NAME_MATCH_THRESHOLD,
+                        help="lowest name similarity (0-1) accepted as a match")
+    return parser
+
+
+def _enriched_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--enriched-file", default=ENRICHED_FILE,
+                        help="enriched output path without extension")
+    parser.add_argument("--enriched-format", choices=ENRICHED_FORMATS, default="text",
+                        help="file format for the enriched sales data")
+    return parser
+
+
+def _report_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--output", default=REPORT_FILE,
+                        help="text report path; other formats swap the extension")
+    parser.add_argument("--report-format", dest="report_formats", action="append",
+                        choices=REPORT_FORMATS,
+                        help="report format; repeat for several (default: text)")
+    return parser
+
+
+def _serve_options(legacy=False):
+    parser = argparse.ArgumentParser(add_help=False)
+    if legacy:
+        parser.add_argument("--serve", action="store_true",
+                            help="load once and answer analytics queries over HTTP until interrupted")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--socket", default=None, help="listen on this Unix socket instead")
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Sales Analytics System",
+        epilog="Without a command the full pipeline runs (same as `run`)"
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    inputs, analysis, catalog = _input_options(), _analysis_options(), _catalog_options()
+    match, enriched, report = _match_options(), _enriched_options(), _report_options()
+
+    run = commands.add_parser("run", parents=[inputs, analysis, catalog, match, enriched, report,
+                                              _serve_options(True)],
+                              help="full pipeline: ingest, analyze, enrich and report")
+    run.add_argument("--stream", action="store_true",
+                     help="stream rows through the pipeline in constant memory")
+    run.add_argument("--workers", type=int, default=None,
+                     help="parse and validate on this many processes")
+    run.add_argument("--mmap", action="store_true",
+                     help="with --stream, read the file through a memory map")
+    run.add_argument("--incremental", action="store_true",
+                     help="only process rows appended since the last checkpoint")
+    run.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                     help="checkpoint file used by --incremental")
+    run.add_argument("--no-cache", dest="cache", action="store_false",
+                     help="recompute every stage instead of reusing cached results")
+    run.add_argument("--cache-dir", default=CACHE_DIR, help="where cached stage results are kept")
+    run.add_argument("--cache-limit", type=float, default=CACHE_LIMIT / (1024 * 1024),
+                     help="MB of cached results kept before the least recently used are evicted")
+    run.add_argument("--metrics", default=METRICS_FILE,
+                     help="where to write per-stage timing and memory metrics (JSON)")
+    run.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES, default=None,
+                     help="capture a cProfile (default) or tracemalloc profile per stage")
+
+    ingest = commands.add_parser("ingest", parents=[inputs, analysis],
+                                 help="fold newly appended rows into the checkpoint")
+    ingest.add_argument("--checkpoint", default=ANALYTICS_CHECKPOINT_FILE, help="checkpoint file to update")
+
+    analyze = commands.add_parser("analyze", parents=[inputs, analysis],
+                                  help="print the analytics without touching the API")
+    analyze.add_argument("--format", choices=REPORT_FORMATS, default="text",
+                         help="output format written to stdout")
+    source = analyze.add_mutually_exclusive_group()
+    source.add_argument("--checkpoint", nargs="?", const=ANALYTICS_CHECKPOINT_FILE, default=None,
+                        help="read only rows appended since this checkpoint (and update it)")
+    source.add_argument("--store", nargs="?", const=STORE_FILE, default=None,
+                        help="load appended rows into this SQLite store and query exact analytics from it "
+                             "(no --cube)")
+
+    commands.add_parser("enrich", parents=[inputs, catalog, match, enriched],
+                        help="fetch the product catalog and write the enriched file")
+
+    commands.add_parser("report", parents=[inputs, analysis, match, report],
+                        help="write the report using the cached catalog only")
+
+    commands.add_parser("bench", add_help=False,
+                        help="stage benchmarks, or `bench startup` for the startup-time budget")
+
+    commands.add_parser("serve", parents=[inputs, analysis, catalog, match, _serve_options()],
+                        help="answer analytics queries over HTTP until interrupted")
+
+    follow = commands.add_parser("follow", parents=[inputs, analysis],
+                                 help="tail the input and keep sliding-window aggregates live")
+    follow.add_argument("--watch", default=None,
+                        help="follow every file matching --pattern in this directory instead")
+    follow.add_argument("--pattern", default=ROLLING_PATTERN, help="rolling file name pattern for --watch")
+    follow.add_argument("--interval", type=float, default=EMIT_INTERVAL,
+                        help="seconds between snapshots")
+    follow.add_argument("--poll", type=float, default=POLL_INTERVAL,
+                        help="seconds between checks for new rows")
+    follow.add_argument("--snapshot-file", default=LIVE_SNAPSHOT_FILE,
+                        help="where each snapshot is written (JSON)")
+    follow.add_argument("--from-start", action="store_true",
+                        help="also count the rows already in the files")
+    follow.add_argument("--duration", type=float, default=None,
+                        help="stop after this many seconds")
+
+    return parser
+
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        # Plain `python main.py [options]` keeps running the full pipeline
+        argv = ["run"] + argv
 
+    parser = build_parser()
+    options, extra = parser.parse_known_args(argv)
+    if options.command == "bench":
+        options.args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
 
-def main():
-    try:
-        print("=" * 40)
-        print("SALES ANALYTICS SYSTEM")
-        print("=" * 40)
-
-        # 1. Read sales data
-        print("[1/10] Reading sales data...")
-        raw_data = read_sales_data(DATA_FILE)
-        print(f"✓ Successfully read {len(raw_data)} transactions")
-
-        # 2. Parse and clean data
-        print("[2/10] Parsing and cleaning data...")
-        parsed_transactions = parse_transactions(raw_data)
-        print(f"✓ Parsed {len(parsed_transactions)} records")
-
-        # 3. Display filter options
-        print("[3/10] Filter Options Available:")
-        valid_transactions, invalid_count, summary = validate_and_filter(parsed_transactions)
-
-        # 4. Validation summary
-        print("[4/10] Validating transactions...")
-        print(f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']}")
-
-        # 5. Perform data analysis
-        print("[5/10] Analyzing sales data...")
-        total_revenue = calculate_total_revenue(valid_transactions)
-        region_sales = region_wise_sales(valid_transactions)
-        top_products = top_selling_products(valid_transactions)
-        customers = customer_analysis(valid_transactions)
-        daily_trend = daily_sales_trend(valid_transactions)
-        peak_day = find_peak_sales_day(valid_transactions)
-        low_products = low_performing_products(valid_transactions)
-        print("✓ Analysis complete")
-
-        # 6. Fetch API data
-        print("[6/10] Fetching product data from API...")
-        api_products = fetch_all_products()
-        product_mapping = create_product_mapping(api_products)
-        print(f"✓ Fetched {len(api_products)} products")
-
-        # 7. Enrich sales data
-        print("[7/10] Enriching sales data...")
-        enriched_transactions = enrich_sales_data(valid_transactions, product_mapping)
-        enriched_count = sum(1 for t in enriched_transactions if t["API_Match"])
-        success_rate = (enriched_count / len(valid_transactions)) * 100
-        print(f"✓ Enriched {enriched_count}/{len(valid_transactions)} transactions ({success_rate:.1f}%)")
-
-        # 8. Save enriched data (handled inside enrich function)
-        print("[8/10] Saving enriched data...")
-        print("✓ Saved to: data/enriched_sales_data.txt")
-
-        # 9. Generate report
-        print("[9/10] Generating report...")
-        generate_sales_report(valid_transactions, enriched_transactions)
-        print("✓ Report saved to: output/sales_report.txt")
-
-        # 10. Complete
-        print("[10/10] Process Complete!")
-        print("=" * 40)
-
-    except Exception as e:
-        print("❌ An error occurred during execution")
-        print("Error details:", str(e))
+    if hasattr(options, "report_formats"):
+        options.report_formats = options.report_formats or ["text"]
+    return options
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main(parse_args()))
@@ -0,0 +1,362 @@
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from utils.file_handler import iter_sales_data, complete_lines_end
+from utils.data_processor import (
+    iter_parse_and_validate,
+    new_validation_summary,
+    finish_validation_summary,
+    new_sales_state,
+    update_sales_state,
+    finalize_sales_state,
+    customer_view
+)
+from utils.api_handler import (
+    load_product_mapping,
+    ProductResolver,
+    EnrichedTransaction,
+    new_enrichment_summary,
+    count_enrichment,
+    CATALOG_TTL
+)
+from utils.incremental import file_fingerprint
+from utils.sales_cube import CUBE_DIMENSIONS
+from utils.heavy_hitters import top_n
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class AnalyticsService:
+    """
+    Keeps the aggregate state, rollup cube, finished snapshot and product
+    catalog of one sales file in memory and answers queries from them
+    reload() reads only the complete lines appended since the last load
+    (or everything again if the file was truncated or rewritten)
+    filters: (region, min_amount, max_amount) applied to every row, so all
+    answers describe the filtered transactions only
+    """
+
+    def __init__(self, filename, offline=False, catalog_ttl=CATALOG_TTL, state_options=None, match_options=None,
+                 filters=None):
+        self.filename = filename
+        self.filters = filters or (None, None, None)
+        self.state_options = dict(state_options or {}, cube=True)
+        self.lock = threading.Lock()
+        self.product_mapping, self.catalog_source = load_product_mapping(offline=offline, ttl=catalog_ttl)
+        self.resolver = ProductResolver(self.product_mapping, **(match_options or {}))
+        self.responses = {}
+        self._reset()
+        self.reload()
+
+    def _reset(self):
+        self.state = new_sales_state(**self.state_options)
+        self.summary = new_validation_summary()
+        self.enrichment = new_enrichment_summary()
+        # ProductID -> the catalog entry its rows resolved to (by name)
+        self.products = {}
+        self.offset = 0
+        self.fingerprint = None
+
+    # ---------- LOADING ----------
+
+    def reload(self):
+        """
+        Folds newly appended rows into the in-memory aggregates
+        Returns: dict describing what was read
+        Raises: FileNotFoundError if the file was removed; the last load
+        keeps being served
+        """
+
+        started = time.perf_counter()
+
+        with self.lock:
+            mode, reason = 'incremental', 'appended rows only'
+            if self.offset == 0:
+                mode, reason = 'full', 'initial load'
+            elif os.path.getsize(self.filename) < self.offset:
+                mode, reason = 'full', 'file truncated'
+            elif file_fingerprint(self.filename, self.offset) != self.fingerprint:
+                mode, reason = 'full', 'file rotated or rewritten'
+            if mode == 'full':
+                self._reset()
+
+            start = self.offset
+            end = complete_lines_end(self.filename, start)
+            resolve = self.resolver.resolve_transaction
+            rows = 0
+
+            lines = iter_sales_data(self.filename, start, end)
+            for t in iter_parse_and_validate(lines, *self.filters, self.summary):
+                update_sales_state(self.state, t)
+                info = self.products[t['ProductID']] = resolve(t)
+                count_enrichment(self.enrichment, EnrichedTransaction(t, info))
+                rows += 1
+
+            self.offset = end
+            self.fingerprint = file_fingerprint(self.filename, end)
+            if mode == 'full' or end > start:
+                self.snapshot = finalize_sales_state(self.state)
+                self.validation = finish_validation_summary(self.summary)
+                self.enrichment_snapshot = {
+                    'total': self.enrichment['total'],
+                    'enriched_count': self.enrichment['enriched_count'],
+                    'failed_products': sorted(self.enrichment['failed_products'])
+                }
+                self.responses = {}
+
+        return {
+            'mode': mode,
+            'reason': reason,
+            'bytes': end - start,
+            'rows_added': rows,
+            'total_rows': self.snapshot['transaction_count'],
+            'seconds': round(time.perf_counter() - started, 6)
+        }
+
+    # ---------- QUERIES ----------
+
+    def query(self, path, params):
+        """
+        Returns: JSON-ready answer for one endpoint
+        Raises: KeyError for unknown endpoints or keys, ValueError for bad parameters
+        """
+
+        route = ROUTES.get(path)
+        if route is None:
+            raise KeyError(f"unknown endpoint: {path}")
+        return route(self, params)
+
+    def _summary(self, params):
+        s = self.snapshot
+        return {
+            'total_revenue': s['total_revenue'],
+            'transaction_count': s['transaction_count'],
+            'avg_order_value': s['avg_order_value'],
+            'date_range': s['date_range'],
+            'peak_day': s['peak_day'],
+            'validation': self.validation,
+            'catalog_source': self.catalog_source
+        }
+
+    def _regions(self, params):
+        return self.snapshot['region_sales']
+
+    def _top_products(self, params):
+        n = _int_param(params, 'n', 5)
+        if n <= len(self.snapshot['top_products']):
+            return self.snapshot['top_products'][:n]
+        return top_n(((p, d['qty'], d['rev']) for p, d in self.snapshot['product_totals'].items()),
+                     n, key=lambda x: x[1])
+
+    def _customer_view(self):
+        # Every customer ranked by spend is only built for the first query
+        # that needs more than the top customers, once per reload
+        with self.lock:
+            snapshot = self.snapshot
+            if snapshot['customers'] is None:
+                snapshot['customers'] = customer_view(self.state['customers'])
+            return snapshot['customers']
+
+    def _customers(self, params):
+        customer_id = _param(params, 'id')
+        if customer_id is not None:
+            customers = self._customer_view()
+            if customer_id not in customers:
+                raise KeyError(f"unknown customer: {customer_id}")
+            return customers[customer_id]
+
+        n = _int_param(params, 'n', 5)
+        if n <= len(self.snapshot['top_customers']):
+            return self.snapshot['top_customers'][:n]
+        customers = self._customer_view()
+        if not customers:
+            return self.snapshot['top_customers'][:n]
+        return list(customers.items())[:n]
+
+    def _daily(self, params):
+        start = _param(params, 'start')
+        end = _param(params, 'end')
+        return {
+            d: info for d, info in self.snapshot['daily_trend'].items()
+            if (start is None or d >= start) and (end is None or d <= end)
+        }
+
+    def _enrichment(self, params):
+        return self.enrichment_snapshot
+
+    def _product(self, params):
+        product_id = _param(params, 'id')
+        if product_id is None:
+            raise ValueError("id is required")
+        name = _param(params, 'name')
+        if name is not None:
+            info = self.resolver.resolve(product_id, name)
+        else:
+            info = self.products.get(product_id)
+        if info is None:
+            raise KeyError(f"product not in catalog: {product_id}")
+        return info
+
+    def _cube(self, params):
+        by = params.get('by', [])
+        grain = _param(params, 'grain', 'all')
+        with self.lock:
+            result = self.state['cube'].query(by, grain, _cube_filters(params),
+                                              _param(params, 'start'), _param(params, 'end'))
+        return [
+            dict(zip(('period',) + tuple(by), key), **measures)
+            for key, measures in result.items()
+        ]
+
+    def _top(self, params):
+        dimension = _param(params, 'dimension', 'ProductID')
+        with self.lock:
+            result = self.state['cube'].top(
+                dimension, _int_param(params, 'n', 5), _param(params, 'measure', 'revenue'),
+                _cube_filters(params), _param(params, 'start'), _param(params, 'end')
+            )
+        return [dict(measures, **{dimension: value}) for value, measures in result]
+
+
+ROUTES = {
+    '/summary': AnalyticsService._summary,
+    '/regions': AnalyticsService._regions,
+    '/top-products': AnalyticsService._top_products,
+    '/customers': AnalyticsService._customers,
+    '/daily': AnalyticsService._daily,
+    '/enrichment': AnalyticsService._enrichment,
+    '/product': AnalyticsService._product,
+    '/cube': AnalyticsService._cube,
+    '/top': AnalyticsService._top
+}
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params, name, default):
+    try:
+        return int(_param(params, name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+def _cube_filters(params):
+    return {dim: params[dim] for dim in CUBE_DIMENSIONS if dim in params}
+
+
+# ---------- HTTP ----------
+
+class AnalyticsRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /<endpoint>?params answers from memory (responses are cached until
+    the next reload); POST /reload picks up appended rows
+    """
+
+    def do_GET(self):
+        service = self.server.service
+        # Keep the cache of the snapshot this request is answered from
+        responses = service.responses
+        body = responses.get(self.path)
+        if body is not None:
+            return self._send(200, body)
+
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            return self._send(200, b'{"status": "ok"}')
+
+        try:
+            payload = service.query(url.path, parse_qs(url.query))
+        except KeyError as e:
+            return self._send(404, _json({'error': str(e.args[0])}))
+        except ValueError as e:
+            return self._send(400, _json({'error': str(e)}))
+
+        body = _json(payload)
+        if url.path not in ('/cube', '/top'):
+            responses[self.path] = body
+        self._send(200, body)
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/reload':
+            return self._send(404, _json({'error': f"unknown endpoint: {self.path}"}))
+        try:
+            result = self.server.service.reload()
+        except FileNotFoundError:
+            return self._send(404, _json({'error': f"data file not found: {self.server.service.filename}"}))
+        self._send(200, _json(result))
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _json(payload):
+    return json.dumps(payload).encode("utf-8")
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """
+    Returns: a threaded HTTP server bound to host:port, or to a Unix socket
+    when socket_path is given
+    """
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, AnalyticsRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), AnalyticsRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(filename, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, offline=False,
+          catalog_ttl=CATALOG_TTL, state_options=None, match_options=None, filters=None):
+    """
+    Loads the data once and serves queries until interrupted
+    match_options: ProductResolver options (match, threshold)
+    filters: (region, min_amount, max_amount) for every row served
+    """
+
+    try:
+        service = AnalyticsService(filename, offline, catalog_ttl, state_options, match_options, filters)
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return
+    server = make_server(service, host, port, socket_path)
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    print(f"✓ Loaded {service.snapshot['transaction_count']} transactions; serving on {where}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -1,39 +1,148 @@
-import requests
+import json
+import math
+import os
+import random
+import re
+import time
+from bisect import bisect_left, bisect_right
+
+from utils.enriched_format import write_enriched
+from utils.defaults import CATALOG_TTL, PRODUCT_MATCH_MODES, DEFAULT_PRODUCT_MATCH, NAME_MATCH_THRESHOLD
+
+
+PRODUCTS_URL = "https://dummyjson.com/products"
+PAGE_SIZE = 100
+FETCH_WORKERS = 8
+CATALOG_CACHE_FILE = "data/product_catalog_cache.json"
+WORD_MATCH_THRESHOLD = 0.6
 
 
 # ---------------- Task 3.1 (a) ----------------
-def fetch_all_products():
+def fetch_all_products(url=PRODUCTS_URL, page_size=PAGE_SIZE, workers=FETCH_WORKERS):
     """
-    Fetches all products from DummyJSON API
+    Fetches all products from DummyJSON API (every page, not just the first)
     Returns: list of product dictionaries
     """
 
-    url = "https://dummyjson.com/products?limit=100"
+    # requests is imported only where the network is used, so the offline,
+    # analysis and reporting paths start without the HTTP stack
+    import requests
 
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        products = []
-        for p in data.get("products", []):
-            products.append({
-                "id": p.get("id"),
-                "title": p.get("title"),
-                "category": p.get("category"),
-                "brand": p.get("brand"),
-                "price": p.get("price"),
-                "rating": p.get("rating")
-            })
+        with make_session(workers) as session:
+            products = fetch_catalog_pages(session, url, page_size, workers)
 
         print(f"Fetched {len(products)} products from API")
         return products
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print("API connection failed:", e)
         return []
 
 
+def make_session(workers=FETCH_WORKERS):
+    """
+    Returns: a requests.Session whose connection pool fits `workers` threads
+    """
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_with_retry(session, url, params=None, headers=None, timeout=10, retries=4, backoff=0.5):
+    """
+    GET with exponential backoff and full jitter on connection errors,
+    timeouts, 429 and 5xx responses
+    Returns: the response (the caller checks its status)
+    """
+
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == retries:
+                response.raise_for_status()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == retries:
+                raise
+
+        time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+
+
+def fetch_catalog_pages(session, url=PRODUCTS_URL, page_size=PAGE_SIZE, workers=FETCH_WORKERS,
+                        timeout=10, retries=4, backoff=0.5, first_page=None):
+    """
+    Reads the total from the first page, then fetches the remaining pages
+    concurrently (at most `workers` in flight) over the shared session
+    Pages step by the number of products the first page held, since the
+    server may cap `limit` below page_size; a page that still comes back
+    short is completed with follow-up requests
+    first_page: already-fetched response body for skip=0, if any
+    Returns: list of product dictionaries in catalog order
+    Raises: requests.exceptions.RequestException if a page keeps failing
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch_page(skip):
+        response = get_with_retry(session, url, {"limit": page_size, "skip": skip},
+                                  timeout=timeout, retries=retries, backoff=backoff)
+        response.raise_for_status()
+        return response.json()
+
+    if first_page is None:
+        first_page = fetch_page(0)
+
+    products = parse_products(first_page)
+    total = first_page.get("total", len(products))
+    step = len(products)
+    skips = range(step, total, step) if step else []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for skip, page in zip(skips, pool.map(fetch_page, skips)):
+            items = parse_products(page)
+            expected = min(step, total - skip)
+            while 0 < len(items) < expected:
+                more = parse_products(fetch_page(skip + len(items)))
+                if not more:
+                    break
+                items.extend(more)
+            # A follow-up request may run into the next page
+            products.extend(items[:expected])
+
+    if len(products) != total:
+        print(f"Warning: fetched {len(products)} of {total} catalog products")
+
+    return products
+
+
+def parse_products(data):
+    """
+    Returns: list of product dictionaries from one API response body
+    """
+
+    products = []
+    for p in data.get("products", []):
+        products.append({
+            "id": p.get("id"),
+            "title": p.get("title"),
+            "category": p.get("category"),
+            "brand": p.get("brand"),
+            "price": p.get("price"),
+            "rating": p.get("rating")
+        })
+    return products
+
+
 # ---------------- Task 3.1 (b) ----------------
 def create_product_mapping(api_products):
     """
@@ -55,75 +164,513 @@ def create_product_mapping(api_products):
     return mapping
 
 
+# ---------------- CATALOG CACHE ----------------
+def load_product_mapping(cache_file=CATALOG_CACHE_FILE, ttl=CATALOG_TTL, offline=False,
+                         url=PRODUCTS_URL, timeout=10, page_size=PAGE_SIZE, workers=FETCH_WORKERS):
+    """
+    Returns the product mapping, going to the API only when the on-disk
+    cache is older than ttl seconds
+    - a stale cache is revalidated with If-None-Match / If-Modified-Since
+      on the first page
+    - if the API cannot be reached the stale cache is served
+    - offline=True never touches the network
+    Returns: (product mapping, source) where source is one of
+    'cache', 'revalidated', 'api', 'stale-cache' or 'none'
+    """
+
+    cache = read_catalog_cache(cache_file)
+
+    if offline:
+        if cache is None:
+            print("Offline mode: no cached product catalog available")
+            return {}, "none"
+        return cache["mapping"], "cache"
+
+    if cache is not None and cache["url"] == url and time.time() - cache["fetched_at"] < ttl:
+        return cache["mapping"], "cache"
+
+    headers = {}
+    if cache is not None and cache["url"] == url:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
+    import requests
+
+    try:
+        with make_session(workers) as session:
+            response = get_with_retry(session, url, {"limit": page_size, "skip": 0},
+                                      headers=headers, timeout=timeout)
+
+            if response.status_code == 304 and headers:
+                cache["fetched_at"] = time.time()
+                write_catalog_cache(cache_file, cache)
+                return cache["mapping"], "revalidated"
+
+            response.raise_for_status()
+            products = fetch_catalog_pages(session, url, page_size, workers, timeout,
+                                           first_page=response.json())
+            mapping = create_product_mapping(products)
+
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print("API connection failed:", e)
+        if cache is None:
+            return {}, "none"
+        print("Using cached product catalog")
+        return cache["mapping"], "stale-cache"
+
+    write_catalog_cache(cache_file, {
+        "url": url,
+        "fetched_at": time.time(),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "mapping": mapping
+    })
+    return mapping, "api"
+
+
+def read_catalog_cache(cache_file=CATALOG_CACHE_FILE):
+    """
+    Returns: the cache dict (mapping keys restored to ints), or None if
+    there is no usable cache file
+    """
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        cache["mapping"] = {int(pid): info for pid, info in cache["mapping"].items()}
+        return cache
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_catalog_cache(cache_file, cache):
+    """
+    Writes the cache atomically so a crash never leaves a half-written file
+    """
+
+    directory = os.path.dirname(cache_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, cache_file)
+
+
 # ---------------- Task 3.2 ----------------
-def enrich_sales_data(transactions, product_mapping):
+def product_key(product_id):
     """
-    Enriches transaction data with API product information
+    Extracts the numeric catalog ID: P101 -> 101
+    Returns: int, or None if the ID has no digits
+    """
+
+    digits = "".join(ch for ch in product_id if ch.isdigit())
+    return int(digits) if digits else None
+
+
+class ProductNameMatcher:
     """
+    Fuzzy lookup of product names against the catalog titles
+    A name and a title are compared as sets of lower-cased words, each
+    weighted by how rare it is in the catalog (so "Mouse Wireless" equals
+    "Wireless Mouse"), by weighted Jaccard similarity; the best title at
+    or above threshold wins. A word the catalog does not have stands for
+    its closest catalog word ("Headphone" -> "headphones", by character
+    trigrams), counted at that similarity
+    Prefix-filtered index: words are ranked rarest first, and each title
+    is only indexed under the rare words it cannot reach the threshold
+    without. Two word sets that reach it always share a word in both of
+    those prefixes, so a lookup only scores titles found under the prefix
+    of the name, and each posting list is sorted by title weight so the
+    titles too light or too heavy to reach it are cut off by bisection.
+    Every distinct name (and word) is matched once
+    """
+
+    def __init__(self, product_mapping, threshold=NAME_MATCH_THRESHOLD):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"match threshold must be above 0 and at most 1, got {threshold}")
+        self.product_mapping = product_mapping
+        self.threshold = threshold
+        self.ids = []
+        self.words = []
+        self.cache = {}
+        self.word_cache = {}
+
+        df = {}
+        for pid, info in product_mapping.items():
+            title = info.get("title") if info else None
+            words = frozenset(name_words(title)) if title else None
+            if not words:
+                continue
+            self.ids.append(pid)
+            self.words.append(words)
+            for w in words:
+                df[w] = df.get(w, 0) + 1
+
+        count = len(self.ids)
+        self.weights = {w: math.log(1 + count / n) for w, n in df.items()}
+        # A word no title has is as rare as it gets
+        self.unseen_weight = math.log(1 + count)
+
+        postings = {}
+        self.totals = []
+        for doc, words in enumerate(self.words):
+            ranked = self._rank({w: self.weights[w] for w in words})
+            total = sum(self.weights[w] for w in words)
+            self.totals.append(total)
+            # Each entry also carries the title's weight from that word on,
+            # the most it can share with a name whose rarest shared word it is
+            rest = total
+            for w in self._prefix(ranked, total):
+                postings.setdefault(w, []).append((total, doc, rest))
+                rest -= self.weights[w]
+        self.postings = {}
+        for w, docs in postings.items():
+            docs.sort()
+            self.postings[w] = tuple(list(column) for column in zip(*docs))
 
-    enriched = []
+        self.grams = {}
+        self.gram_counts = {}
+        for w in df:
+            grams = word_trigrams(w)
+            self.gram_counts[w] = len(grams)
+            for g in grams:
+                self.grams.setdefault(g, []).append(w)
 
-    for t in transactions:
-        new_t = t.copy()
+    @staticmethod
+    def _rank(weights):
+        # The one global order every prefix is taken in: rarest first
+        return sorted(weights, key=lambda w: (-weights[w], w)), weights
+
+    def _prefix(self, ranked, total, remaining=None):
+        # Words up to the point where the rest weighs less than
+        # threshold * total; a match must overlap by at least that much
+        order, weights = ranked
+        prefix = []
+        remaining = total if remaining is None else remaining
+        for w in order:
+            if remaining < self.threshold * total:
+                break
+            prefix.append(w)
+            remaining -= weights[w]
+        return prefix
+
+    def best(self, name):
+        """
+        Returns: (catalog id, score) of the closest title, or (None, 0.0)
+        when no title reaches the threshold
+        """
 
         try:
-            # Extract numeric ID: P101 -> 101
-            numeric_id = int("".join(filter(str.isdigit, t["ProductID"])))
-
-            if numeric_id in product_mapping:
-                api_info = product_mapping[numeric_id]
-                new_t["API_Category"] = api_info["category"]
-                new_t["API_Brand"] = api_info["brand"]
-                new_t["API_Rating"] = api_info["rating"]
-                new_t["API_Match"] = True
-            else:
-                new_t["API_Category"] = None
-                new_t["API_Brand"] = None
-                new_t["API_Rating"] = None
-                new_t["API_Match"] = False
-
-        except Exception:
-            new_t["API_Category"] = None
-            new_t["API_Brand"] = None
-            new_t["API_Rating"] = None
-            new_t["API_Match"] = False
-
-        enriched.append(new_t)
-
-    # Save to file
-    save_enriched_data(enriched)
+            return self.cache[name]
+        except KeyError:
+            pass
+
+        result = (None, 0.0)
+        words = name_words(name)
+        if words and self.ids:
+            result = self._search(words)
+        self.cache[name] = result
+        return result
+
+    def match(self, name):
+        """
+        Returns: the catalog entry for the closest title, or None
+        """
+
+        pid = self.best(name)[0]
+        return None if pid is None else self.product_mapping[pid]
+
+    def closest_word(self, word):
+        """
+        Returns: (catalog word, similarity) for a word, itself at 1.0 when
+        the catalog has it, or (None, 0.0) when nothing is close
+        """
+
+        if word in self.weights:
+            return word, 1.0
+        try:
+            return self.word_cache[word]
+        except KeyError:
+            pass
+
+        grams = word_trigrams(word)
+        shared = {}
+        for g in grams:
+            for w in self.grams.get(g, ()):
+                shared[w] = shared.get(w, 0) + 1
+
+        # Dice coefficient of the trigram sets
+        result = (None, 0.0)
+        for w, n in shared.items():
+            score = 2 * n / (len(grams) + self.gram_counts[w])
+            if score > result[1] or (score == result[1] and w < result[0]):
+                result = (w, score)
+        if result[1] < WORD_MATCH_THRESHOLD:
+            result = (None, 0.0)
+
+        self.word_cache[word] = result
+        return result
+
+    def _search(self, words):
+        weights = {}
+        similarity = {}
+        total = 0.0
+        for word in words:
+            match, sim = self.closest_word(word)
+            if match is None:
+                total += self.unseen_weight
+            elif sim > similarity.get(match, 0.0):
+                total += self.weights[match] - weights.get(match, 0.0)
+                weights[match] = self.weights[match]
+                similarity[match] = sim
+
+        t = self.threshold
+        ranked = self._rank(weights)
+        # Words no title has rank first and are in no title's prefix
+        reach = sum(weights.values())
+
+        best_pid, best_score = None, 0.0
+        ids, doc_words = self.ids, self.words
+        seen = set()
+        for w in self._prefix(ranked, total, reach):
+            doc_totals, docs, rests = self.postings.get(w, ((), (), ()))
+            # Only titles whose weight leaves the score a chance of beating
+            # the best so far, sharing at most the name's weight from w on
+            floor = max(t, best_score)
+            start = bisect_left(doc_totals, floor * total)
+            end = bisect_right(doc_totals, min(total / floor, reach * (1 + floor) / floor - total))
+            for doc_total, doc, rest in zip(doc_totals[start:end], docs[start:end], rests[start:end]):
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                # w is the rarest word they share, so nothing before it counts
+                bound = min(reach, rest)
+                if bound / (total + doc_total - bound) < max(t, best_score):
+                    continue
+                title = doc_words[doc]
+                overlap = 0.0
+                for v, sim in similarity.items():
+                    if v in title:
+                        overlap += weights[v] * sim
+                score = overlap / (total + doc_total - overlap)
+                pid = ids[doc]
+                if score > best_score or (score == best_score and best_pid is not None and pid < best_pid):
+                    best_pid, best_score = pid, score
+            reach -= weights[w]
+
+        if best_score < t:
+            return (None, 0.0)
+        return (best_pid, round(best_score, 4))
+
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def name_words(name):
+    """
+    Returns: list of the distinct lower-cased words of a product name
+    """
+
+    return list(dict.fromkeys(_WORD.findall(name.lower())))
+
+
+def word_trigrams(word):
+    """
+    Returns: set of the character trigrams of a word, padded so short
+    words still have some
+    """
+
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductResolver:
+    """
+    Resolves transactions to catalog entries
+    match: 'name' (the default) matches ProductName against the catalog
+    titles (ProductNameMatcher); 'id' joins the numeric part of ProductID
+    to the catalog ID (P101 -> 101), which only means something for data
+    numbered like the catalog; 'auto' tries the name and falls back to the ID
+    Each distinct ProductID / ProductName pair is resolved only once;
+    after that a row costs one dict lookup
+    """
+
+    def __init__(self, product_mapping, match=DEFAULT_PRODUCT_MATCH, threshold=NAME_MATCH_THRESHOLD):
+        if match not in PRODUCT_MATCH_MODES:
+            raise ValueError(f"Unknown product match mode: {match}")
+        self.product_mapping = product_mapping
+        self.match = match
+        self.matcher = None
+        if match != "id" and product_mapping:
+            self.matcher = ProductNameMatcher(product_mapping, threshold)
+        self.cache = {}
+
+    def resolve(self, product_id, product_name=None):
+        key = (product_id, product_name)
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+
+        info = None
+        if self.matcher is not None and product_name:
+            info = self.matcher.match(product_name)
+        if info is None and self.match != "name":
+            info = self.product_mapping.get(product_key(product_id))
+        self.cache[key] = info
+        return info
+
+    def resolve_transaction(self, t):
+        return self.resolve(t["ProductID"], t["ProductName"])
+
+
+API_FIELDS = {"API_Category": "category", "API_Brand": "brand", "API_Rating": "rating"}
+
+
+class EnrichedTransaction:
+    """
+    Read-only view of a transaction plus its catalog entry
+    Behaves like the dict enrichment used to copy, without the copy
+    """
+
+    __slots__ = ("t", "info")
+
+    def __init__(self, t, info):
+        self.t = t
+        self.info = info
+
+    def __getitem__(self, key):
+        if key == "API_Match":
+            return self.info is not None
+        if key in API_FIELDS:
+            return self.info[API_FIELDS[key]] if self.info is not None else None
+        return self.t[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.t) + list(API_FIELDS) + ["API_Match"]
+
+    def copy(self):
+        return {key: self[key] for key in self.keys()}
+
+
+class EnrichedTransactions:
+    """
+    Enrichment result: the original transactions plus one column holding
+    each row's catalog entry (shared, never copied). Indexing and iteration
+    build EnrichedTransaction views on demand
+    """
+
+    def __init__(self, transactions, matches, summary):
+        self.transactions = transactions
+        self.matches = matches
+        self.summary = summary
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __getitem__(self, i):
+        return EnrichedTransaction(self.transactions[i], self.matches[i])
+
+    def __iter__(self):
+        return map(EnrichedTransaction, self.transactions, self.matches)
+
+
+def enrich_sales_data(transactions, product_mapping, resolver=None):
+    """
+    Enriches transaction data with API product information
+    Hash-joins each row to the catalog; writing the result is a separate
+    step (save_enriched_data)
+    Returns: EnrichedTransactions
+    """
+
+    if resolver is None:
+        resolver = ProductResolver(product_mapping)
+    resolve = resolver.resolve_transaction
+
+    if not isinstance(transactions, list):
+        transactions = list(transactions)
+    matches = [resolve(t) for t in transactions]
+
+    summary = new_enrichment_summary()
+    summary['total'] = len(transactions)
+    for t, info in zip(transactions, matches):
+        if info is None:
+            summary['failed_products'].add(t["ProductName"])
+    summary['enriched_count'] = summary['total'] - matches.count(None)
+
+    print("Sales data enriched successfully")
+
+    return EnrichedTransactions(transactions, matches, summary)
+
+
+def stream_enriched_data(transactions, product_mapping, filename="data/enriched_sales_data.txt", fmt="text",
+                         append=False, resolver=None):
+    """
+    Enriches and writes transactions one row at a time (constant memory)
+    append: add to an existing enriched file instead of replacing it
+    resolver: ProductResolver to use (name matching on product_mapping by default)
+    Returns: enrichment summary (see summarize_enrichment)
+    """
+
+    resolve = (resolver or ProductResolver(product_mapping)).resolve_transaction
+    summary = new_enrichment_summary()
+
+    def rows():
+        for t in transactions:
+            row = EnrichedTransaction(t, resolve(t))
+            count_enrichment(summary, row)
+            yield row
+
+    write_enriched(rows(), filename, fmt, append)
     print("Sales data enriched and saved successfully")
 
-    return enriched
+    return summary
+
+
+def new_enrichment_summary():
+    return {'total': 0, 'enriched_count': 0, 'failed_products': set()}
+
+
+def count_enrichment(summary, t):
+    """
+    Adds one enriched row to summary (see new_enrichment_summary)
+    """
+
+    summary['total'] += 1
+    if t["API_Match"]:
+        summary['enriched_count'] += 1
+    else:
+        summary['failed_products'].add(t["ProductName"])
+
+
+def summarize_enrichment(enriched_transactions):
+    """
+    Returns: dict with total, enriched_count and the set of failed product names
+    """
+
+    if isinstance(enriched_transactions, EnrichedTransactions):
+        return enriched_transactions.summary
+
+    summary = new_enrichment_summary()
+    for t in enriched_transactions:
+        count_enrichment(summary, t)
+    return summary
 
 
-def save_enriched_data(enriched_transactions, filename="data/enriched_sales_data.txt"):
+def save_enriched_data(enriched_transactions, filename="data/enriched_sales_data.txt", fmt="text"):
     """
     Saves enriched transactions to file
+    fmt: any format registered in utils.enriched_format ('text' or 'binary')
     """
 
-    header = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region",
-        "API_Category", "API_Brand", "API_Rating", "API_Match"
-    ]
-
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("|".join(header) + "\n")
-
-        for t in enriched_transactions:
-            row = [
-                str(t.get("TransactionID")),
-                str(t.get("Date")),
-                str(t.get("ProductID")),
-                str(t.get("ProductName")),
-                str(t.get("Quantity")),
-                str(t.get("UnitPrice")),
-                str(t.get("CustomerID")),
-                str(t.get("Region")),
-                str(t.get("API_Category")),
-                str(t.get("API_Brand")),
-                str(t.get("API_Rating")),
-                str(t.get("API_Match"))
-            ]
-            f.write("|".join(row) + "\n")
+    write_enriched(enriched_transactions, filename, fmt)
@@ -1,54 +1,53 @@
-def clean_and_process_data(raw_records):
-    cleaned_data = []
-    invalid_count = 0
-
-    for record in raw_records:
-        parts = record.split("|")
-        if len(parts) != 8:
-            invalid_count += 1
-            continue
-
-        tid, date, pid, pname, qty, price, cid, region = parts
-
-        if not tid.startswith("T") or not cid or not region:
-            invalid_count += 1
-            continue
-
-        try:
-            qty = int(qty.replace(",", ""))
-            price = float(price.replace(",", ""))
-        except:
-            invalid_count += 1
-            continue
-
-        if qty <= 0 or price <= 0:
-            invalid_count += 1
-            continue
+from utils.heavy_hitters import SpaceSaving, top_n, TOP_MODES, DEFAULT_TOP_ERROR
+from utils.cardinality import HyperLogLog, hash64, DISTINCT_MODES, DEFAULT_PRECISION
+from utils.sales_cube import SalesCube
+from utils.transaction_record import Transaction, TRANSACTION_FIELDS, as_transaction, intern
 
-        pname = pname.replace(",", " ")
 
-        cleaned_data.append({
-            "transaction_id": tid,
-            "date": date,
-            "product_id": pid,
-            "product_name": pname,
-            "quantity": qty,
-            "unit_price": price,
-            "customer_id": cid,
-            "region": region,
-            "total": qty * price
-        })
+def clean_and_process_data(raw_records):
+    """
+    Cleans raw lines into snake_case record dicts with a precomputed total
+    The rules are those of iter_parse_and_validate, so both entry points
+    accept and reject the same lines
+    Returns: list of cleaned record dicts
+    """
+
+    cleaned_data = [
+        {
+            "transaction_id": t.TransactionID,
+            "date": t.Date,
+            "product_id": t.ProductID,
+            "product_name": t.ProductName,
+            "quantity": t.Quantity,
+            "unit_price": t.UnitPrice,
+            "customer_id": t.CustomerID,
+            "region": t.Region,
+            "total": t.Amount
+        }
+        for t in iter_parse_and_validate(raw_records)
+    ]
 
     print(f"Total records parsed: {len(raw_records)}")
-    print(f"Invalid records removed: {invalid_count}")
+    print(f"Invalid records removed: {len(raw_records) - len(cleaned_data)}")
     print(f"Valid records after cleaning: {len(cleaned_data)}")
 
     return cleaned_data
 
 # ---------- PART 1 ----------
 
+# Why a line was dropped: wrong number of fields, Quantity/UnitPrice not a
+# number, Quantity or UnitPrice <= 0, ID without its T/P/C prefix, no Region
+REJECTION_REASONS = ('field_count', 'non_numeric', 'non_positive', 'bad_prefix', 'missing_region')
+
 def parse_transactions(raw_lines):
-    transactions = []
+    return list(iter_transactions(raw_lines))
+
+
+def iter_transactions(raw_lines):
+    """
+    Generator version of parse_transactions
+    Yields: Transaction records (dict-style access), one per well-formed line
+    """
 
     for line in raw_lines:
         parts = line.split('|')
@@ -64,82 +63,305 @@ def parse_transactions(raw_lines):
         except ValueError:
             continue
 
-        transactions.append({
-            'TransactionID': tid,
-            'Date': date,
-            'ProductID': pid,
-            'ProductName': pname,
-            'Quantity': qty,
-            'UnitPrice': price,
-            'CustomerID': cid,
-            'Region': region
-        })
-
-    return transactions
+        yield Transaction(tid, intern(date), intern(pid), intern(pname), qty, price, intern(cid), intern(region))
+
+
+def parse_and_validate(raw_lines, region=None, min_amount=None, max_amount=None):
+    """
+    Fused parse_transactions + validate_and_filter (one pass, no records
+    built for rejected rows)
+    Returns: (valid transactions, invalid count, summary) like validate_and_filter
+    """
+
+    summary = new_validation_summary()
+    valid = list(iter_parse_and_validate(raw_lines, region, min_amount, max_amount, summary))
+
+    print_filter_options(summary)
+
+    return valid, summary['invalid'], finish_validation_summary(summary)
+
+
+def iter_parse_and_validate(raw_lines, region=None, min_amount=None, max_amount=None, summary=None):
+    """
+    Splits, converts and validates each line in a single pass; a record is
+    only allocated for rows that are kept, and separators are only stripped
+    from numbers that fail to convert as they are
+    Every rejected line is counted under its reason in summary['rejected']
+    (lines that do not parse are not part of total_input, as before). The
+    counts are kept in locals and written to summary when the generator
+    finishes or is closed
+    Yields: the same records as iter_valid_transactions(iter_transactions(raw_lines), ...)
+    """
+
+    if summary is None:
+        summary = new_validation_summary()
+
+    regions = summary['regions']
+    lo, hi = summary['min_amount'], summary['max_amount']
+    total = invalid = by_region = by_amount = kept = 0
+    field_count = non_numeric = non_positive = bad_prefix = missing_region = 0
+
+    try:
+        for line in raw_lines:
+            parts = line.split('|')
+            if len(parts) != 8:
+                field_count += 1
+                continue
+
+            tid, date, pid, pname, qty, price, cid, r = parts
+            try:
+                qty = int(qty)
+                price = float(price)
+            except ValueError:
+                # Slow path only for numbers written with separators (1,916)
+                numbers = _parse_separated_numbers(parts[4], parts[5])
+                if numbers is None:
+                    non_numeric += 1
+                    continue
+                qty, price = numbers
+
+            total += 1
+
+            if qty <= 0 or price <= 0:
+                non_positive += 1
+                invalid += 1
+                continue
+            if tid[:1] != 'T' or pid[:1] != 'P' or cid[:1] != 'C':
+                bad_prefix += 1
+                invalid += 1
+                continue
+            if not r:
+                missing_region += 1
+                invalid += 1
+                continue
+
+            amt = qty * price
+            regions.add(r)
+            if lo is None or amt < lo:
+                lo = amt
+            if hi is None or amt > hi:
+                hi = amt
+
+            if region and r != region:
+                by_region += 1
+                continue
+
+            if (min_amount is not None and amt < min_amount) or (max_amount is not None and amt > max_amount):
+                by_amount += 1
+                continue
+
+            kept += 1
+            if ',' in pname:
+                pname = pname.replace(",", " ")
+            yield Transaction(tid, intern(date), intern(pid), intern(pname), qty, price, intern(cid), intern(r))
+
+    finally:
+        summary['total_input'] += total
+        summary['invalid'] += invalid
+        summary['filtered_by_region'] += by_region
+        summary['filtered_by_amount'] += by_amount
+        summary['final_count'] += kept
+        summary['min_amount'], summary['max_amount'] = lo, hi
+        rejected = summary['rejected']
+        rejected['field_count'] += field_count
+        rejected['non_numeric'] += non_numeric
+        rejected['non_positive'] += non_positive
+        rejected['bad_prefix'] += bad_prefix
+        rejected['missing_region'] += missing_region
+
+
+def _parse_separated_numbers(qty, price):
+    try:
+        return int(qty.replace(',', '')), float(price.replace(',', ''))
+    except ValueError:
+        return None
 
 
 def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
-    valid = []
-    invalid = 0
+    summary = new_validation_summary()
+    valid = list(iter_valid_transactions(transactions, region, min_amount, max_amount, summary))
+
+    print_filter_options(summary)
+
+    return valid, summary['invalid'], finish_validation_summary(summary)
+
+
+def new_validation_summary():
+    return {
+        'total_input': 0,
+        'invalid': 0,
+        'filtered_by_region': 0,
+        'filtered_by_amount': 0,
+        'final_count': 0,
+        'regions': set(),
+        'min_amount': None,
+        'max_amount': None,
+        'rejected': dict.fromkeys(REJECTION_REASONS, 0),
+        'duplicates': 0
+    }
+
+
+def iter_valid_transactions(transactions, region=None, min_amount=None, max_amount=None, summary=None):
+    """
+    Generator version of validate_and_filter
+    Counts are accumulated into summary (see new_validation_summary) as rows pass
+    Plain dict rows are converted to Transaction records on the way in
+    Yields: Transaction records that are valid and pass the filters
+    """
+
+    if summary is None:
+        summary = new_validation_summary()
+
+    regions = summary['regions']
+    rejected = summary['rejected']
 
     for t in transactions:
-        if (
-            t['Quantity'] <= 0 or
-            t['UnitPrice'] <= 0 or
-            not t['TransactionID'].startswith('T') or
-            not t['ProductID'].startswith('P') or
-            not t['CustomerID'].startswith('C') or
-            not t['Region']
-        ):
-            invalid += 1
+        summary['total_input'] += 1
+        if t.__class__ is not Transaction:
+            t = Transaction.from_mapping(t)
+
+        if t.Quantity <= 0 or t.UnitPrice <= 0:
+            reason = 'non_positive'
+        elif not t.TransactionID.startswith('T') or not t.ProductID.startswith('P') or \
+                not t.CustomerID.startswith('C'):
+            reason = 'bad_prefix'
+        elif not t.Region:
+            reason = 'missing_region'
+        else:
+            reason = None
+        if reason is not None:
+            summary['invalid'] += 1
+            rejected[reason] += 1
             continue
-        valid.append(t)
 
-    regions = set(t['Region'] for t in valid)
-    amounts = [t['Quantity'] * t['UnitPrice'] for t in valid]
+        amt = t.Amount
+        regions.add(t.Region)
+        if summary['min_amount'] is None or amt < summary['min_amount']:
+            summary['min_amount'] = amt
+        if summary['max_amount'] is None or amt > summary['max_amount']:
+            summary['max_amount'] = amt
 
-    print("Available regions:", regions)
-    print("Transaction amount range:", min(amounts), "-", max(amounts))
+        if region and t.Region != region:
+            summary['filtered_by_region'] += 1
+            continue
 
-    total_valid = len(valid)
+        if (min_amount is not None and amt < min_amount) or (max_amount is not None and amt > max_amount):
+            summary['filtered_by_amount'] += 1
+            continue
 
-    if region:
-        valid = [t for t in valid if t['Region'] == region]
+        summary['final_count'] += 1
+        yield t
 
-    filtered_by_region = total_valid - len(valid)
 
-    if min_amount is not None:
-        valid = [t for t in valid if t['Quantity'] * t['UnitPrice'] >= min_amount]
+def iter_filtered_transactions(transactions, region=None, min_amount=None, max_amount=None, summary=None):
+    """
+    Applies only the region and amount filters, to rows that already
+    passed validation (e.g. a cached validated dataset)
+    Counts go to summary's filtered_by_region, filtered_by_amount and final_count
+    Yields: the rows that pass
+    """
 
-    if max_amount is not None:
-        valid = [t for t in valid if t['Quantity'] * t['UnitPrice'] <= max_amount]
+    if summary is None:
+        summary = new_validation_summary()
 
-    filtered_by_amount = total_valid - filtered_by_region - len(valid)
+    for t in transactions:
+        if region and t.Region != region:
+            summary['filtered_by_region'] += 1
+            continue
 
-    summary = {
-        'total_input': len(transactions),
-        'invalid': invalid,
-        'filtered_by_region': filtered_by_region,
-        'filtered_by_amount': filtered_by_amount,
-        'final_count': len(valid)
-    }
+        amt = t.Amount
+        if (min_amount is not None and amt < min_amount) or (max_amount is not None and amt > max_amount):
+            summary['filtered_by_amount'] += 1
+            continue
+
+        summary['final_count'] += 1
+        yield t
+
+
+def iter_unique_transactions(transactions, index=None, summary=None):
+    """
+    Drops rows whose TransactionID was already seen (retransmissions);
+    the first occurrence wins
+    index: a TransactionIndex shared by everything read in the run, or
+    None to pass rows through unchanged
+    Dropped rows move from summary['final_count'] to summary['duplicates']
+    Yields: transactions with unseen IDs
+    """
+
+    if index is None:
+        yield from transactions
+        return
+
+    seen = index.seen
+    for t in transactions:
+        if seen(t.TransactionID):
+            if summary is not None:
+                summary['duplicates'] += 1
+                summary['final_count'] -= 1
+            continue
+        yield t
+
+
+def print_filter_options(summary):
+    print("Available regions:", summary['regions'])
+    print("Transaction amount range:", summary['min_amount'], "-", summary['max_amount'])
+
+
+def merge_validation_summaries(target, other):
+    """
+    Adds the counts of one validation summary into another
+    Returns: target
+    """
+
+    for key in ('total_input', 'invalid', 'filtered_by_region', 'filtered_by_amount', 'final_count',
+                'duplicates'):
+        target[key] += other[key]
+
+    for reason, count in other['rejected'].items():
+        target['rejected'][reason] += count
+
+    target['regions'] |= other['regions']
+    for key, pick in (('min_amount', min), ('max_amount', max)):
+        if target[key] is None:
+            target[key] = other[key]
+        elif other[key] is not None:
+            target[key] = pick(target[key], other[key])
+
+    return target
 
-    return valid, invalid, summary
+
+def finish_validation_summary(summary):
+    """
+    Returns: the summary dict validate_and_filter has always returned, plus
+    the per-reason rejection counts and the duplicates dropped
+    """
+
+    return {
+        'total_input': summary['total_input'],
+        'invalid': summary['invalid'],
+        'filtered_by_region': summary['filtered_by_region'],
+        'filtered_by_amount': summary['filtered_by_amount'],
+        'final_count': summary['final_count'],
+        'rejected': dict(summary['rejected']),
+        'duplicates': summary['duplicates']
+    }
 
 
 # ---------- PART 2 ----------
 
 def calculate_total_revenue(transactions):
-    return sum(t['Quantity'] * t['UnitPrice'] for t in transactions)
+    return sum(as_transaction(t).Amount for t in transactions)
 
 
 def region_wise_sales(transactions):
     regions = {}
-    total = calculate_total_revenue(transactions)
+    total = 0
 
     for t in transactions:
-        r = t['Region']
-        amt = t['Quantity'] * t['UnitPrice']
+        t = as_transaction(t)
+        r = t.Region
+        amt = t.Amount
+        total += amt
 
         if r not in regions:
             regions[r] = {'total_sales': 0, 'transaction_count': 0}
@@ -147,39 +369,34 @@ def region_wise_sales(transactions):
         regions[r]['total_sales'] += amt
         regions[r]['transaction_count'] += 1
 
-    for r in regions:
-        regions[r]['percentage'] = round((regions[r]['total_sales'] / total) * 100, 2)
-
-    return dict(sorted(regions.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+    return _region_view(regions, total)
 
 
 def top_selling_products(transactions, n=5):
-    products = {}
+    return _top_products_view(_aggregate_products(transactions), n)
 
-    for t in transactions:
-        p = t['ProductName']
-        q = t['Quantity']
-        amt = q * t['UnitPrice']
 
-        if p not in products:
-            products[p] = {'qty': 0, 'rev': 0}
+def top_customers(transactions, n=5):
+    """
+    Returns: the n biggest spenders as [(customer, info)], like the first n
+    entries of customer_analysis but without sorting every customer
+    """
 
-        products[p]['qty'] += q
-        products[p]['rev'] += amt
+    return _top_customers_view(_aggregate_customers(transactions), n)
 
-    result = [(p, d['qty'], d['rev']) for p, d in products.items()]
-    result.sort(key=lambda x: x[1], reverse=True)
 
-    return result[:n]
+def customer_analysis(transactions):
+    return customer_view(_aggregate_customers(transactions))
 
 
-def customer_analysis(transactions):
+def _aggregate_customers(transactions):
     customers = {}
 
     for t in transactions:
-        c = t['CustomerID']
-        amt = t['Quantity'] * t['UnitPrice']
-        p = t['ProductName']
+        t = as_transaction(t)
+        c = t.CustomerID
+        amt = t.Amount
+        p = t.ProductName
 
         if c not in customers:
             customers[c] = {
@@ -192,60 +409,73 @@ def customer_analysis(transactions):
         customers[c]['purchase_count'] += 1
         customers[c]['products_bought'].add(p)
 
-    for c in customers:
-        customers[c]['avg_order_value'] = round(
-            customers[c]['total_spent'] / customers[c]['purchase_count'], 2
-        )
-        customers[c]['products_bought'] = list(customers[c]['products_bought'])
+    return customers
 
-    return dict(sorted(customers.items(), key=lambda x: x[1]['total_spent'], reverse=True))
 
+def daily_sales_trend(transactions, distinct_mode="exact", precision=DEFAULT_PRECISION):
+    """
+    distinct_mode="approximate" counts unique customers per day with
+    HyperLogLog sketches instead of keeping every CustomerID
+    """
 
-def daily_sales_trend(transactions):
     daily = {}
+    precision = _distinct_precision(distinct_mode, precision)
 
     for t in transactions:
-        d = t['Date']
-        amt = t['Quantity'] * t['UnitPrice']
-        c = t['CustomerID']
+        t = as_transaction(t)
+        d = t.Date
+        amt = t.Amount
+        c = t.CustomerID
 
         if d not in daily:
-            daily[d] = {'revenue': 0, 'transaction_count': 0, 'customers': set()}
+            daily[d] = {'revenue': 0, 'transaction_count': 0, 'customers': _new_distinct(precision)}
 
         daily[d]['revenue'] += amt
         daily[d]['transaction_count'] += 1
         daily[d]['customers'].add(c)
 
-    for d in daily:
-        daily[d]['unique_customers'] = len(daily[d]['customers'])
-        del daily[d]['customers']
+    return _daily_view(daily)
 
-    return dict(sorted(daily.items()))
 
+def customer_reach(transactions, dimension='Region', distinct_mode="exact", precision=DEFAULT_PRECISION):
+    """
+    Counts unique customers per value of dimension (e.g. Region, ProductName)
+    Returns: {value: unique customers}, largest reach first
+    """
 
-def find_peak_sales_day(transactions):
-    daily = daily_sales_trend(transactions)
+    reach = {}
+    precision = _distinct_precision(distinct_mode, precision)
 
-    peak_date = None
-    max_revenue = 0
-    tx_count = 0
+    if dimension in TRANSACTION_FIELDS:
+        rows = ((getattr(t, dimension), t.CustomerID) for t in map(as_transaction, transactions))
+    else:
+        # e.g. an enriched column, only reachable as an item
+        rows = ((t[dimension], t['CustomerID']) for t in transactions)
 
-    for d, info in daily.items():
-        if info['revenue'] > max_revenue:
-            peak_date = d
-            max_revenue = info['revenue']
-            tx_count = info['transaction_count']
+    for v, c in rows:
+        if v not in reach:
+            reach[v] = _new_distinct(precision)
+        reach[v].add(c)
 
-    return (peak_date, max_revenue, tx_count)
+    return _reach_view(reach)
+
+
+def find_peak_sales_day(transactions):
+    return _peak_day_view(daily_sales_trend(transactions))
 
 
 def low_performing_products(transactions, threshold=10):
+    return _low_products_view(_aggregate_products(transactions), threshold)
+
+
+def _aggregate_products(transactions):
     products = {}
 
     for t in transactions:
-        p = t['ProductName']
-        q = t['Quantity']
-        amt = q * t['UnitPrice']
+        t = as_transaction(t)
+        p = t.ProductName
+        q = t.Quantity
+        amt = t.Amount
 
         if p not in products:
             products[p] = {'qty': 0, 'rev': 0}
@@ -253,7 +483,489 @@ def low_performing_products(transactions, threshold=10):
         products[p]['qty'] += q
         products[p]['rev'] += amt
 
+    return products
+
+
+# ---------- VIEWS (shared by the functions above and the snapshot) ----------
+
+def _region_view(regions, total):
+    result = {}
+
+    for r, d in regions.items():
+        result[r] = {
+            'total_sales': d['total_sales'],
+            'transaction_count': d['transaction_count'],
+            'percentage': round((d['total_sales'] / total) * 100, 2) if total else 0.0
+        }
+
+    return dict(sorted(result.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+
+
+def _top_products_view(products, n):
+    return top_n(((p, d['qty'], d['rev']) for p, d in products.items()), n, key=lambda x: x[1])
+
+
+def _customer_info(d):
+    return {
+        'total_spent': d['total_spent'],
+        'purchase_count': d['purchase_count'],
+        'products_bought': list(d['products_bought']),
+        'avg_order_value': round(d['total_spent'] / d['purchase_count'], 2)
+    }
+
+
+def customer_view(customers):
+    """
+    Returns: {customer: customer_analysis entry} for aggregated customers,
+    biggest spender first (a full sort; top customers alone use top_n)
+    """
+
+    result = {c: _customer_info(d) for c, d in customers.items()}
+
+    return dict(sorted(result.items(), key=lambda x: x[1]['total_spent'], reverse=True))
+
+
+def _top_customers_view(customers, n):
+    best = top_n(customers.items(), n, key=lambda x: x[1]['total_spent'])
+
+    return [(c, _customer_info(d)) for c, d in best]
+
+
+def _sketch_top_products_view(sketch, n):
+    return [(p, qty, rev) for p, qty, _, rev in sketch.top(n)]
+
+
+def _sketch_top_customers_view(sketch, n):
+    return [
+        (c, {
+            'total_spent': spent,
+            'purchase_count': orders,
+            'avg_order_value': round(spent / orders, 2) if orders else 0.0,
+            'error': error
+        })
+        for c, spent, error, orders in sketch.top(n)
+    ]
+
+
+def _daily_view(daily):
+    result = {}
+
+    for d in sorted(daily):
+        info = daily[d]
+        result[d] = {
+            'revenue': info['revenue'],
+            'transaction_count': info['transaction_count'],
+            'unique_customers': len(info['customers'])
+        }
+
+    return result
+
+
+def _reach_view(reach):
+    result = {v: len(customers) for v, customers in reach.items()}
+
+    return dict(sorted(result.items(), key=lambda x: x[1], reverse=True))
+
+
+def _peak_day_view(daily):
+    peak_date = None
+    max_revenue = 0
+    tx_count = 0
+
+    for d, info in daily.items():
+        if info['revenue'] > max_revenue:
+            peak_date = d
+            max_revenue = info['revenue']
+            tx_count = info['transaction_count']
+
+    return (peak_date, max_revenue, tx_count)
+
+
+def _low_products_view(products, threshold):
     low = [(p, d['qty'], d['rev']) for p, d in products.items() if d['qty'] < threshold]
     low.sort(key=lambda x: x[1])
 
     return low
+
+
+# ---------- DISTINCT COUNTERS (exact sets or HyperLogLog sketches) ----------
+
+def _distinct_precision(distinct_mode, precision):
+    """
+    Returns: None for exact sets, else the HyperLogLog precision
+    """
+
+    if distinct_mode not in DISTINCT_MODES:
+        raise ValueError(f"Unknown distinct-count mode: {distinct_mode}")
+    return None if distinct_mode == "exact" else precision
+
+
+def _new_distinct(precision):
+    return set() if precision is None else HyperLogLog(precision)
+
+
+def _distinct_to_dict(counter):
+    return sorted(counter) if isinstance(counter, set) else counter.to_dict()
+
+
+def _distinct_from_dict(data):
+    return set(data) if isinstance(data, list) else HyperLogLog.from_dict(data)
+
+
+# ---------- AGGREGATION ENGINE ----------
+
+def new_sales_state(top_mode="exact", top_error=DEFAULT_TOP_ERROR, distinct_mode="exact",
+                    precision=DEFAULT_PRECISION, cube=False, reach=False):
+    """
+    Creates an empty aggregate state
+    top_mode="approximate" replaces the per-customer totals with fixed-size
+    Space-Saving sketches for the top products and customers, whose counts
+    overestimate by at most top_error * total
+    distinct_mode="approximate" counts unique customers per day, region and
+    product with HyperLogLog sketches (sparse until they pass 2 ** precision
+    / 64 registers, then 2 ** precision bytes) instead of sets
+    cube=True also maintains a SalesCube (state['cube']) for rollup queries
+    reach=True also counts unique customers per region and per product
+    Returns: dict of running totals that update_sales_state folds rows into
+    """
+
+    if top_mode not in TOP_MODES:
+        raise ValueError(f"Unknown top-N mode: {top_mode}")
+
+    sketches = None
+    if top_mode == "approximate":
+        sketches = {'products': SpaceSaving(top_error), 'customers': SpaceSaving(top_error)}
+
+    return {
+        'total_revenue': 0,
+        'transaction_count': 0,
+        'first_date': None,
+        'last_date': None,
+        'regions': {},
+        'products': {},
+        'customers': {},
+        'daily': {},
+        'sketches': sketches,
+        'distinct': _distinct_precision(distinct_mode, precision),
+        'reach': {'regions': {}, 'products': {}} if reach else None,
+        'cube': SalesCube() if cube else None
+    }
+
+
+def update_sales_state(state, t):
+    """
+    Folds one validated transaction into every aggregate at once
+    """
+
+    t = as_transaction(t)
+    d = t.Date
+    r = t.Region
+    p = t.ProductName
+    c = t.CustomerID
+    q = t.Quantity
+    amt = t.Amount
+
+    state['total_revenue'] += amt
+    state['transaction_count'] += 1
+
+    if state['first_date'] is None or d < state['first_date']:
+        state['first_date'] = d
+    if state['last_date'] is None or d > state['last_date']:
+        state['last_date'] = d
+
+    region = state['regions'].get(r)
+    if region is None:
+        region = state['regions'][r] = {'total_sales': 0, 'transaction_count': 0}
+    region['total_sales'] += amt
+    region['transaction_count'] += 1
+
+    product = state['products'].get(p)
+    if product is None:
+        product = state['products'][p] = {'qty': 0, 'rev': 0}
+    product['qty'] += q
+    product['rev'] += amt
+
+    sketches = state['sketches']
+    if sketches is None:
+        customer = state['customers'].get(c)
+        if customer is None:
+            customer = state['customers'][c] = {
+                'total_spent': 0,
+                'purchase_count': 0,
+                'products_bought': set()
+            }
+        customer['total_spent'] += amt
+        customer['purchase_count'] += 1
+        customer['products_bought'].add(p)
+    else:
+        sketches['products'].update(p, q, amt)
+        sketches['customers'].update(c, amt, 1)
+
+    distinct = state['distinct']
+
+    day = state['daily'].get(d)
+    if day is None:
+        day = state['daily'][d] = {'revenue': 0, 'transaction_count': 0, 'customers': _new_distinct(distinct)}
+    day['revenue'] += amt
+    day['transaction_count'] += 1
+
+    reach = state['reach']
+    if reach is None:
+        if distinct is None:
+            day['customers'].add(c)
+        else:
+            day['customers'].add_hash(hash64(c))
+    else:
+        region_reach = reach['regions'].get(r)
+        if region_reach is None:
+            region_reach = reach['regions'][r] = _new_distinct(distinct)
+        product_reach = reach['products'].get(p)
+        if product_reach is None:
+            product_reach = reach['products'][p] = _new_distinct(distinct)
+
+        if distinct is None:
+            day['customers'].add(c)
+            region_reach.add(c)
+            product_reach.add(c)
+        else:
+            # Hash once and feed the same hash to all three sketches
+            h = hash64(c)
+            day['customers'].add_hash(h)
+            region_reach.add_hash(h)
+            product_reach.add_hash(h)
+
+    if state['cube'] is not None:
+        state['cube'].add(t)
+
+
+def aggregate_transactions(transactions, state=None):
+    """
+    Computes every aggregate in a single pass over the transactions
+    Returns: aggregate state (new, or the one passed in)
+    """
+
+    if state is None:
+        state = new_sales_state()
+
+    for t in transactions:
+        update_sales_state(state, t)
+
+    return state
+
+
+def merge_sales_states(target, other):
+    """
+    Folds one aggregate state into another (e.g. per-chunk partial results)
+    Merging partials in input order gives exactly the sequential result
+    Returns: target
+    """
+
+    target['total_revenue'] += other['total_revenue']
+    target['transaction_count'] += other['transaction_count']
+
+    for key, pick in (('first_date', min), ('last_date', max)):
+        if target[key] is None:
+            target[key] = other[key]
+        elif other[key] is not None:
+            target[key] = pick(target[key], other[key])
+
+    for r, d in other['regions'].items():
+        region = target['regions'].setdefault(r, {'total_sales': 0, 'transaction_count': 0})
+        region['total_sales'] += d['total_sales']
+        region['transaction_count'] += d['transaction_count']
+
+    for p, d in other['products'].items():
+        product = target['products'].setdefault(p, {'qty': 0, 'rev': 0})
+        product['qty'] += d['qty']
+        product['rev'] += d['rev']
+
+    for c, d in other['customers'].items():
+        customer = target['customers'].setdefault(c, {
+            'total_spent': 0,
+            'purchase_count': 0,
+            'products_bought': set()
+        })
+        customer['total_spent'] += d['total_spent']
+        customer['purchase_count'] += d['purchase_count']
+        customer['products_bought'] |= d['products_bought']
+
+    if target['distinct'] != other['distinct']:
+        raise ValueError("cannot merge aggregate states with different distinct-count modes")
+
+    for day, d in other['daily'].items():
+        daily = target['daily'].get(day)
+        if daily is None:
+            daily = target['daily'][day] = {
+                'revenue': 0,
+                'transaction_count': 0,
+                'customers': _new_distinct(target['distinct'])
+            }
+        daily['revenue'] += d['revenue']
+        daily['transaction_count'] += d['transaction_count']
+        daily['customers'] |= d['customers']
+
+    if (target['cube'] is None) != (other['cube'] is None):
+        raise ValueError("cannot merge aggregate states with and without a cube")
+    if target['cube'] is not None:
+        target['cube'].merge(other['cube'])
+
+    if (target['reach'] is None) != (other['reach'] is None):
+        raise ValueError("cannot merge aggregate states with and without customer reach")
+    for key, counters in (other['reach'] or {}).items():
+        for v, customers in counters.items():
+            if v in target['reach'][key]:
+                target['reach'][key][v] |= customers
+            else:
+                target['reach'][key][v] = _new_distinct(target['distinct']) | customers
+
+    if (target['sketches'] is None) != (other['sketches'] is None):
+        raise ValueError("cannot merge exact and approximate aggregate states")
+    if target['sketches'] is not None:
+        for key, sketch in other['sketches'].items():
+            target['sketches'][key].merge(sketch)
+
+    return target
+
+
+def finalize_sales_state(state, n=5, threshold=10, customers=False):
+    """
+    Turns an aggregate state into a snapshot of every analytics result
+    top_products/top_customers come from bounded heaps, or from the sketches
+    for an approximate state (top_error then holds each sketch's error bound)
+    region_reach/product_reach are unique customers per region/product
+    (None unless the state counts reach); distinct_error is the relative
+    standard error of the unique-customer counts (0 when exact)
+    customers=True also fills 'customers' with every customer ranked by
+    spend (customer_view); it is None otherwise, since that sorts them all
+    Returns: dict with the same shapes the individual analytics functions return
+    """
+
+    total = state['total_revenue']
+    count = state['transaction_count']
+    daily_trend = _daily_view(state['daily'])
+    sketches = state['sketches']
+
+    if sketches is None:
+        top_mode, top_error = "exact", {'products': 0, 'customers': 0}
+        top_products = _top_products_view(state['products'], n)
+        top_customers = _top_customers_view(state['customers'], n)
+    else:
+        top_mode = "approximate"
+        top_error = {key: sketch.error_bound() for key, sketch in sketches.items()}
+        top_products = _sketch_top_products_view(sketches['products'], n)
+        top_customers = _sketch_top_customers_view(sketches['customers'], n)
+
+    return {
+        'total_revenue': total,
+        'transaction_count': count,
+        'avg_order_value': total / count if count else 0,
+        'date_range': (state['first_date'], state['last_date']),
+        'region_sales': _region_view(state['regions'], total),
+        'product_totals': state['products'],
+        'top_products': top_products,
+        'top_customers': top_customers,
+        'top_mode': top_mode,
+        'top_error': top_error,
+        'customers': customer_view(state['customers']) if customers else None,
+        'daily_trend': daily_trend,
+        'peak_day': _peak_day_view(daily_trend),
+        'low_products': _low_products_view(state['products'], threshold),
+        'region_reach': None if state['reach'] is None else _reach_view(state['reach']['regions']),
+        'product_reach': None if state['reach'] is None else _reach_view(state['reach']['products']),
+        'distinct_mode': "exact" if state['distinct'] is None else "approximate",
+        'distinct_error': 0 if state['distinct'] is None else HyperLogLog(state['distinct']).relative_error()
+    }
+
+
+def sales_state_to_dict(state):
+    """
+    Returns: a JSON-serialisable copy of an aggregate state (sets become
+    sorted lists, sketches become dicts)
+    """
+
+    data = dict(state)
+    data['customers'] = {
+        c: {**d, 'products_bought': sorted(d['products_bought'])}
+        for c, d in state['customers'].items()
+    }
+    data['daily'] = {
+        day: {**d, 'customers': _distinct_to_dict(d['customers'])}
+        for day, d in state['daily'].items()
+    }
+    if state['reach'] is not None:
+        data['reach'] = {
+            key: {v: _distinct_to_dict(customers) for v, customers in counters.items()}
+            for key, counters in state['reach'].items()
+        }
+    if state['sketches'] is not None:
+        data['sketches'] = {key: sketch.to_dict() for key, sketch in state['sketches'].items()}
+    if state['cube'] is not None:
+        data['cube'] = state['cube'].to_dict()
+    return data
+
+
+def sales_state_from_dict(data):
+    """
+    Inverse of sales_state_to_dict
+    """
+
+    state = dict(data)
+    state['customers'] = {
+        c: {**d, 'products_bought': set(d['products_bought'])}
+        for c, d in data['customers'].items()
+    }
+    state['daily'] = {
+        day: {**d, 'customers': _distinct_from_dict(d['customers'])}
+        for day, d in data['daily'].items()
+    }
+    if data['reach'] is not None:
+        state['reach'] = {
+            key: {v: _distinct_from_dict(customers) for v, customers in counters.items()}
+            for key, counters in data['reach'].items()
+        }
+    state['cube'] = None if data['cube'] is None else SalesCube.from_dict(data['cube'])
+    if data.get('sketches') is not None:
+        state['sketches'] = {key: SpaceSaving.from_dict(d) for key, d in data['sketches'].items()}
+    else:
+        state['sketches'] = None
+    return state
+
+
+def build_sales_snapshot(transactions, n=5, threshold=10, **state_options):
+    """
+    Single-pass replacement for calling each analytics function separately
+    state_options: passed to new_sales_state (top_mode, distinct_mode, ...)
+    Returns: snapshot dict (see finalize_sales_state)
+    """
+
+    state = new_sales_state(**state_options)
+    return finalize_sales_state(aggregate_transactions(transactions, state), n, threshold)
+
+
+def aggregate_stream(raw_lines, region=None, min_amount=None, max_amount=None, state=None, index=None):
+    """
+    Streams raw lines through parse, validate and aggregate without
+    materialising any intermediate list, so memory stays flat with input size
+    index: TransactionIndex to drop duplicate TransactionIDs with
+    Returns: (aggregate state, validation summary)
+    """
+
+    summary = new_validation_summary()
+    valid = iter_parse_and_validate(raw_lines, region, min_amount, max_amount, summary)
+
+    return aggregate_transactions(iter_unique_transactions(valid, index, summary), state), summary
+
+
+def aggregate_parsed_stream(transactions, region=None, min_amount=None, max_amount=None, state=None,
+                            summary=None, index=None):
+    """
+    Same as aggregate_stream for readers that already yield transaction records
+    summary: pass one in to keep the reader's own rejection counts
+    Returns: (aggregate state, validation summary)
+    """
+
+    if summary is None:
+        summary = new_validation_summary()
+    valid = iter_valid_transactions(transactions, region, min_amount, max_amount, summary)
+
+    return aggregate_transactions(iter_unique_transactions(valid, index, summary), state), summary
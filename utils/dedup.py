@@ -0,0 +1,163 @@
+import math
+import os
+import tempfile
+
+from utils.cardinality import hash64
+from utils.defaults import DEDUP_MEMORY_LIMIT
+
+
+BLOOM_ERROR = 0.01
+SPILL_BATCH = 50_000
+
+
+class BloomFilter:
+    """
+    Fixed-capacity Bloom filter over 64-bit hashes: never a false negative,
+    false positives at about `error` once `capacity` items are in
+    About 1.2 bytes per item at 1% instead of ~80 for a string in a set
+    """
+
+    def __init__(self, capacity, error=BLOOM_ERROR):
+        self.capacity = capacity
+        self.error = error
+        self.size = max(8, math.ceil(-capacity * math.log(error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    # Double hashing: probe i is (h1 + i * h2) % size for the two halves of
+    # one 64-bit hash; a lookup stops at the first clear bit
+
+    def add_hash(self, h):
+        bits, size = self.bits, self.size
+        p, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        for _ in range(self.hashes):
+            q = p % size
+            bits[q >> 3] |= 1 << (q & 7)
+            p += step
+        self.count += 1
+
+    def might_contain_hash(self, h):
+        bits, size = self.bits, self.size
+        p, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        for _ in range(self.hashes):
+            q = p % size
+            if not bits[q >> 3] & (1 << (q & 7)):
+                return False
+            p += step
+        return True
+
+    def full(self):
+        return self.count >= self.capacity
+
+
+class TransactionIndex:
+    """
+    Remembers every TransactionID seen in a run to spot retransmitted rows
+    Up to `limit` IDs live in an exact set. Past that they move to a SQLite
+    file (in spill_dir, or the system temp directory) behind a chain of
+    Bloom filters, each twice the size of the one before at half the
+    error rate. A new ID then costs one filter probe; only a filter hit
+    (a real duplicate, or roughly `error` of new IDs) looks at the disk,
+    through the table's B-tree
+    Use as a context manager, or call close(), to delete the spill file
+    """
+
+    def __init__(self, limit=DEDUP_MEMORY_LIMIT, spill_dir=None, error=BLOOM_ERROR):
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.error = error
+        self.ids = set()
+        self.filters = None
+        self.pending = None
+        self.db = None
+        self.spill_file = None
+        self.disk_checks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        if self.db is None:
+            return len(self.ids)
+        return sum(f.count for f in self.filters)
+
+    def seen(self, tid):
+        """
+        Returns: True if tid was seen before; otherwise records it and returns False
+        """
+
+        if self.db is None:
+            if tid in self.ids:
+                return True
+            self.ids.add(tid)
+            if len(self.ids) > self.limit:
+                self._spill()
+            return False
+
+        h = hash64(tid)
+        for f in self.filters:
+            if f.might_contain_hash(h):
+                if tid in self.pending or self._on_disk(tid):
+                    return True
+                break
+
+        self._remember(tid, h)
+        return False
+
+    def stats(self):
+        return {
+            'mode': "exact" if self.db is None else "spilled",
+            'ids': len(self),
+            'disk_checks': self.disk_checks,
+            'spill_file': self.spill_file
+        }
+
+    # ---------- SPILL ----------
+
+    def _spill(self):
+        # Most runs never spill, so sqlite3 is only imported when one does
+        import sqlite3
+
+        fd, self.spill_file = tempfile.mkstemp(prefix="sales_ids_", suffix=".db", dir=self.spill_dir)
+        os.close(fd)
+        self.db = sqlite3.connect(self.spill_file)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE ids (tid TEXT PRIMARY KEY) WITHOUT ROWID")
+
+        self.filters = [BloomFilter(2 * self.limit, self.error)]
+        self.pending = set()
+        ids, self.ids = self.ids, None
+        for tid in ids:
+            self._remember(tid, hash64(tid))
+        self._flush()
+
+    def _remember(self, tid, h):
+        current = self.filters[-1]
+        if current.full():
+            current = BloomFilter(2 * current.capacity, current.error / 2)
+            self.filters.append(current)
+        current.add_hash(h)
+
+        self.pending.add(tid)
+        if len(self.pending) >= SPILL_BATCH:
+            self._flush()
+
+    def _flush(self):
+        self.db.executemany("INSERT INTO ids VALUES (?)", ((tid,) for tid in self.pending))
+        self.db.commit()
+        self.pending.clear()
+
+    def _on_disk(self, tid):
+        self.disk_checks += 1
+        return self.db.execute("SELECT 1 FROM ids WHERE tid = ?", (tid,)).fetchone() is not None
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            os.remove(self.spill_file)
@@ -0,0 +1,46 @@
+# Default paths, modes and limits shared by the command line and the
+# subsystems. Kept free of imports so main.py can build its parser (and
+# answer --help) without loading any of the modules that use them
+
+# ---------- FILES ----------
+
+CHECKPOINT_FILE = "output/sales_checkpoint.json"
+# `ingest` and `analyze --checkpoint` never enrich, so they keep their own
+# checkpoint instead of invalidating the enriching run's one (and back)
+ANALYTICS_CHECKPOINT_FILE = "output/analytics_checkpoint.json"
+CUBE_FILE = "output/sales_cube.json"
+METRICS_FILE = "output/pipeline_metrics.json"
+CACHE_DIR = "output/cache"
+LIVE_SNAPSHOT_FILE = "output/live_snapshot.json"
+STORE_FILE = "data/sales.db"
+
+# ---------- FORMATS ----------
+
+REPORT_FORMATS = ("text", "json", "csv", "html")
+ENRICHED_FORMATS = ("text", "binary")
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# ---------- ANALYTICS ----------
+
+TOP_MODES = ("exact", "approximate")
+DEFAULT_TOP_ERROR = 0.001
+DISTINCT_MODES = ("exact", "approximate")
+DEFAULT_PRECISION = 12
+# IDs kept in the exact in-memory index before it spills to disk
+DEDUP_MEMORY_LIMIT = 1_000_000
+
+# ---------- CATALOG ----------
+
+CATALOG_TTL = 24 * 60 * 60
+PRODUCT_MATCH_MODES = ("auto", "name", "id")
+# ProductIDs (P101...) do not share a numbering with the catalog, so only
+# names are matched unless the ID join is asked for
+DEFAULT_PRODUCT_MATCH = "name"
+NAME_MATCH_THRESHOLD = 0.5
+
+# ---------- CACHE AND LIVE MODE ----------
+
+CACHE_LIMIT = 256 * 1024 * 1024
+EMIT_INTERVAL = 5.0
+POLL_INTERVAL = 0.25
+ROLLING_PATTERN = "*.txt"
@@ -0,0 +1,370 @@
+import mmap
+import struct
+from array import array
+
+
+ENRICHED_HEADER = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region",
+    "API_Category", "API_Brand", "API_Rating", "API_Match"
+]
+
+# Column types for the binary format:
+#   S = dictionary-encoded string, I = int64, F = float64, B = bool
+# every type is nullable
+ENRICHED_SCHEMA = [
+    ("TransactionID", "S"), ("Date", "S"), ("ProductID", "S"), ("ProductName", "S"),
+    ("Quantity", "I"), ("UnitPrice", "F"), ("CustomerID", "S"), ("Region", "S"),
+    ("API_Category", "S"), ("API_Brand", "S"), ("API_Rating", "F"), ("API_Match", "B")
+]
+
+MAGIC = b"SALESCOL"
+VERSION = 1
+CHUNK_ROWS = 65536
+
+_FILE_HEADER = struct.Struct("<8sH")
+_CHUNK_HEADER = struct.Struct("<4sII")
+# kind, encoding, array typecode, null mode, payload length
+_COLUMN_HEADER = struct.Struct("<ccccQ")
+
+# null modes
+ALL_VALID, ALL_NULL, MASKED = b"v", b"n", b"m"
+# string encodings
+DICTIONARY, PLAIN = b"d", b"p"
+# numeric encodings (floats that are all whole numbers are stored as ints)
+NATIVE, INTEGRAL = b"n", b"i"
+
+_SIGNED = [("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31), ("q", 1 << 63)]
+_UNSIGNED = [("B", 1 << 8), ("H", 1 << 16), ("I", 1 << 32)]
+
+
+# ---------------- TEXT (pipe-delimited) ----------------
+
+_TEXT_ESCAPES = {"\\": "\\\\", "|": "\\|", "\n": "\\n", "\r": "\\r"}
+_TEXT_UNESCAPES = {"n": "\n", "r": "\r"}
+
+
+def _escape_text_value(value):
+    # Catalog text may hold the delimiter or a line break; backslash-escape
+    # them (and the backslash) so the row still splits into its fields
+    text = str(value)
+    if "|" in text or "\\" in text or "\n" in text or "\r" in text:
+        text = "".join(_TEXT_ESCAPES.get(ch, ch) for ch in text)
+    return text
+
+
+def _split_text_row(line):
+    if "\\" not in line:
+        return line.split("|")
+
+    parts, current = [], []
+    chars = iter(line)
+    for ch in chars:
+        if ch == "\\":
+            ch = next(chars, "")
+            current.append(_TEXT_UNESCAPES.get(ch, ch))
+        elif ch == "|":
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current))
+    return parts
+
+
+def _format_enriched_row(t):
+    return "|".join(_escape_text_value(t.get(field)) for field in ENRICHED_HEADER) + "\n"
+
+
+def write_enriched_text(enriched_transactions, filename, append=False):
+    with open(filename, "a" if append else "w", encoding="utf-8") as f:
+        if f.tell() == 0:
+            f.write("|".join(ENRICHED_HEADER) + "\n")
+
+        for t in enriched_transactions:
+            f.write(_format_enriched_row(t))
+
+
+def _parse_text_value(value, kind):
+    if value == "None":
+        return None
+    if kind == "I":
+        return int(value)
+    if kind == "F":
+        return float(value)
+    if kind == "B":
+        return value == "True"
+    return value
+
+
+def read_enriched_text(filename, rejected=None):
+    """
+    Yields: enriched rows from the pipe format with types restored
+    (the literal strings None/True/False become None/True/False)
+    rejected: dict whose 'field_count' counts the lines that do not split
+    into the header's fields; without it their number is printed
+    """
+
+    malformed = 0
+    with open(filename, "r", encoding="utf-8", newline="\n") as f:
+        next(f, None)
+        for line in f:
+            parts = _split_text_row(line.rstrip("\r\n"))
+            if len(parts) != len(ENRICHED_SCHEMA):
+                malformed += 1
+                continue
+            yield {name: _parse_text_value(value, kind)
+                   for (name, kind), value in zip(ENRICHED_SCHEMA, parts)}
+
+    if rejected is not None:
+        rejected['field_count'] = rejected.get('field_count', 0) + malformed
+    elif malformed:
+        print(f"Warning: skipped {malformed} malformed rows in '{filename}'")
+
+
+# ---------------- BINARY (typed columnar) ----------------
+
+def _pad(payload):
+    # Keep every section 8-byte aligned so the reader can cast in place
+    return payload + b"\0" * (-len(payload) % 8)
+
+
+def _int_typecode(low, high):
+    for code, limit in _SIGNED:
+        if -limit <= low and high < limit:
+            return code
+    raise OverflowError("integer column does not fit in 64 bits")
+
+
+def _code_typecode(size):
+    # The largest value of the type is kept free to mark nulls
+    for code, limit in _UNSIGNED:
+        if size < limit:
+            return code
+    raise OverflowError("too many distinct strings in one chunk")
+
+
+def _encode_strings(strings):
+    encoded = [v.encode("utf-8") for v in strings]
+    offsets = array("I", [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    return _pad(struct.pack("<I", len(encoded)) + offsets.tobytes() + b"".join(encoded))
+
+
+def _encode_column(values, kind):
+    """
+    Returns: (encoding, typecode, null mode, payload)
+    """
+
+    present = [v for v in values if v is not None]
+    if not present:
+        return NATIVE, b"b", ALL_NULL, b""
+
+    if len(present) == len(values):
+        null_mode, mask = ALL_VALID, b""
+    else:
+        null_mode, mask = MASKED, _pad(bytes(v is not None for v in values))
+
+    if kind == "S":
+        index = {}
+        for v in present:
+            index.setdefault(v, len(index))
+
+        if len(index) * 2 > len(present):
+            # Mostly unique (e.g. TransactionID): a dictionary would only add codes
+            return PLAIN, b"I", null_mode, mask + _encode_strings(present)
+
+        typecode = _code_typecode(len(index))
+        codes = array(typecode, (index[v] for v in present))
+        return DICTIONARY, typecode.encode(), null_mode, mask + _encode_strings(index) + _pad(codes.tobytes())
+
+    if kind == "B":
+        return NATIVE, b"b", null_mode, mask + _pad(bytes(bool(v) for v in present))
+
+    encoding = NATIVE
+    if kind == "F":
+        # Catalog values such as a rating of 5 arrive as ints
+        present = [float(v) for v in present]
+        if all(v.is_integer() for v in present) and -(1 << 53) < min(present) and max(present) < 1 << 53:
+            encoding, present = INTEGRAL, [int(v) for v in present]
+        else:
+            return NATIVE, b"d", null_mode, mask + _pad(array("d", present).tobytes())
+
+    typecode = _int_typecode(min(present), max(present))
+    return encoding, typecode.encode(), null_mode, mask + _pad(array(typecode, present).tobytes())
+
+
+def _write_chunk(f, rows):
+    f.write(_pad(_CHUNK_HEADER.pack(b"CHNK", len(rows), len(ENRICHED_SCHEMA))))
+    for name, kind in ENRICHED_SCHEMA:
+        encoding, typecode, null_mode, payload = _encode_column([row.get(name) for row in rows], kind)
+        f.write(_COLUMN_HEADER.pack(kind.encode(), encoding, typecode, null_mode, len(payload)))
+        f.write(payload)
+
+
+def write_enriched_binary(enriched_transactions, filename, append=False, chunk_rows=CHUNK_ROWS):
+    """
+    Writes enriched rows as typed columns, chunk_rows rows at a time
+    Strings are dictionary-encoded unless mostly unique, integers and
+    dictionary codes use the narrowest width that fits, and nulls and
+    booleans are kept as real values. Chunks are self-contained, so
+    append=True just adds chunks to the end of an existing file
+    """
+
+    with open(filename, "ab" if append else "wb") as f:
+        if f.tell() == 0:
+            f.write(_pad(_FILE_HEADER.pack(MAGIC, VERSION)))
+
+        rows = []
+        for t in enriched_transactions:
+            rows.append(t)
+            if len(rows) == chunk_rows:
+                _write_chunk(f, rows)
+                rows = []
+        if rows:
+            _write_chunk(f, rows)
+
+
+def _decode_strings(view, start):
+    """
+    Returns: (list of strings, position after the padded string section)
+    """
+
+    size = struct.unpack_from("<I", view, start)[0]
+    offsets = view[start + 4:start + 8 + 4 * size].cast("I")
+    start += 8 + 4 * size
+    data = bytes(view[start:start + offsets[-1]])
+    start += offsets[-1]
+    return [data[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])], start + (-start % 8)
+
+
+def _decode_column(view, kind, encoding, typecode, null_mode, count):
+    """
+    Returns: list of Python values (None for nulls); numeric data is cast
+    straight from the mapped buffer
+    """
+
+    if null_mode == ALL_NULL:
+        return [None] * count
+
+    start = 0
+    mask = None
+    if null_mode == MASKED:
+        mask = view[:count]
+        start = count + (-count % 8)
+    present = count if mask is None else sum(mask)
+
+    if kind == "S":
+        strings, start = _decode_strings(view, start)
+        if encoding == DICTIONARY:
+            width = array(typecode).itemsize
+            codes = view[start:start + width * present].cast(typecode)
+            values = list(map(strings.__getitem__, codes))
+        else:
+            values = strings
+    else:
+        width = array(typecode).itemsize
+        values = view[start:start + width * present].cast(typecode).tolist()
+        if kind == "B":
+            values = [v != 0 for v in values]
+        elif kind == "F":
+            values = [float(v) for v in values] if encoding == INTEGRAL else values
+
+    if mask is None:
+        return values
+
+    it = iter(values)
+    return [next(it) if ok else None for ok in mask]
+
+
+def iter_enriched_binary_columns(filename):
+    """
+    Memory-maps a binary file and yields one {column name: values} dict per chunk
+    """
+
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            view = memoryview(buffer)
+            try:
+                magic, version = _FILE_HEADER.unpack_from(view, 0)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"{filename} is not a sales columnar file")
+
+                position = _FILE_HEADER.size + (-_FILE_HEADER.size % 8)
+                while position < len(view):
+                    tag, count, ncols = _CHUNK_HEADER.unpack_from(view, position)
+                    position += _CHUNK_HEADER.size + (-_CHUNK_HEADER.size % 8)
+
+                    columns = {}
+                    for name, _ in ENRICHED_SCHEMA[:ncols]:
+                        kind, encoding, typecode, null_mode, length = _COLUMN_HEADER.unpack_from(view, position)
+                        position += _COLUMN_HEADER.size
+                        columns[name] = _decode_column(
+                            view[position:position + length], kind.decode(), encoding,
+                            typecode.decode(), null_mode, count
+                        )
+                        position += length
+                    yield columns
+            finally:
+                view.release()
+
+
+def read_enriched_binary(filename):
+    """
+    Yields: enriched rows (dicts) from the binary format
+    """
+
+    names = [name for name, _ in ENRICHED_SCHEMA]
+    for columns in iter_enriched_binary_columns(filename):
+        for values in zip(*(columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+
+# ---------------- REGISTRY ----------------
+
+ENRICHED_WRITERS = {"text": write_enriched_text, "binary": write_enriched_binary}
+ENRICHED_READERS = {"text": read_enriched_text, "binary": read_enriched_binary}
+ENRICHED_EXTENSIONS = {"text": ".txt", "binary": ".col"}
+
+
+def register_enriched_format(name, writer, reader, extension):
+    ENRICHED_WRITERS[name] = writer
+    ENRICHED_READERS[name] = reader
+    ENRICHED_EXTENSIONS[name] = extension
+
+
+def detect_enriched_format(filename):
+    with open(filename, "rb") as f:
+        return "binary" if f.read(len(MAGIC)) == MAGIC else "text"
+
+
+def write_enriched(enriched_transactions, filename, fmt="text", append=False):
+    if fmt not in ENRICHED_WRITERS:
+        raise ValueError(f"Unknown enriched data format: {fmt}")
+    ENRICHED_WRITERS[fmt](enriched_transactions, filename, append)
+
+
+def load_enriched_columns(filename):
+    """
+    Reads a binary file straight into columns without building row dicts
+    Returns: {column name: list of values}
+    """
+
+    columns = {name: [] for name, _ in ENRICHED_SCHEMA}
+    for chunk in iter_enriched_binary_columns(filename):
+        for name, values in chunk.items():
+            columns[name].extend(values)
+    return columns
+
+
+def load_enriched_data(filename, fmt=None):
+    """
+    Reads enriched rows back in any registered format (detected from the
+    file when fmt is None)
+    Returns: list of enriched row dicts
+    """
+
+    if fmt is None:
+        fmt = detect_enriched_format(filename)
+    return list(ENRICHED_READERS[fmt](filename))
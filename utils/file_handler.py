@@ -1,3 +1,10 @@
+import glob
+import mmap
+import os
+
+from utils.transaction_record import Transaction, intern
+
+
 def read_sales_file(file_path):
     records = []
     with open(file_path, 'r', encoding='latin-1') as f:
@@ -11,13 +18,24 @@ def read_sales_file(file_path):
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues
+    filename may also be a directory or glob of shard files (see
+    expand_sales_files), read one after another
     Returns: list of raw lines (strings)
     """
 
+    shards = expand_sales_files(filename)
+    if shards != [filename]:
+        if not shards:
+            print(f"Error: No sales files match '{filename}'.")
+        return [line for shard in shards for line in read_sales_data(shard)]
+
     encodings = ['utf-8', 'latin-1', 'cp1252']
-    lines = []
 
     for encoding in encodings:
+        # Start over on every attempt so a decode error part-way through
+        # does not leave the lines read so far in the result twice
+        lines = []
+
         try:
             with open(filename, 'r', encoding=encoding) as file:
                 for line in file:
@@ -36,3 +54,227 @@ def read_sales_data(filename):
 
     print("Error: Unable to read file due to encoding issues.")
     return []
+
+
+# ---------- SHARDED INPUT ----------
+
+SHARD_PATTERN = "*.txt"
+
+
+def expand_sales_files(path, pattern=SHARD_PATTERN):
+    """
+    Returns: the input files for path in a stable order: every file matching
+    pattern inside a directory, the matches of a glob (e.g.
+    "data/store_*/2024-12-*.txt"), or just [path]
+    """
+
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, pattern)))
+    if glob.has_magic(path):
+        return sorted(f for f in glob.glob(path) if os.path.isfile(f))
+    return [path]
+
+
+def iter_sales_files(path, reader=None, **kwargs):
+    """
+    Chains reader (iter_sales_data by default) over every shard of path
+    Yields: whatever reader yields, shard after shard
+    """
+
+    reader = reader or iter_sales_data
+    for filename in expand_sales_files(path):
+        yield from reader(filename, **kwargs)
+
+
+# ---------- STREAMING ----------
+
+FALLBACK_ENCODINGS = ['cp1252', 'latin-1']
+
+
+def decode_line(raw, state):
+    """
+    Decodes one raw line, switching encoding at most once per file
+    state: dict holding the current 'encoding' (starts at utf-8)
+    """
+
+    try:
+        return raw.decode(state['encoding'])
+    except UnicodeDecodeError:
+        pass
+
+    # Lines already yielded were valid in the earlier encoding, so the
+    # switch only affects this line and the ones after it
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            text = raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        state['encoding'] = encoding
+        return text
+
+
+def iter_sales_data(filename, start=0, end=None):
+    """
+    Streams sales data one line at a time in a single pass
+    start/end: optional byte range; start must be at a line boundary and
+    every line that starts before end is read in full
+    Yields: raw lines (strings), header and blank lines skipped
+    """
+
+    state = {'encoding': 'utf-8'}
+
+    try:
+        file = open(filename, 'rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    with file:
+        file.seek(start)
+        position = start
+
+        for raw in file:
+            if end is not None and position >= end:
+                break
+            position += len(raw)
+
+            line = decode_line(raw, state).strip()
+            if not line or line.startswith("TransactionID"):
+                continue
+            yield line
+
+
+def complete_lines_end(filename, start=0, block_size=1 << 16):
+    """
+    Finds where the last complete (newline-terminated) line ends, so a line
+    that is still being appended is left for the next run
+    Returns: byte offset >= start
+    """
+
+    with open(filename, 'rb') as file:
+        file.seek(0, 2)
+        position = file.tell()
+
+        while position > start:
+            step = min(block_size, position - start)
+            position -= step
+            file.seek(position)
+            newline = file.read(step).rfind(b'\n')
+            if newline != -1:
+                return position + newline + 1
+
+    return start
+
+
+def split_byte_ranges(filename, chunks):
+    """
+    Splits a file into roughly equal byte ranges that start and end on
+    line boundaries
+    Returns: list of (start, end) offsets
+    """
+
+    with open(filename, 'rb') as file:
+        file.seek(0, 2)
+        size = file.tell()
+        step = max(size // max(chunks, 1), 1)
+
+        bounds = [0]
+        while bounds[-1] < size:
+            target = bounds[-1] + step
+            if target >= size:
+                bounds.append(size)
+                break
+            file.seek(target)
+            file.readline()
+            bounds.append(file.tell())
+
+    return list(zip(bounds, bounds[1:]))
+
+
+# ---------- MEMORY-MAPPED ----------
+
+def iter_sales_records_mmap(filename, start=0, end=None, rejected=None):
+    """
+    Memory-maps the file and parses records block by block
+    Each ~1 MB block is split into lines and decoded with one call (falling
+    back per line, as iter_sales_data does, only in a block with an
+    undecodable line), and separators such as 1,916 are only stripped when
+    present
+    rejected: validation summary 'rejected' dict; lines that do not parse
+    are counted there under field_count or non_numeric
+    Yields: Transaction records, the same as iter_transactions(iter_sales_data(...))
+    """
+
+    state = {'encoding': 'utf-8'}
+
+    try:
+        file = open(filename, 'rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    with file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return
+
+        with buffer:
+            for block in _iter_line_blocks(buffer, start, end):
+                for line in _decode_block_lines(block, state):
+                    line = line.strip()
+                    if not line or line.startswith('TransactionID'):
+                        continue
+                    parts = line.split('|')
+                    if len(parts) != 8:
+                        if rejected is not None:
+                            rejected['field_count'] += 1
+                        continue
+
+                    tid, date, pid, pname, qty, price, cid, region = parts
+                    try:
+                        qty = int(qty.replace(',', '') if ',' in qty else qty)
+                        price = float(price.replace(',', '') if ',' in price else price)
+                    except ValueError:
+                        if rejected is not None:
+                            rejected['non_numeric'] += 1
+                        continue
+
+                    if ',' in pname:
+                        pname = pname.replace(",", " ")
+
+                    yield Transaction(tid, intern(date), intern(pid), intern(pname), qty, price,
+                                      intern(cid), intern(region))
+
+
+def _decode_block_lines(block, state):
+    """
+    Returns: the lines of a block, decoded in one call while the block is
+    valid in the current encoding; otherwise line by line with decode_line,
+    so only the offending line and those after it switch encoding, exactly
+    as in iter_sales_data
+    """
+
+    try:
+        return block.decode(state['encoding']).split('\n')
+    except UnicodeDecodeError:
+        return [decode_line(raw, state) for raw in block.split(b'\n')]
+
+
+def _iter_line_blocks(buffer, start, end, block_size=1 << 20):
+    """
+    Yields: large byte slices of the mapped buffer that end on a newline,
+    so line splitting and decoding happen in C once per block
+    """
+
+    size = len(buffer) if end is None else min(end, len(buffer))
+    position = start
+
+    while position < size:
+        cut = min(position + block_size, size)
+        if cut < size:
+            newline = buffer.find(b'\n', cut)
+            cut = len(buffer) if newline == -1 else newline + 1
+        yield buffer[position:cut]
+        position = cut
@@ -0,0 +1,138 @@
+import heapq
+import math
+
+from utils.defaults import TOP_MODES, DEFAULT_TOP_ERROR
+
+
+def top_n(items, n, key):
+    """
+    Bounded-heap replacement for sorted(items, key=key, reverse=True)[:n]
+    (ties keep their input order, exactly like the stable sort)
+    Returns: list of the n largest items
+    """
+
+    return heapq.nlargest(n, items, key=key)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch over weighted updates
+    Keeps at most capacity = ceil(1 / epsilon) counters, so memory is fixed
+    no matter how many distinct keys the stream has. Every reported count
+    overestimates the true total by at most its 'error', and every error is
+    at most epsilon * total weight; any key whose true total exceeds that
+    bound is guaranteed to be monitored
+    Each counter also carries an 'extra' sum (e.g. revenue next to quantity)
+    accumulated since the key was last admitted, which is a lower bound
+    """
+
+    def __init__(self, epsilon=DEFAULT_TOP_ERROR):
+        if not 0 < epsilon < 1:
+            raise ValueError(f"epsilon must be between 0 and 1, got {epsilon}")
+        self.epsilon = epsilon
+        self.capacity = math.ceil(1 / epsilon)
+        self.total = 0
+        # key -> [count, error, extra]
+        self.counters = {}
+        # (count, key) min-heap with stale entries, rebuilt when it grows
+        self._heap = []
+
+    def update(self, key, weight=1, extra=0):
+        self.total += weight
+        counter = self.counters.get(key)
+
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[key] = [0, 0, 0]
+            else:
+                floor = self._evict()
+                counter = self.counters[key] = [floor, floor, 0]
+
+        counter[0] += weight
+        counter[2] += extra
+
+        heapq.heappush(self._heap, (counter[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _evict(self):
+        """
+        Removes the smallest counter
+        Returns: its count, which the newcomer inherits as its error
+        """
+
+        while True:
+            count, key = heapq.heappop(self._heap)
+            counter = self.counters.get(key)
+            if counter is not None and counter[0] == count:
+                del self.counters[key]
+                return count
+
+    def _rebuild_heap(self):
+        self._heap = [(c[0], k) for k, c in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def floor(self):
+        """
+        Returns: the most any unmonitored key can have been seen
+        """
+
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(c[0] for c in self.counters.values())
+
+    def error_bound(self):
+        """
+        Returns: the largest possible overestimate of any reported count
+        """
+
+        return max((c[1] for c in self.counters.values()), default=0)
+
+    def top(self, n):
+        """
+        Returns: list of (key, count, error, extra) for the n largest counts
+        """
+
+        best = top_n(self.counters.items(), n, key=lambda x: x[1][0])
+        return [(k, c[0], c[1], c[2]) for k, c in best]
+
+    def merge(self, other):
+        """
+        Folds another sketch (same epsilon) into this one; the merged
+        sketch keeps the same error guarantee over the combined stream
+        Returns: self
+        """
+
+        if other.capacity != self.capacity:
+            raise ValueError("cannot merge sketches with different capacities")
+
+        floor_self = self.floor()
+        floor_other = other.floor()
+        merged = {}
+
+        # dict.fromkeys keeps the union in a stable order, so ties break the same way every run
+        for key in dict.fromkeys(list(self.counters) + list(other.counters)):
+            a = self.counters.get(key, [floor_self, floor_self, 0])
+            b = other.counters.get(key, [floor_other, floor_other, 0])
+            merged[key] = [a[0] + b[0], a[1] + b[1], a[2] + b[2]]
+
+        kept = top_n(merged.items(), self.capacity, key=lambda x: x[1][0])
+        self.counters = dict(kept)
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def to_dict(self):
+        return {
+            'epsilon': self.epsilon,
+            'total': self.total,
+            'counters': self.counters
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['epsilon'])
+        sketch.total = data['total']
+        sketch.counters = {k: list(c) for k, c in data['counters'].items()}
+        sketch._rebuild_heap()
+        return sketch
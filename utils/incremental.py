@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+
+from utils.file_handler import iter_sales_data, complete_lines_end, expand_sales_files
+from utils.data_processor import (
+    iter_parse_and_validate,
+    new_validation_summary,
+    new_sales_state,
+    update_sales_state,
+    sales_state_to_dict,
+    sales_state_from_dict
+)
+from utils.defaults import CHECKPOINT_FILE, ANALYTICS_CHECKPOINT_FILE
+
+
+CHECKPOINT_VERSION = 7
+FINGERPRINT_BYTES = 4096
+
+
+# ---------- CHECKPOINT FILE ----------
+
+def file_fingerprint(filename, offset):
+    """
+    Hashes the first and the last FINGERPRINT_BYTES before offset; if either
+    changes the file was rewritten or rotated rather than appended to
+    """
+
+    with open(filename, 'rb') as f:
+        head = f.read(min(offset, FINGERPRINT_BYTES))
+        f.seek(max(offset - FINGERPRINT_BYTES, 0))
+        tail = f.read(offset - max(offset - FINGERPRINT_BYTES, 0))
+
+    return {
+        'head': hashlib.sha256(head).hexdigest(),
+        'tail': hashlib.sha256(tail).hexdigest()
+    }
+
+
+def load_checkpoint(checkpoint_file=CHECKPOINT_FILE):
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, checkpoint_file=CHECKPOINT_FILE):
+    directory = os.path.dirname(checkpoint_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_file = checkpoint_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def resume_offset(filename, checkpoint, filters, enriched_file=None, match_options=None):
+    """
+    Decides whether the previous run can be continued
+    Returns: (offset to start reading from, reason)
+    """
+
+    if checkpoint is None:
+        return 0, 'no checkpoint'
+    if checkpoint['source'] != os.path.abspath(filename):
+        return 0, 'different input file'
+    if checkpoint['filters'] != filters:
+        return 0, 'filters changed'
+    if enriched_file is not None and (
+        checkpoint['enriched_file'] != enriched_file or
+        checkpoint['match_options'] != match_options or
+        checkpoint['enrichment'] is None or
+        not os.path.exists(enriched_file)
+    ):
+        return 0, 'enriched output missing or changed'
+
+    offset = checkpoint['offset']
+    if os.path.getsize(filename) < offset:
+        return 0, 'file truncated'
+    if file_fingerprint(filename, offset) != checkpoint['fingerprint']:
+        return 0, 'file rotated or rewritten'
+
+    return offset, 'appended rows only'
+
+
+# ---------- INCREMENTAL RUN ----------
+
+def open_increment(filename, checkpoint_file=CHECKPOINT_FILE, region=None, min_amount=None,
+                   max_amount=None, enriched_file=None, state_options=None, match_options=None):
+    """
+    Prepares a run that only reads what was appended since the checkpoint
+    (or everything, if the checkpoint cannot be trusted)
+    enriched_file: set when the caller appends the new rows' enrichment to
+    that file, so a run is only incremental if the file is still there
+    state_options: new_sales_state options (top_mode, distinct_mode, ...);
+    changing them forces a full rebuild like changing a filter
+    match_options: how the caller matches rows to the catalog; kept with
+    the enrichment, so changing them rebuilds the enriched file but they
+    are not part of the analytics filters
+    Returns: run dict whose 'rows' generator yields the new valid
+    transactions and folds them into run['state'] / run['summary'] as
+    they are consumed; pass the run to commit_increment afterwards
+    """
+
+    if expand_sales_files(filename) != [filename]:
+        raise ValueError(f"incremental runs follow one growing file, not a set of shards: {filename}")
+
+    state_options = state_options or {}
+    filters = {'region': region, 'min_amount': min_amount, 'max_amount': max_amount,
+               'state_options': state_options}
+    checkpoint = load_checkpoint(checkpoint_file)
+    start, reason = resume_offset(filename, checkpoint, filters, enriched_file, match_options)
+
+    if start:
+        state = sales_state_from_dict(checkpoint['state'])
+        summary = checkpoint['summary']
+        summary['regions'] = set(summary['regions'])
+        enrichment = checkpoint['enrichment']
+        if enrichment is not None:
+            enrichment['failed_products'] = set(enrichment['failed_products'])
+    else:
+        state = new_sales_state(**state_options)
+        summary = new_validation_summary()
+        enrichment = None
+
+    end = complete_lines_end(filename, start)
+
+    def rows():
+        lines = iter_sales_data(filename, start, end)
+        for t in iter_parse_and_validate(lines, region, min_amount, max_amount, summary):
+            update_sales_state(state, t)
+            yield t
+
+    return {
+        'source': os.path.abspath(filename),
+        'filters': filters,
+        'enriched_file': enriched_file,
+        'match_options': match_options,
+        'mode': 'incremental' if start else 'full',
+        'reason': reason,
+        'start': start,
+        'end': end,
+        'state': state,
+        'summary': summary,
+        'enrichment': enrichment,
+        'rows': rows()
+    }
+
+
+def commit_increment(run, checkpoint_file=CHECKPOINT_FILE, enrichment=None):
+    """
+    Drains any unread rows and saves the new checkpoint
+    enrichment: summary for the new rows only; it is added to the previous one
+    """
+
+    for _ in run['rows']:
+        pass
+
+    total = run['enrichment']
+    if enrichment is not None:
+        if total is None:
+            total = enrichment
+        else:
+            total['total'] += enrichment['total']
+            total['enriched_count'] += enrichment['enriched_count']
+            total['failed_products'] |= enrichment['failed_products']
+        run['enrichment'] = total
+
+    summary = dict(run['summary'])
+    summary['regions'] = sorted(summary['regions'])
+
+    save_checkpoint({
+        'version': CHECKPOINT_VERSION,
+        'source': run['source'],
+        'filters': run['filters'],
+        'enriched_file': run['enriched_file'] if total is not None else None,
+        'match_options': run['match_options'] if total is not None else None,
+        'offset': run['end'],
+        'fingerprint': file_fingerprint(run['source'], run['end']),
+        'summary': summary,
+        'state': sales_state_to_dict(run['state']),
+        'enrichment': None if total is None else {**total, 'failed_products': sorted(total['failed_products'])}
+    }, checkpoint_file)
+
+    return run
+
+
+def incremental_sales_state(filename, checkpoint_file=ANALYTICS_CHECKPOINT_FILE, region=None,
+                            min_amount=None, max_amount=None):
+    """
+    Analytics-only incremental run
+    Returns: the committed run dict (see open_increment)
+    """
+
+    run = open_increment(filename, checkpoint_file, region, min_amount, max_amount)
+    return commit_increment(run, checkpoint_file)
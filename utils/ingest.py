@@ -0,0 +1,106 @@
+# Run options and the single-pass aggregation shared by the pipeline and
+# the lighter subcommands (analyze, report, ingest, follow, serve); kept
+# apart from utils.pipeline so they do not import the enrichment, cache
+# and report stages
+
+from contextlib import nullcontext
+
+from utils.file_handler import iter_sales_files
+from utils.data_processor import (
+    iter_parse_and_validate,
+    iter_unique_transactions,
+    new_validation_summary,
+    new_sales_state,
+    update_sales_state
+)
+from utils.dedup import TransactionIndex
+
+
+# ---------- OPTIONS ----------
+
+def sales_state_options(options):
+    """
+    Returns: new_sales_state keyword arguments for the chosen top-N and
+    distinct-count modes (tuning values only when they are used)
+    """
+
+    state_options = {'top_mode': options.top_mode, 'distinct_mode': options.distinct_mode}
+    if options.top_mode == "approximate":
+        state_options['top_error'] = options.top_error
+    if options.distinct_mode == "approximate":
+        state_options['precision'] = options.distinct_precision
+    if options.cube:
+        state_options['cube'] = True
+    return state_options
+
+
+def filters(options):
+    """
+    Returns: (region, min_amount, max_amount) positional filter arguments
+    """
+
+    return options.region, options.min_amount, options.max_amount
+
+
+def product_match_options(options):
+    """
+    Returns: ProductResolver keyword arguments (how rows are matched to the catalog)
+    """
+
+    return {'match': options.product_match, 'threshold': options.match_threshold}
+
+
+def product_resolver(options, product_mapping):
+    # api_handler is already loaded by whoever fetched the product mapping
+    from utils.api_handler import ProductResolver
+    return ProductResolver(product_mapping, **product_match_options(options))
+
+
+def dedup_index(options):
+    """
+    Returns: a TransactionIndex to use as a context manager, or a null
+    context yielding None with --no-dedup
+    """
+
+    if not options.dedup:
+        return nullcontext()
+    return TransactionIndex(options.dedup_limit)
+
+
+# ---------- AGGREGATION ----------
+
+def print_duplicates(summary):
+    if summary['duplicates']:
+        print(f"✓ Dropped {summary['duplicates']} duplicate transactions")
+
+
+def save_sales_cube(state, options):
+    if state['cube'] is not None:
+        print(f"✓ Rollup cube saved to: {state['cube'].save(options.cube)}")
+
+
+def aggregate_input(options, product_mapping=None):
+    """
+    One streaming pass over the input file(s): parse, validate, filter,
+    drop duplicate TransactionIDs and aggregate, also counting catalog
+    matches when a product mapping is given
+    Returns: (aggregate state, validation summary, enrichment summary or None)
+    """
+
+    state = new_sales_state(**sales_state_options(options))
+    summary = new_validation_summary()
+    enrichment = None
+    if product_mapping is not None:
+        # Only the commands that count catalog matches load api_handler
+        from utils.api_handler import EnrichedTransaction, new_enrichment_summary, count_enrichment
+        enrichment = new_enrichment_summary()
+        resolve = product_resolver(options, product_mapping).resolve_transaction
+
+    with dedup_index(options) as index:
+        valid = iter_parse_and_validate(iter_sales_files(options.data_file), *filters(options), summary)
+        for t in iter_unique_transactions(valid, index, summary):
+            update_sales_state(state, t)
+            if enrichment is not None:
+                count_enrichment(enrichment, EnrichedTransaction(t, resolve(t)))
+
+    return state, summary, enrichment
@@ -0,0 +1,147 @@
+import io
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.defaults import METRICS_FILE, PROFILE_MODES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+PROFILE_DIR = "output/profile"
+
+
+def peak_rss_bytes():
+    """
+    Returns: the process's peak resident set size so far, or None if unknown
+    """
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PipelineMetrics:
+    """
+    Collects wall/CPU time, row counts, throughput and peak-RSS growth for
+    each pipeline stage, optionally with a cProfile or tracemalloc capture
+    per stage, and writes them as JSON
+    """
+
+    def __init__(self, profile=None, profile_dir=PROFILE_DIR):
+        if profile not in (None,) + PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {profile}")
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.stages = []
+        self.error = None
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Measures the block; set record['rows_out'] (and rows_in, if only
+        known afterwards) on the yielded dict
+        """
+
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        profiler = self._start_profile()
+        rss_before = peak_rss_bytes()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        try:
+            yield record
+            record["status"] = "ok"
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            self.error = {"stage": name, "error": record["error"]}
+            raise
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_start, 6)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+            rss_after = peak_rss_bytes()
+            record["peak_rss_delta_bytes"] = (
+                rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            )
+            rows = record["rows_in"] if record["rows_in"] is not None else record["rows_out"]
+            record["rows_per_sec"] = (
+                round(rows / record["wall_seconds"], 1) if rows and record["wall_seconds"] else None
+            )
+            self._stop_profile(profiler, record)
+            self.stages.append(record)
+
+    # ---------- PROFILING ----------
+
+    def _start_profile(self):
+        # The profilers are only imported when a profile is requested
+        if self.profile == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.profile == "tracemalloc":
+            import tracemalloc
+            tracemalloc.start()
+            return tracemalloc
+        return None
+
+    def _stop_profile(self, profiler, record):
+        if profiler is None:
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, f"{len(self.stages) + 1:02d}_{record['stage']}")
+
+        if self.profile == "cprofile":
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(15)
+            record["profile"] = {"file": base + ".prof", "top": text.getvalue().strip().splitlines()[-15:]}
+        else:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            top = snapshot.statistics("lineno")[:15]
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write("\n".join(str(stat) for stat in top) + "\n")
+            record["profile"] = {
+                "file": base + ".txt",
+                "traced_peak_bytes": peak,
+                "top": [str(stat) for stat in top[:5]]
+            }
+
+    # ---------- OUTPUT ----------
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "total_wall_seconds": round(sum(s["wall_seconds"] for s in self.stages), 6),
+            "total_cpu_seconds": round(sum(s["cpu_seconds"] for s in self.stages), 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "profile": self.profile,
+            "stages": self.stages
+        }
+
+    def write(self, path=METRICS_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
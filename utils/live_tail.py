@@ -0,0 +1,296 @@
+import glob
+import json
+import os
+import time
+from collections import deque
+
+from utils.file_handler import iter_sales_data, complete_lines_end
+from utils.data_processor import (
+    iter_parse_and_validate,
+    new_validation_summary,
+    finish_validation_summary,
+    new_sales_state,
+    update_sales_state,
+    merge_sales_states,
+    finalize_sales_state
+)
+from utils.incremental import file_fingerprint
+from utils.defaults import LIVE_SNAPSHOT_FILE, EMIT_INTERVAL, POLL_INTERVAL, ROLLING_PATTERN
+
+
+# name: (window length, pane length) in seconds; rows land in the pane of
+# the time they were read, and a window drops whole panes as they age out
+LIVE_WINDOWS = {
+    'last_hour': (3600, 60),
+    'last_24h': (86400, 900)
+}
+
+
+# ---------- SLIDING WINDOWS ----------
+
+class SlidingWindow:
+    """
+    Aggregates over the last `span` seconds as a ring of per-pane sales
+    states, so memory is bounded by span / pane panes and expiry never
+    has to undo individual rows
+    The window is exact to within one pane: it covers the current pane and
+    the ones that started less than span seconds before it
+    """
+
+    def __init__(self, span, pane, state_options=None):
+        self.span = span
+        self.pane = pane
+        self.state_options = state_options or {}
+        self.panes = deque()
+
+    def pane_start(self, now):
+        return now - now % self.pane
+
+    def add(self, t, now):
+        start = self.pane_start(now)
+        if not self.panes or self.panes[-1][0] != start:
+            self.panes.append((start, new_sales_state(**self.state_options)))
+        update_sales_state(self.panes[-1][1], t)
+
+    def expire(self, now):
+        oldest = self.pane_start(now) - self.span + self.pane
+        while self.panes and self.panes[0][0] < oldest:
+            self.panes.popleft()
+
+    def state(self, now):
+        """
+        Returns: one aggregate state for the whole window
+        """
+
+        self.expire(now)
+        merged = new_sales_state(**self.state_options)
+        for _, pane in self.panes:
+            merge_sales_states(merged, pane)
+        return merged
+
+
+class TodayWindow(SlidingWindow):
+    """
+    Aggregates since local midnight: a single pane that is replaced when
+    the date changes
+    """
+
+    def __init__(self, state_options=None):
+        super().__init__(86400, 86400, state_options)
+
+    def pane_start(self, now):
+        return time.mktime(time.localtime(now)[:3] + (0, 0, 0, 0, 0, -1))
+
+    def expire(self, now):
+        start = self.pane_start(now)
+        while self.panes and self.panes[0][0] != start:
+            self.panes.popleft()
+
+
+def new_live_windows(state_options=None, windows=None):
+    """
+    Returns: {name: window} for LIVE_WINDOWS (or the given {name: (span, pane)})
+    plus 'today'
+    """
+
+    result = {
+        name: SlidingWindow(span, pane, state_options)
+        for name, (span, pane) in (windows or LIVE_WINDOWS).items()
+    }
+    result['today'] = TodayWindow(state_options)
+    return result
+
+
+# ---------- FOLLOWING FILES ----------
+
+class SalesTail:
+    """
+    Follows one sales file, or every file matching pattern in a directory
+    of rolling files, and hands back the complete lines appended since the
+    last poll. A file that shrinks or is rewritten is read again from the
+    start; a file that disappears is forgotten
+    from_start=False skips whatever is already there when following starts
+    (files that appear later are always read in full)
+    """
+
+    def __init__(self, path, pattern=ROLLING_PATTERN, from_start=False):
+        self.path = path
+        self.pattern = pattern
+        self.positions = {}
+
+        if not from_start:
+            for filename in self.files():
+                end = complete_lines_end(filename)
+                self.positions[filename] = (end, file_fingerprint(filename, end))
+
+    def files(self):
+        if os.path.isdir(self.path):
+            return sorted(glob.glob(os.path.join(self.path, self.pattern)))
+        return [self.path] if os.path.exists(self.path) else []
+
+    def poll(self):
+        """
+        Returns: list of new raw lines across all followed files
+        """
+
+        lines = []
+        current = self.files()
+
+        for filename in set(self.positions) - set(current):
+            del self.positions[filename]
+
+        for filename in current:
+            try:
+                start = self._resume(filename)
+                end = complete_lines_end(filename, start)
+                if end > start:
+                    lines.extend(iter_sales_data(filename, start, end))
+                    self.positions[filename] = (end, file_fingerprint(filename, end))
+            except FileNotFoundError:
+                # Rotated away between listing and reading
+                self.positions.pop(filename, None)
+
+        return lines
+
+    def _resume(self, filename):
+        offset, fingerprint = self.positions.get(filename, (0, None))
+        if offset and (os.path.getsize(filename) < offset or
+                       file_fingerprint(filename, offset) != fingerprint):
+            return 0
+        return offset
+
+
+# ---------- LIVE AGGREGATES ----------
+
+class LiveAggregator:
+    """
+    Parses and validates each polled batch once and folds the valid rows
+    into every window
+    clock: returns the current time in seconds (time.time by default)
+    """
+
+    def __init__(self, tail, region=None, min_amount=None, max_amount=None,
+                 state_options=None, windows=None, clock=time.time):
+        self.tail = tail
+        self.filters = (region, min_amount, max_amount)
+        self.windows = new_live_windows(state_options, windows)
+        self.summary = new_validation_summary()
+        self.clock = clock
+        self.rows = 0
+        self.last_poll = None
+
+    def poll(self):
+        """
+        Returns: number of valid rows added
+        """
+
+        lines = self.tail.poll()
+        now = self.clock()
+        added = 0
+
+        for t in iter_parse_and_validate(lines, *self.filters, self.summary):
+            for window in self.windows.values():
+                window.add(t, now)
+            added += 1
+
+        self.rows += added
+        self.last_poll = now
+        return added
+
+    def snapshot(self, n=5):
+        """
+        Returns: JSON-ready dict with the region, top-product, top-customer
+        and daily-trend aggregates of every window
+        """
+
+        now = self.clock()
+        windows = {}
+
+        for name, window in self.windows.items():
+            s = finalize_sales_state(window.state(now), n)
+            windows[name] = {
+                'total_revenue': s['total_revenue'],
+                'transaction_count': s['transaction_count'],
+                'region_sales': s['region_sales'],
+                'top_products': s['top_products'],
+                'top_customers': [(c, info['total_spent'], info['purchase_count'])
+                                  for c, info in s['top_customers']],
+                'daily_trend': s['daily_trend']
+            }
+
+        return {
+            'generated_at': now,
+            'last_poll': self.last_poll,
+            'rows_seen': self.rows,
+            'validation': finish_validation_summary(self.summary),
+            'windows': windows
+        }
+
+
+# ---------- OUTPUT ----------
+
+def save_live_snapshot(snapshot, snapshot_file=LIVE_SNAPSHOT_FILE):
+    directory = os.path.dirname(snapshot_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Readers polling the file never see a half-written snapshot
+    tmp_file = snapshot_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_file, snapshot_file)
+
+
+def format_live_snapshot(snapshot):
+    """
+    Returns: a few lines summarising each window for the terminal
+    """
+
+    stamp = time.strftime('%H:%M:%S', time.localtime(snapshot['generated_at']))
+    lines = [f"[{stamp}] rows seen: {snapshot['rows_seen']}"]
+
+    for name, w in snapshot['windows'].items():
+        top = w['top_products'][0][0] if w['top_products'] else '-'
+        customer = w['top_customers'][0][0] if w['top_customers'] else '-'
+        regions = ", ".join(f"{r} {d['total_sales']:,.2f}" for r, d in w['region_sales'].items()) or '-'
+        lines.append(f"  {name:<10} {w['transaction_count']:>7} txns | {w['total_revenue']:>14,.2f} | "
+                     f"top product: {top} | top customer: {customer} | {regions}")
+
+    return "\n".join(lines)
+
+
+def follow(path, pattern=ROLLING_PATTERN, region=None, min_amount=None, max_amount=None,
+           state_options=None, interval=EMIT_INTERVAL, poll_interval=POLL_INTERVAL,
+           snapshot_file=LIVE_SNAPSHOT_FILE, from_start=False, duration=None):
+    """
+    Tails path (a file, or a directory of rolling files) and emits a fresh
+    snapshot every `interval` seconds until interrupted (or for `duration`
+    seconds). New rows are in the aggregates within poll_interval seconds
+    Returns: the last snapshot
+    """
+
+    live = LiveAggregator(SalesTail(path, pattern, from_start), region, min_amount, max_amount,
+                          state_options)
+    started = time.monotonic()
+    next_emit = started
+    snapshot = None
+
+    print(f"✓ Following {path} (snapshots every {interval:g}s to {snapshot_file})")
+
+    try:
+        while duration is None or time.monotonic() - started < duration:
+            live.poll()
+            now = time.monotonic()
+            if now >= next_emit:
+                snapshot = live.snapshot()
+                save_live_snapshot(snapshot, snapshot_file)
+                print(format_live_snapshot(snapshot), flush=True)
+                next_emit = max(next_emit + interval, now)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+    live.poll()
+    snapshot = live.snapshot()
+    save_live_snapshot(snapshot, snapshot_file)
+    return snapshot
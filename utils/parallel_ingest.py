@@ -0,0 +1,132 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+
+from utils.file_handler import iter_sales_records_mmap, split_byte_ranges, expand_sales_files
+from utils.data_processor import (
+    iter_valid_transactions,
+    new_validation_summary,
+    merge_validation_summaries,
+    finish_validation_summary,
+    print_filter_options,
+    new_sales_state,
+    update_sales_state,
+    merge_sales_states
+)
+
+
+def _process_chunk(filename, start, end, region, min_amount, max_amount, keep_transactions,
+                   state_options, keep_ids=False, skip=None):
+    """
+    Worker: parse, validate and aggregate one byte range
+    keep_ids: also return the TransactionIDs of the valid rows, in order
+    skip: positions (among the valid rows) to leave out of the aggregate
+    Returns: (valid transactions or None, TransactionIDs or None,
+    validation summary, aggregate state)
+    """
+
+    summary = new_validation_summary()
+    state = new_sales_state(**state_options)
+    valid = [] if keep_transactions else None
+    ids = [] if keep_ids else None
+
+    transactions = iter_sales_records_mmap(filename, start=start, end=end, rejected=summary['rejected'])
+    for i, t in enumerate(iter_valid_transactions(transactions, region, min_amount, max_amount, summary)):
+        if skip and i in skip:
+            continue
+        update_sales_state(state, t)
+        if keep_transactions:
+            valid.append(t)
+        if keep_ids:
+            ids.append(t.TransactionID)
+
+    return valid, ids, summary, state
+
+
+def shard_ranges(filename, chunks):
+    """
+    Splits every shard of filename (a file, directory or glob) into
+    line-aligned byte ranges, about `chunks` in all, in proportion to size
+    Returns: list of (shard, start, end) in input order
+    """
+
+    shards = expand_sales_files(filename)
+    if len(shards) == 1:
+        return [(shards[0], start, end) for start, end in split_byte_ranges(shards[0], chunks)]
+
+    sizes = [os.path.getsize(shard) for shard in shards]
+    total = sum(sizes) or 1
+    return [
+        (shard, start, end)
+        for shard, size in zip(shards, sizes)
+        for start, end in split_byte_ranges(shard, max(1, round(chunks * size / total)))
+    ]
+
+
+def parallel_ingest(filename, workers=None, region=None, min_amount=None, max_amount=None,
+                    keep_transactions=True, state_options=None, index=None):
+    """
+    Reads, parses, validates and aggregates a sales file, or many shard
+    files, on several cores
+    Each file is split into line-aligned byte ranges and each range is
+    handled by one process; partial results are merged in input order, so
+    the output matches the sequential pipeline exactly
+    state_options: new_sales_state options (top_mode, distinct_mode, ...)
+    index: TransactionIndex to drop duplicate TransactionIDs with, across
+    all ranges; workers send back only their IDs, and a range that had
+    duplicates is re-aggregated by a worker without them
+    Returns: (valid transactions or None, invalid count, summary, aggregate state)
+    """
+
+    workers = workers or os.cpu_count() or 1
+    state_options = state_options or {}
+    ranges = shard_ranges(filename, workers * 4)
+
+    summary = new_validation_summary()
+    state = new_sales_state(**state_options)
+    valid = [] if keep_transactions else None
+    keep_ids = index is not None and not keep_transactions
+    # Chunk states (or futures of re-aggregated ones) waiting to be merged
+    # in input order
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk_args = [
+            (shard, start, end, region, min_amount, max_amount, keep_transactions, state_options)
+            for shard, start, end in ranges
+        ]
+        futures = [pool.submit(_process_chunk, *args, keep_ids) for args in chunk_args]
+
+        for args, future in zip(chunk_args, futures):
+            chunk_valid, chunk_ids, chunk_summary, chunk_state = future.result()
+            merge_validation_summaries(summary, chunk_summary)
+            if index is not None:
+                if chunk_ids is None:
+                    chunk_ids = [t.TransactionID for t in chunk_valid]
+                seen = index.seen
+                skip = frozenset(i for i, tid in enumerate(chunk_ids) if seen(tid))
+                if skip:
+                    summary['duplicates'] += len(skip)
+                    summary['final_count'] -= len(skip)
+                    chunk_state = pool.submit(_process_chunk, *args[:6], False, state_options, skip=skip)
+                    if keep_transactions:
+                        chunk_valid = [t for i, t in enumerate(chunk_valid) if i not in skip]
+            if keep_transactions:
+                valid.extend(chunk_valid)
+
+            pending.append(chunk_state)
+            while pending and (not isinstance(pending[0], Future) or pending[0].done()):
+                _merge_chunk_state(state, pending.popleft())
+
+        while pending:
+            _merge_chunk_state(state, pending.popleft())
+
+    print_filter_options(summary)
+
+    return valid, summary['invalid'], finish_validation_summary(summary), state
+
+
+def _merge_chunk_state(state, chunk_state):
+    if isinstance(chunk_state, Future):
+        chunk_state = chunk_state.result()[3]
+    merge_sales_states(state, chunk_state)
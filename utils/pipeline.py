@@ -0,0 +1,469 @@
+# ================================
+# SALES ANALYTICS SYSTEM - PIPELINE
+# ================================
+
+from utils.file_handler import read_sales_data, iter_sales_files, iter_sales_records_mmap
+from utils.data_processor import (
+    aggregate_transactions,
+    iter_parse_and_validate,
+    iter_valid_transactions,
+    iter_unique_transactions,
+    iter_filtered_transactions,
+    print_filter_options,
+    finish_validation_summary,
+    aggregate_stream,
+    aggregate_parsed_stream,
+    new_validation_summary,
+    new_sales_state,
+    finalize_sales_state
+)
+from utils.incremental import open_increment, commit_increment
+from utils.api_handler import (
+    load_product_mapping,
+    enrich_sales_data,
+    save_enriched_data,
+    stream_enriched_data
+)
+from utils.enriched_format import ENRICHED_EXTENSIONS
+from utils.report_generator import generate_sales_report, report_paths
+from utils.instrumentation import PipelineMetrics
+from utils.stage_cache import StageCache, stage_key
+from utils.ingest import (
+    sales_state_options,
+    filters,
+    product_match_options,
+    product_resolver,
+    dedup_index,
+    print_duplicates,
+    save_sales_cube
+)
+from utils.transaction_record import transactions_to_columns, transactions_from_columns
+
+
+def run_pipeline(options):
+    """
+    Runs the ten-step pipeline (batch, streaming or incremental) and writes
+    the per-stage metrics whether or not it succeeds
+    """
+
+    if options.incremental:
+        title, pipeline = "SALES ANALYTICS SYSTEM (incremental)", run_incremental
+    elif options.stream:
+        title, pipeline = "SALES ANALYTICS SYSTEM (streaming)", run_streaming
+    elif options.cache and not options.workers:
+        title, pipeline = "SALES ANALYTICS SYSTEM", run_cached
+    else:
+        title, pipeline = "SALES ANALYTICS SYSTEM", run_batch
+
+    metrics = PipelineMetrics(options.profile)
+
+    try:
+        print("=" * 40)
+        print(title)
+        print("=" * 40)
+
+        pipeline(options, metrics)
+
+        # 10. Complete
+        with metrics.stage("complete"):
+            print("[10/10] Process Complete!")
+            print("=" * 40)
+
+    except Exception as e:
+        print("❌ An error occurred during execution")
+        if metrics.error:
+            print("Failed stage:", metrics.error["stage"])
+        print("Error details:", str(e))
+
+    finally:
+        print(f"Metrics saved to: {metrics.write(options.metrics)}")
+
+
+def run_batch(options, metrics):
+    if options.workers:
+        # 1-3. Read, parse and validate byte ranges on several cores
+        with metrics.stage("parallel_ingest") as stage:
+            print(f"[1/10] Reading sales data ({options.workers} workers)...")
+            print("[2/10] Parsing and cleaning data...")
+            print("[3/10] Filter Options Available:")
+            from utils.parallel_ingest import parallel_ingest
+            with dedup_index(options) as index:
+                valid_transactions, invalid_count, summary, state = parallel_ingest(
+                    options.data_file, options.workers, *filters(options),
+                    state_options=sales_state_options(options), index=index
+                )
+            print(f"✓ Parsed {summary['total_input']} records")
+            stage["rows_in"] = summary['total_input']
+            stage["rows_out"] = len(valid_transactions)
+    else:
+        # 1. Read sales data
+        with metrics.stage("read") as stage:
+            print("[1/10] Reading sales data...")
+            raw_data = read_sales_data(options.data_file)
+            print(f"✓ Successfully read {len(raw_data)} transactions")
+            stage["rows_out"] = len(raw_data)
+
+        # 2-3. Parse, clean and validate in one fused pass
+        with metrics.stage("parse_validate", len(raw_data)) as stage:
+            print("[2/10] Parsing and cleaning data...")
+            summary = new_validation_summary()
+            with dedup_index(options) as index:
+                valid = iter_parse_and_validate(raw_data, *filters(options), summary)
+                valid_transactions = list(iter_unique_transactions(valid, index, summary))
+            print(f"✓ Parsed {summary['total_input']} records")
+            print("[3/10] Filter Options Available:")
+            print_filter_options(summary)
+            summary = finish_validation_summary(summary)
+            state = None
+            stage["rows_out"] = len(valid_transactions)
+
+    # 4. Validation summary
+    with metrics.stage("validation_summary") as stage:
+        print("[4/10] Validating transactions...")
+        print(f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']}")
+        print_duplicates(summary)
+        stage["rejected"] = summary['rejected']
+        stage["duplicates"] = summary['duplicates']
+
+    # 5. Perform data analysis
+    with metrics.stage("analyze", len(valid_transactions)):
+        print("[5/10] Analyzing sales data...")
+        if state is None:
+            state = aggregate_transactions(valid_transactions, new_sales_state(**sales_state_options(options)))
+        snapshot = finalize_sales_state(state)
+        print("✓ Analysis complete")
+        save_sales_cube(state, options)
+
+    # 6. Fetch API data
+    with metrics.stage("fetch_catalog") as stage:
+        print("[6/10] Fetching product data from API...")
+        product_mapping, source = load_product_mapping(offline=options.offline, ttl=options.catalog_ttl)
+        print(f"✓ Fetched {len(product_mapping)} products (source: {source})")
+        stage["rows_out"] = len(product_mapping)
+        stage["source"] = source
+
+    # 7. Enrich sales data
+    with metrics.stage("enrich", len(valid_transactions)) as stage:
+        print("[7/10] Enriching sales data...")
+        enriched_transactions = enrich_sales_data(valid_transactions, product_mapping,
+                                                  product_resolver(options, product_mapping))
+        enriched_count = enriched_transactions.summary['enriched_count']
+        success_rate = (enriched_count / len(valid_transactions)) * 100 if valid_transactions else 0
+        print(f"✓ Enriched {enriched_count}/{len(valid_transactions)} transactions ({success_rate:.1f}%)")
+        stage["rows_out"] = enriched_count
+
+    # 8. Save enriched data
+    with metrics.stage("save_enriched", len(enriched_transactions)):
+        print("[8/10] Saving enriched data...")
+        enriched_file = options.enriched_file + ENRICHED_EXTENSIONS[options.enriched_format]
+        save_enriched_data(enriched_transactions, enriched_file, options.enriched_format)
+        print(f"✓ Saved to: {enriched_file}")
+
+    # 9. Generate report
+    with metrics.stage("report", len(valid_transactions)):
+        print("[9/10] Generating report...")
+        paths = generate_sales_report(valid_transactions, enriched_transactions, snapshot=snapshot,
+                                      output_file=options.output, formats=options.report_formats)
+        print(f"✓ Report saved to: {', '.join(paths.values())}")
+
+
+def run_cached(options, metrics):
+    """
+    The batch run, with each expensive stage looked up in the stage cache
+    first (see utils.stage_cache):
+    - validated rows (before filters), keyed by the input's content
+    - aggregate state, keyed by those rows, the filters and the state options
+    - enriched file, keyed by the rows, the filters and the catalog
+    - report files, keyed by the state and the enriched stage
+    Changing a filter re-filters the cached validated rows; with nothing
+    changed the input is never read
+    """
+
+    cache = StageCache(options.cache_dir, options.cache_limit * 1024 * 1024)
+    selection = {'filters': filters(options), 'dedup': options.dedup}
+    rows = {}
+
+    def selected_rows():
+        # Validated rows from the cache (or parsed now), then filtered
+        if not rows:
+            validated = cache.load(validated_key, "validated")
+            rows['source'] = "cache"
+            if validated is None:
+                validated = parse_validated(options.data_file)
+                cache.store(validated_key, validated)
+                rows['source'] = "parsed"
+            rows['lines'] = validated['lines']
+            rows['valid'], rows['summary'] = select_transactions(validated, options)
+        return rows['valid'], rows['summary']
+
+    # 1-3. Read, parse and validate unless the aggregates are cached
+    with metrics.stage("read_parse_validate") as stage:
+        print("[1/10] Reading sales data...")
+        validated_key = stage_key("validated", cache.input_digest(options.data_file))
+        state_key = stage_key("state", validated_key, selection, sales_state_options(options))
+        cached = cache.load(state_key, "state")
+        if cached is None:
+            valid_transactions, summary = selected_rows()
+            if rows['source'] == "parsed":
+                print(f"✓ Successfully read {rows['lines']} transactions")
+            else:
+                print(f"✓ Loaded the validated rows of {rows['lines']} transactions from cache")
+            stage["rows_out"] = len(valid_transactions)
+        else:
+            state, summary = cached
+            print("✓ Input unchanged, using cached aggregates")
+        stage["cache"] = "miss" if cached is None else "hit"
+
+        print("[2/10] Parsing and cleaning data...")
+        print(f"✓ Parsed {summary['total_input']} records")
+        print("[3/10] Filter Options Available:")
+        print_filter_options(summary)
+        summary = finish_validation_summary(summary)
+
+    # 4. Validation summary
+    with metrics.stage("validation_summary") as stage:
+        print("[4/10] Validating transactions...")
+        print(f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']}")
+        print_duplicates(summary)
+        stage["rejected"] = summary['rejected']
+        stage["duplicates"] = summary['duplicates']
+
+    # 5. Perform data analysis
+    with metrics.stage("analyze", summary['final_count']):
+        print("[5/10] Analyzing sales data...")
+        if cached is None:
+            state = aggregate_transactions(valid_transactions, new_sales_state(**sales_state_options(options)))
+            cache.store(state_key, (state, rows['summary']))
+        snapshot = finalize_sales_state(state)
+        print("✓ Analysis complete" if cached is None else "✓ Analysis complete (cached)")
+        save_sales_cube(state, options)
+
+    # 6. Fetch API data
+    with metrics.stage("fetch_catalog") as stage:
+        print("[6/10] Fetching product data from API...")
+        product_mapping, source = load_product_mapping(offline=options.offline, ttl=options.catalog_ttl)
+        print(f"✓ Fetched {len(product_mapping)} products (source: {source})")
+        stage["rows_out"] = len(product_mapping)
+        stage["source"] = source
+
+    # 7-8. Enrich and save, or restore the enriched file
+    with metrics.stage("enrich_and_save") as stage:
+        print("[7/10] Enriching sales data...")
+        enriched_file = options.enriched_file + ENRICHED_EXTENSIONS[options.enriched_format]
+        enriched_key = stage_key("enriched", validated_key, selection, stage_key("catalog", product_mapping),
+                                 product_match_options(options), options.enriched_format)
+        enrichment = cache.load(enriched_key, "enrichment")
+        if enrichment is None or not cache.restore_file(enriched_key, enriched_file, "enriched"):
+            valid_transactions = selected_rows()[0]
+            enriched_transactions = enrich_sales_data(valid_transactions, product_mapping,
+                                                  product_resolver(options, product_mapping))
+            save_enriched_data(enriched_transactions, enriched_file, options.enriched_format)
+            enrichment = enriched_transactions.summary
+            cache.store_file(enriched_key, enriched_file)
+            cache.store(enriched_key, enrichment)
+            stage["cache"] = "miss"
+        else:
+            stage["cache"] = "hit"
+        total = summary['final_count']
+        success_rate = (enrichment['enriched_count'] / total) * 100 if total else 0
+        print(f"✓ Enriched {enrichment['enriched_count']}/{total} transactions ({success_rate:.1f}%)")
+
+        print("[8/10] Saving enriched data...")
+        print(f"✓ Saved to: {enriched_file}")
+
+    # 9. Generate report, or restore it
+    with metrics.stage("report", summary['final_count']) as stage:
+        print("[9/10] Generating report...")
+        report_key = stage_key("report", state_key, enriched_key)
+        paths = report_paths(options.output, options.report_formats)
+        if all(cache.restore_file(stage_key(report_key, fmt), path, "report") for fmt, path in paths.items()):
+            stage["cache"] = "hit"
+        else:
+            paths = generate_sales_report(None, None, snapshot=snapshot, enrichment=enrichment,
+                                          output_file=options.output, formats=options.report_formats)
+            for fmt, path in paths.items():
+                cache.store_file(stage_key(report_key, fmt), path)
+            stage["cache"] = "miss"
+        print(f"✓ Report saved to: {', '.join(paths.values())}")
+
+
+def run_streaming(options, metrics):
+    """
+    Same ten steps as the batch run, but rows flow file -> parse ->
+    validate -> aggregate as generators, so memory does not grow with the
+    input file
+    """
+
+    # 1-2. Read, parse and aggregate in a single streaming pass
+    with metrics.stage("stream_aggregate") as stage:
+        print("[1/10] Streaming sales data...")
+        print("[2/10] Parsing, validating and aggregating...")
+        state = new_sales_state(**sales_state_options(options))
+        with dedup_index(options) as index:
+            if options.mmap:
+                summary = new_validation_summary()
+                records = iter_sales_files(options.data_file, iter_sales_records_mmap, rejected=summary['rejected'])
+                state, summary = aggregate_parsed_stream(records, *filters(options), state=state, summary=summary,
+                                                         index=index)
+            else:
+                lines = iter_sales_files(options.data_file)
+                state, summary = aggregate_stream(lines, *filters(options), state=state, index=index)
+        print(f"✓ Streamed {summary['total_input']} records")
+        stage["rows_in"] = summary['total_input']
+        stage["rows_out"] = summary['final_count']
+
+    # 3. Display filter options
+    with metrics.stage("filter_options"):
+        print("[3/10] Filter Options Available:")
+        print_filter_options(summary)
+
+    # 4. Validation summary
+    with metrics.stage("validation_summary") as stage:
+        print("[4/10] Validating transactions...")
+        print(f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']}")
+        print_duplicates(summary)
+        stage["rejected"] = summary['rejected']
+        stage["duplicates"] = summary['duplicates']
+
+    # 5. Perform data analysis
+    with metrics.stage("analyze", summary['final_count']):
+        print("[5/10] Analyzing sales data...")
+        snapshot = finalize_sales_state(state)
+        print("✓ Analysis complete")
+        save_sales_cube(state, options)
+
+    # 6. Fetch API data
+    with metrics.stage("fetch_catalog") as stage:
+        print("[6/10] Fetching product data from API...")
+        product_mapping, source = load_product_mapping(offline=options.offline, ttl=options.catalog_ttl)
+        print(f"✓ Fetched {len(product_mapping)} products (source: {source})")
+        stage["rows_out"] = len(product_mapping)
+        stage["source"] = source
+
+    # 7-8. Enrich and save in a second streaming pass
+    with metrics.stage("stream_enrich_and_save") as stage:
+        print("[7/10] Enriching sales data...")
+        if options.mmap:
+            records = iter_sales_files(options.data_file, iter_sales_records_mmap)
+            valid_stream = iter_valid_transactions(records, *filters(options))
+        else:
+            valid_stream = iter_parse_and_validate(iter_sales_files(options.data_file), *filters(options))
+        enriched_file = options.enriched_file + ENRICHED_EXTENSIONS[options.enriched_format]
+        with dedup_index(options) as index:
+            # Drops the same rows as the first pass
+            enrichment = stream_enriched_data(iter_unique_transactions(valid_stream, index), product_mapping,
+                                              enriched_file, options.enriched_format,
+                                              resolver=product_resolver(options, product_mapping))
+        success_rate = (enrichment['enriched_count'] / enrichment['total']) * 100 if enrichment['total'] else 0
+        print(f"✓ Enriched {enrichment['enriched_count']}/{enrichment['total']} transactions ({success_rate:.1f}%)")
+
+        print("[8/10] Saving enriched data...")
+        print(f"✓ Saved to: {enriched_file}")
+        stage["rows_in"] = enrichment['total']
+        stage["rows_out"] = enrichment['enriched_count']
+
+    # 9. Generate report
+    with metrics.stage("report", summary['final_count']):
+        print("[9/10] Generating report...")
+        paths = generate_sales_report(None, None, snapshot=snapshot, enrichment=enrichment,
+                                      output_file=options.output, formats=options.report_formats)
+        print(f"✓ Report saved to: {', '.join(paths.values())}")
+
+
+def run_incremental(options, metrics):
+    """
+    Streams only the rows appended since the last checkpoint and folds them
+    into the saved aggregates; falls back to a full rebuild when the input
+    was truncated, rotated or rewritten
+    """
+
+    # 1. Load the checkpoint and the product catalog (needed while streaming)
+    with metrics.stage("load_checkpoint") as stage:
+        print("[1/10] Loading checkpoint...")
+        enriched_file = options.enriched_file + ENRICHED_EXTENSIONS[options.enriched_format]
+        run = open_increment(options.data_file, options.checkpoint, *filters(options),
+                             enriched_file=enriched_file, state_options=sales_state_options(options),
+                             match_options=product_match_options(options))
+        print(f"✓ Mode: {run['mode']} ({run['reason']}), reading bytes {run['start']}-{run['end']}")
+        stage["mode"] = run['mode']
+        stage["bytes"] = run['end'] - run['start']
+
+    with metrics.stage("fetch_catalog") as stage:
+        print("[2/10] Fetching product data from API...")
+        product_mapping, source = load_product_mapping(offline=options.offline, ttl=options.catalog_ttl)
+        print(f"✓ Fetched {len(product_mapping)} products (source: {source})")
+        stage["rows_out"] = len(product_mapping)
+        stage["source"] = source
+
+    # 3-7. Parse, validate, aggregate and enrich the new rows in one pass
+    with metrics.stage("stream_new_rows") as stage:
+        print("[3/10] Parsing, validating, aggregating and enriching new rows...")
+        new_enrichment = stream_enriched_data(run['rows'], product_mapping, enriched_file,
+                                              options.enriched_format, append=run['mode'] == 'incremental',
+                                              resolver=product_resolver(options, product_mapping))
+        print(f"✓ Processed {new_enrichment['total']} new valid transactions")
+        stage["rows_out"] = new_enrichment['total']
+
+    with metrics.stage("save_checkpoint"):
+        print("[4/10] Saving checkpoint...")
+        commit_increment(run, options.checkpoint, new_enrichment)
+        summary = run['summary']
+        enrichment = run['enrichment']
+        print(f"✓ Saved to: {options.checkpoint}")
+
+    with metrics.stage("filter_options"):
+        print("[5/10] Filter Options Available:")
+        print_filter_options(summary)
+
+    with metrics.stage("validation_summary") as stage:
+        print("[6/10] Validating transactions...")
+        print(f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']}")
+        print_duplicates(summary)
+        stage["rejected"] = summary['rejected']
+        stage["duplicates"] = summary['duplicates']
+
+    with metrics.stage("analyze", summary['final_count']):
+        print("[7/10] Analyzing sales data...")
+        snapshot = finalize_sales_state(run['state'])
+        print("✓ Analysis complete")
+        save_sales_cube(run['state'], options)
+
+    with metrics.stage("enrichment_summary"):
+        success_rate = (enrichment['enriched_count'] / enrichment['total']) * 100 if enrichment['total'] else 0
+        print("[8/10] Enriched data...")
+        print(f"✓ Enriched {enrichment['enriched_count']}/{enrichment['total']} transactions ({success_rate:.1f}%)")
+        print(f"✓ Saved to: {enriched_file}")
+
+    # 9. Generate report
+    with metrics.stage("report", summary['final_count']):
+        print("[9/10] Generating report...")
+        paths = generate_sales_report(None, None, snapshot=snapshot, enrichment=enrichment,
+                                      output_file=options.output, formats=options.report_formats)
+        print(f"✓ Report saved to: {', '.join(paths.values())}")
+
+
+def parse_validated(data_file):
+    """
+    Reads, parses and validates the input without any filters
+    Returns: the cacheable validated stage: {'lines', 'columns', 'summary'}
+    """
+
+    raw_data = read_sales_data(data_file)
+    summary = new_validation_summary()
+    valid = list(iter_parse_and_validate(raw_data, summary=summary))
+    return {'lines': len(raw_data), 'columns': transactions_to_columns(valid), 'summary': summary}
+
+
+def select_transactions(validated, options):
+    """
+    Applies the run's filters and deduplication to a validated stage
+    Returns: (transactions, validation summary) as the fused stage would
+    have produced them with those filters
+    """
+
+    base = validated['summary']
+    summary = dict(base, final_count=0, regions=set(base['regions']), rejected=dict(base['rejected']))
+    valid = iter_filtered_transactions(transactions_from_columns(validated['columns']), *filters(options), summary)
+
+    with dedup_index(options) as index:
+        return list(iter_unique_transactions(valid, index, summary)), summary
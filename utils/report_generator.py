@@ -1,139 +1,143 @@
+import os
 from datetime import datetime
-from collections import defaultdict
 
+from utils.data_processor import build_sales_snapshot
+from utils.report_renderers import REPORT_RENDERERS, REPORT_EXTENSIONS
 
-def generate_sales_report(transactions, enriched_transactions, output_file="output/sales_report.txt"):
+
+def build_report_model(snapshot, enrichment, generated=None):
+    """
+    Lays out the report once from a finished snapshot and enrichment
+    summary; every renderer formats this model and computes nothing
+    enrichment: None leaves the API enrichment section out
+    Returns: JSON-serialisable dict of report sections
+    """
+
+    first_date, last_date = snapshot['date_range']
+    peak_date, peak_revenue, peak_count = snapshot['peak_day']
+    top_error = snapshot['top_error']
+    approximate = snapshot['top_mode'] == "approximate"
+
+    return {
+        'generated': generated or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'summary': {
+            'total_revenue': snapshot['total_revenue'],
+            'total_transactions': snapshot['transaction_count'],
+            'avg_order_value': snapshot['avg_order_value'],
+            'first_date': first_date,
+            'last_date': last_date
+        },
+        'regions': [
+            {
+                'region': r,
+                'total_sales': d['total_sales'],
+                'percentage': d['percentage'],
+                'transactions': d['transaction_count']
+            }
+            for r, d in snapshot['region_sales'].items()
+        ],
+        'top_products': {
+            'approximate': approximate,
+            'error': top_error['products'],
+            'rows': [
+                {'rank': i, 'product': p, 'quantity': qty, 'revenue': rev}
+                for i, (p, qty, rev) in enumerate(snapshot['top_products'], 1)
+            ]
+        },
+        'top_customers': {
+            'approximate': approximate,
+            'error': top_error['customers'],
+            'rows': [
+                {'rank': i, 'customer': c, 'total_spent': d['total_spent'], 'orders': d['purchase_count']}
+                for i, (c, d) in enumerate(snapshot['top_customers'][:5], 1)
+            ]
+        },
+        'daily_trend': {
+            'approximate': snapshot['distinct_mode'] == "approximate",
+            'error': snapshot['distinct_error'],
+            'rows': [
+                {
+                    'date': d,
+                    'revenue': info['revenue'],
+                    'transactions': info['transaction_count'],
+                    'unique_customers': info['unique_customers']
+                }
+                for d, info in snapshot['daily_trend'].items()
+            ]
+        },
+        'peak_day': {'date': peak_date, 'revenue': peak_revenue, 'transactions': peak_count},
+        'low_products': [
+            {'product': p, 'quantity': d['qty']}
+            for p, d in snapshot['product_totals'].items() if d['qty'] < 10
+        ],
+        'enrichment': None if enrichment is None else {
+            'total': enrichment['total'],
+            'enriched_count': enrichment['enriched_count'],
+            'success_rate': (enrichment['enriched_count'] / enrichment['total']) * 100 if enrichment['total'] else 0,
+            'failed_products': sorted(enrichment['failed_products'])
+        }
+    }
+
+
+def write_report(model, output_file="output/sales_report.txt", formats=("text",)):
+    """
+    Renders the model in every requested format; each file is built in
+    memory and written with a single call
+    output_file: path of the text report; other formats swap the extension
+    Returns: {format: path written}
+    """
+
+    paths = report_paths(output_file, formats)
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    for fmt, path in paths.items():
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(REPORT_RENDERERS[fmt](model))
+
+    return paths
+
+
+def report_paths(output_file="output/sales_report.txt", formats=("text",)):
+    """
+    Returns: {format: path} where each format's report goes
+    """
+
+    base = os.path.splitext(output_file)[0]
+    paths = {}
+
+    for fmt in formats:
+        if fmt not in REPORT_RENDERERS:
+            raise ValueError(f"Unknown report format: {fmt}")
+        paths[fmt] = output_file if fmt == "text" else base + REPORT_EXTENSIONS[fmt]
+
+    return paths
+
+
+def generate_sales_report(transactions, enriched_transactions, output_file="output/sales_report.txt",
+                          snapshot=None, enrichment=None, formats=("text",), **state_options):
     """
     Generates a comprehensive formatted sales report
+    Reads every metric from the aggregate snapshot (built here if not given)
+    and the enrichment summary (summarized here if not given), so streaming
+    runs can pass None for both transaction lists; with neither enriched
+    transactions nor a summary the enrichment section is left out
+    formats: any of text, json, csv, html; all are rendered from one model
+    state_options pick exact or sketch-based top-N and unique-customer
+    counts when the snapshot is built here (see new_sales_state); a given
+    snapshot keeps the modes it was built with
+    Returns: {format: path written}
     """
 
-    # ---------- PRE-CALCULATIONS ----------
-    total_transactions = len(transactions)
-    total_revenue = sum(t['Quantity'] * t['UnitPrice'] for t in transactions)
-    avg_order_value = total_revenue / total_transactions if total_transactions else 0
-
-    dates = [t['Date'] for t in transactions]
-    date_range = f"{min(dates)} to {max(dates)}"
-
-    # ---------- REGION-WISE ----------
-    region_data = defaultdict(lambda: {"sales": 0, "count": 0})
-    for t in transactions:
-        amt = t['Quantity'] * t['UnitPrice']
-        r = t['Region']
-        region_data[r]["sales"] += amt
-        region_data[r]["count"] += 1
-
-    region_sorted = sorted(
-        region_data.items(),
-        key=lambda x: x[1]["sales"],
-        reverse=True
-    )
-
-    # ---------- PRODUCT AGGREGATION ----------
-    product_data = defaultdict(lambda: {"qty": 0, "rev": 0})
-    for t in transactions:
-        product_data[t['ProductName']]["qty"] += t['Quantity']
-        product_data[t['ProductName']]["rev"] += t['Quantity'] * t['UnitPrice']
-
-    top_products = sorted(
-        product_data.items(),
-        key=lambda x: x[1]["qty"],
-        reverse=True
-    )[:5]
-
-    # ---------- CUSTOMER AGGREGATION ----------
-    customer_data = defaultdict(lambda: {"spent": 0, "count": 0})
-    for t in transactions:
-        amt = t['Quantity'] * t['UnitPrice']
-        customer_data[t['CustomerID']]["spent"] += amt
-        customer_data[t['CustomerID']]["count"] += 1
-
-    top_customers = sorted(
-        customer_data.items(),
-        key=lambda x: x[1]["spent"],
-        reverse=True
-    )[:5]
-
-    # ---------- DAILY TREND ----------
-    daily_data = defaultdict(lambda: {"rev": 0, "count": 0, "customers": set()})
-    for t in transactions:
-        d = t['Date']
-        amt = t['Quantity'] * t['UnitPrice']
-        daily_data[d]["rev"] += amt
-        daily_data[d]["count"] += 1
-        daily_data[d]["customers"].add(t['CustomerID'])
-
-    daily_sorted = sorted(daily_data.items())
-
-    best_day = max(daily_sorted, key=lambda x: x[1]["rev"])
-
-    # ---------- API ENRICHMENT ----------
-    enriched_count = sum(1 for t in enriched_transactions if t["API_Match"])
-    success_rate = (enriched_count / len(enriched_transactions)) * 100 if enriched_transactions else 0
-
-    failed_products = sorted(
-        set(t["ProductName"] for t in enriched_transactions if not t["API_Match"])
-    )
-
-    # ---------- WRITE REPORT ----------
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("=" * 45 + "\n")
-        f.write("SALES ANALYTICS REPORT\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Records Processed: {total_transactions}\n")
-        f.write("=" * 45 + "\n\n")
-
-        f.write("OVERALL SUMMARY\n")
-        f.write("-" * 45 + "\n")
-        f.write(f"Total Revenue: {total_revenue:,.2f}\n")
-        f.write(f"Total Transactions: {total_transactions}\n")
-        f.write(f"Average Order Value: {avg_order_value:,.2f}\n")
-        f.write(f"Date Range: {date_range}\n\n")
-
-        f.write("REGION-WISE PERFORMANCE\n")
-        f.write("-" * 45 + "\n")
-        f.write("Region | Total Sales | % of Total | Transactions\n")
-        for r, d in region_sorted:
-            percent = (d["sales"] / total_revenue) * 100
-            f.write(f"{r} | {d['sales']:,.2f} | {percent:.2f}% | {d['count']}\n")
-        f.write("\n")
-
-        f.write("TOP 5 PRODUCTS\n")
-        f.write("-" * 45 + "\n")
-        f.write("Rank | Product | Quantity | Revenue\n")
-        for i, (p, d) in enumerate(top_products, 1):
-            f.write(f"{i} | {p} | {d['qty']} | {d['rev']:,.2f}\n")
-        f.write("\n")
-
-        f.write("TOP 5 CUSTOMERS\n")
-        f.write("-" * 45 + "\n")
-        f.write("Rank | Customer | Total Spent | Orders\n")
-        for i, (c, d) in enumerate(top_customers, 1):
-            f.write(f"{i} | {c} | {d['spent']:,.2f} | {d['count']}\n")
-        f.write("\n")
-
-        f.write("DAILY SALES TREND\n")
-        f.write("-" * 45 + "\n")
-        f.write("Date | Revenue | Transactions | Unique Customers\n")
-        for d, info in daily_sorted:
-            f.write(f"{d} | {info['rev']:,.2f} | {info['count']} | {len(info['customers'])}\n")
-        f.write("\n")
-
-        f.write("PRODUCT PERFORMANCE ANALYSIS\n")
-        f.write("-" * 45 + "\n")
-        f.write(f"Best Selling Day: {best_day[0]} ({best_day[1]['rev']:,.2f})\n")
-        f.write("Low Performing Products:\n")
-        for p, d in product_data.items():
-            if d["qty"] < 10:
-                f.write(f"- {p} ({d['qty']} units)\n")
-        f.write("\n")
-
-        f.write("API ENRICHMENT SUMMARY\n")
-        f.write("-" * 45 + "\n")
-        f.write(f"Total Products Enriched: {enriched_count}\n")
-        f.write(f"Success Rate: {success_rate:.2f}%\n")
-        f.write("Products Not Enriched:\n")
-        for p in failed_products:
-            f.write(f"- {p}\n")
+    if snapshot is None:
+        snapshot = build_sales_snapshot(transactions, **state_options)
+    if enrichment is None and enriched_transactions is not None:
+        # Enriched rows come from api_handler, so it is already loaded
+        from utils.api_handler import summarize_enrichment
+        enrichment = summarize_enrichment(enriched_transactions)
+
+    paths = write_report(build_report_model(snapshot, enrichment), output_file, formats)
 
     print("Sales report generated successfully")
+    return paths
@@ -0,0 +1,202 @@
+import csv
+import html
+import io
+import json
+
+
+# ---------------- TEXT ----------------
+
+def render_text(model):
+    """
+    Returns: the classic fixed-layout text report
+    """
+
+    out = []
+    w = out.append
+    summary = model['summary']
+
+    w("=" * 45 + "\n")
+    w("SALES ANALYTICS REPORT\n")
+    w(f"Generated: {model['generated']}\n")
+    w(f"Records Processed: {summary['total_transactions']}\n")
+    w("=" * 45 + "\n\n")
+
+    w("OVERALL SUMMARY\n")
+    w("-" * 45 + "\n")
+    w(f"Total Revenue: {summary['total_revenue']:,.2f}\n")
+    w(f"Total Transactions: {summary['total_transactions']}\n")
+    w(f"Average Order Value: {summary['avg_order_value']:,.2f}\n")
+    w(f"Date Range: {summary['first_date']} to {summary['last_date']}\n\n")
+
+    w("REGION-WISE PERFORMANCE\n")
+    w("-" * 45 + "\n")
+    w("Region | Total Sales | % of Total | Transactions\n")
+    for r in model['regions']:
+        w(f"{r['region']} | {r['total_sales']:,.2f} | {r['percentage']:.2f}% | {r['transactions']}\n")
+    w("\n")
+
+    top = model['top_products']
+    w("TOP 5 PRODUCTS\n")
+    w("-" * 45 + "\n")
+    if top['approximate']:
+        w(f"(approximate: quantities may be overstated by up to {top['error']})\n")
+    w("Rank | Product | Quantity | Revenue\n")
+    for p in top['rows']:
+        w(f"{p['rank']} | {p['product']} | {p['quantity']} | {p['revenue']:,.2f}\n")
+    w("\n")
+
+    top = model['top_customers']
+    w("TOP 5 CUSTOMERS\n")
+    w("-" * 45 + "\n")
+    if top['approximate']:
+        w(f"(approximate: totals may be overstated by up to {top['error']:,.2f})\n")
+    w("Rank | Customer | Total Spent | Orders\n")
+    for c in top['rows']:
+        w(f"{c['rank']} | {c['customer']} | {c['total_spent']:,.2f} | {c['orders']}\n")
+    w("\n")
+
+    daily = model['daily_trend']
+    w("DAILY SALES TREND\n")
+    w("-" * 45 + "\n")
+    if daily['approximate']:
+        w(f"(approximate unique customers, ±{daily['error']:.1%} standard error)\n")
+    w("Date | Revenue | Transactions | Unique Customers\n")
+    for d in daily['rows']:
+        w(f"{d['date']} | {d['revenue']:,.2f} | {d['transactions']} | {d['unique_customers']}\n")
+    w("\n")
+
+    peak = model['peak_day']
+    w("PRODUCT PERFORMANCE ANALYSIS\n")
+    w("-" * 45 + "\n")
+    w(f"Best Selling Day: {peak['date']} ({peak['revenue']:,.2f})\n")
+    w("Low Performing Products:\n")
+    for p in model['low_products']:
+        w(f"- {p['product']} ({p['quantity']} units)\n")
+    w("\n")
+
+    enrichment = model['enrichment']
+    if enrichment is None:
+        return "".join(out)
+
+    w("API ENRICHMENT SUMMARY\n")
+    w("-" * 45 + "\n")
+    w(f"Total Products Enriched: {enrichment['enriched_count']}\n")
+    w(f"Success Rate: {enrichment['success_rate']:.2f}%\n")
+    w("Products Not Enriched:\n")
+    for p in enrichment['failed_products']:
+        w(f"- {p}\n")
+
+    return "".join(out)
+
+
+# ---------------- JSON ----------------
+
+def render_json(model):
+    return json.dumps(model, indent=2) + "\n"
+
+
+# ---------------- TABLES (shared by CSV and HTML) ----------------
+
+def report_tables(model):
+    """
+    Flattens the report model into named tables
+    Returns: list of (title, column names, rows)
+    """
+
+    summary = model['summary']
+    enrichment = model['enrichment']
+    peak = model['peak_day']
+
+    overview = [
+        ("Generated", model['generated']),
+        ("Total Revenue", summary['total_revenue']),
+        ("Total Transactions", summary['total_transactions']),
+        ("Average Order Value", summary['avg_order_value']),
+        ("First Date", summary['first_date']),
+        ("Last Date", summary['last_date']),
+        ("Best Selling Day", peak['date']),
+        ("Best Day Revenue", peak['revenue']),
+        ("Top-N Mode", "approximate" if model['top_products']['approximate'] else "exact"),
+        ("Unique Customer Counts", "approximate" if model['daily_trend']['approximate'] else "exact")
+    ]
+    if enrichment is not None:
+        overview[8:8] = [
+            ("Products Enriched", enrichment['enriched_count']),
+            ("Enrichment Success Rate", enrichment['success_rate'])
+        ]
+
+    tables = [
+        ("Overall Summary", ["Metric", "Value"], overview),
+        ("Region-wise Performance", ["Region", "Total Sales", "% of Total", "Transactions"],
+         [(r['region'], r['total_sales'], r['percentage'], r['transactions']) for r in model['regions']]),
+        ("Top Products", ["Rank", "Product", "Quantity", "Revenue"],
+         [(p['rank'], p['product'], p['quantity'], p['revenue']) for p in model['top_products']['rows']]),
+        ("Top Customers", ["Rank", "Customer", "Total Spent", "Orders"],
+         [(c['rank'], c['customer'], c['total_spent'], c['orders']) for c in model['top_customers']['rows']]),
+        ("Daily Sales Trend", ["Date", "Revenue", "Transactions", "Unique Customers"],
+         [(d['date'], d['revenue'], d['transactions'], d['unique_customers'])
+          for d in model['daily_trend']['rows']]),
+        ("Low Performing Products", ["Product", "Quantity"],
+         [(p['product'], p['quantity']) for p in model['low_products']])
+    ]
+    if enrichment is not None:
+        tables.append(("Products Not Enriched", ["Product"], [(p,) for p in enrichment['failed_products']]))
+    return tables
+
+
+# ---------------- CSV ----------------
+
+def render_csv(model):
+    """
+    Returns: one long-format CSV (section, then that table's columns) so a
+    dashboard can load every table from a single file
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    for title, columns, rows in report_tables(model):
+        writer.writerow(["section"] + columns)
+        writer.writerows([title] + list(row) for row in rows)
+        buffer.write("\n")
+
+    return buffer.getvalue()
+
+
+# ---------------- HTML ----------------
+
+def _html_cell(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return html.escape(str(value))
+
+
+def render_html(model):
+    out = [
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n",
+        "<title>Sales Analytics Report</title>\n</head>\n<body>\n",
+        "<h1>Sales Analytics Report</h1>\n",
+        f"<p>Generated: {html.escape(model['generated'])}</p>\n"
+    ]
+
+    for title, columns, rows in report_tables(model):
+        out.append(f"<h2>{html.escape(title)}</h2>\n<table>\n<tr>")
+        out.extend(f"<th>{html.escape(c)}</th>" for c in columns)
+        out.append("</tr>\n")
+        for row in rows:
+            out.append("<tr>" + "".join(f"<td>{_html_cell(v)}</td>" for v in row) + "</tr>\n")
+        out.append("</table>\n")
+
+    out.append("</body>\n</html>\n")
+    return "".join(out)
+
+
+# ---------------- REGISTRY ----------------
+
+REPORT_RENDERERS = {"text": render_text, "json": render_json, "csv": render_csv, "html": render_html}
+REPORT_EXTENSIONS = {"text": ".txt", "json": ".json", "csv": ".csv", "html": ".html"}
+
+
+def register_report_format(name, renderer, extension):
+    REPORT_RENDERERS[name] = renderer
+    REPORT_EXTENSIONS[name] = extension
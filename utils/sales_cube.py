@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+from datetime import date
+from operator import itemgetter
+
+from utils.transaction_record import as_transaction
+from utils.defaults import CUBE_FILE
+
+
+CUBE_VERSION = 1
+
+CUBE_DIMENSIONS = ('Region', 'ProductID', 'CustomerID')
+GRAINS = ('day', 'week', 'month', 'all')
+MEASURES = ('revenue', 'quantity', 'transactions')
+
+
+def period_of(day, grain):
+    """
+    Maps a YYYY-MM-DD date to its period at the given grain
+    Returns: YYYY-MM-DD, YYYY-Www (ISO week), YYYY-MM or 'all'; every
+    format sorts chronologically as a string
+    """
+
+    if grain == 'day':
+        return day
+    if grain == 'month':
+        return day[:7]
+    if grain == 'week':
+        try:
+            year, week, _ = date.fromisoformat(day).isocalendar()
+        except ValueError:
+            # Dates are not format-checked on ingest; keep odd ones as their own period
+            return day
+        return f"{year}-W{week:02d}"
+    if grain == 'all':
+        return 'all'
+    raise ValueError(f"Unknown grain: {grain}")
+
+
+def _can_roll_up(source, target):
+    # Days roll up into weeks and months, everything rolls up into 'all'
+    return source == target or source == 'day' or target == 'all'
+
+
+def _rollup(cells, source_grain, source_dims, grain, dims, into=None):
+    """
+    Aggregates one cuboid's cells into a coarser grain and/or fewer dimensions
+    Returns: the target cells (into, or a new dict)
+    """
+
+    result = {} if into is None else into
+    getter = itemgetter(0, *(source_dims.index(d) + 1 for d in dims)) if dims else None
+    periods = {}
+
+    for key, (revenue, quantity, count) in cells.items():
+        new_key = getter(key) if getter else (key[0],)
+        if grain != source_grain:
+            period = periods.get(new_key[0])
+            if period is None:
+                period = periods[new_key[0]] = period_of(new_key[0], grain)
+            new_key = (period,) + new_key[1:]
+
+        cell = result.get(new_key)
+        if cell is None:
+            result[new_key] = [revenue, quantity, count]
+        else:
+            cell[0] += revenue
+            cell[1] += quantity
+            cell[2] += count
+
+    return result
+
+
+def _add_cell(cells, key, revenue, quantity, count):
+    cell = cells.get(key)
+    if cell is None:
+        cells[key] = [revenue, quantity, count]
+    else:
+        cell[0] += revenue
+        cell[1] += quantity
+        cell[2] += count
+
+
+class SalesCube:
+    """
+    Materialized rollup cube of revenue, quantity and transaction count
+    The base cells are keyed by (Date, Region, ProductID, CustomerID). Each
+    (grain, dimension subset) cuboid is materialized the first time a query
+    needs it, from the smallest cuboid already held that can be rolled up
+    into it, and is then kept: rows added later are rolled into every held
+    cuboid on the next query, so the cube stays current without rebuilds
+    """
+
+    def __init__(self):
+        self.base = {}
+        self.product_names = {}
+        self.cuboids = {('day', CUBE_DIMENSIONS): self.base}
+        self._pending = {}
+
+    # ---------- BUILDING ----------
+
+    def add(self, t):
+        t = as_transaction(t)
+        q = t.Quantity
+        p = t.ProductID
+        key = (t.Date, t.Region, p, t.CustomerID)
+        amt = t.Amount
+
+        cell = self.base.get(key)
+        if cell is None:
+            self.base[key] = [amt, q, 1]
+            if p not in self.product_names:
+                self.product_names[p] = t.ProductName
+        else:
+            cell[0] += amt
+            cell[1] += q
+            cell[2] += 1
+
+        if len(self.cuboids) > 1:
+            _add_cell(self._pending, key, amt, q, 1)
+
+    def add_all(self, transactions):
+        for t in transactions:
+            self.add(t)
+        return self
+
+    def merge(self, other):
+        """
+        Folds another cube (e.g. a parallel chunk's) into this one
+        Returns: self
+        """
+
+        for key, (revenue, quantity, count) in other.base.items():
+            _add_cell(self.base, key, revenue, quantity, count)
+            if len(self.cuboids) > 1:
+                _add_cell(self._pending, key, revenue, quantity, count)
+        for p, name in other.product_names.items():
+            self.product_names.setdefault(p, name)
+        return self
+
+    def refresh(self):
+        """
+        Rolls the rows added since the last refresh into every held cuboid
+        """
+
+        if not self._pending:
+            return
+        for (grain, dims), cells in self.cuboids.items():
+            if cells is not self.base:
+                _rollup(self._pending, 'day', CUBE_DIMENSIONS, grain, dims, into=cells)
+        self._pending = {}
+
+    def cuboid(self, grain, dims):
+        """
+        Returns: the cells of one cuboid, {(period, *dims values): [revenue, quantity, count]}
+        """
+
+        self.refresh()
+        cells = self.cuboids.get((grain, dims))
+        if cells is None:
+            sources = [
+                (source_grain, source_dims) for source_grain, source_dims in self.cuboids
+                if _can_roll_up(source_grain, grain) and set(dims) <= set(source_dims)
+            ]
+            source = min(sources, key=lambda cid: len(self.cuboids[cid]))
+            cells = self.cuboids[(grain, dims)] = _rollup(self.cuboids[source], *source, grain, dims)
+        return cells
+
+    # ---------- QUERIES ----------
+
+    def query(self, by=(), grain='all', where=None, start_date=None, end_date=None):
+        """
+        Roll-up, slice and dice in one call
+        by: dimensions to group by (roll-up drops the rest); grain: period
+        size; where: {dimension: value or collection of values} (a single
+        value slices, several dice); start_date/end_date keep the days in
+        the range, which are then rolled up to the grain (a period at the
+        edge of the range only counts its days inside it)
+        Returns: {(period, *by values): {'revenue', 'quantity', 'transactions'}}
+        sorted by period, then by the grouped values
+        """
+
+        where = {dim: _as_set(v) for dim, v in (where or {}).items()}
+        for dim in list(by) + list(where):
+            if dim not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dim}")
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain: {grain}")
+
+        dims = tuple(d for d in CUBE_DIMENSIONS if d in by or d in where)
+        # A date range is applied to day cells, so coarser periods are only
+        # rolled up from the days inside it
+        dated = bool(start_date or end_date)
+        cells = self.cuboid('day' if dated else grain, dims)
+
+        by_index = [dims.index(d) + 1 for d in by]
+        checks = [(dims.index(d) + 1, allowed) for d, allowed in where.items()]
+        periods = {}
+
+        result = {}
+        for key, (revenue, quantity, count) in cells.items():
+            period = key[0]
+            if dated:
+                if start_date and period < start_date or end_date and period > end_date:
+                    continue
+                if grain != 'day':
+                    day = period
+                    period = periods.get(day)
+                    if period is None:
+                        period = periods[day] = period_of(day, grain)
+            if any(key[i] not in allowed for i, allowed in checks):
+                continue
+            _add_cell(result, (period,) + tuple(key[i] for i in by_index), revenue, quantity, count)
+
+        return {
+            key: dict(zip(MEASURES, values))
+            for key, values in sorted(result.items(), key=lambda x: tuple(map(str, x[0])))
+        }
+
+    def slice(self, dimension, value, by=(), grain='all'):
+        return self.query(by, grain, {dimension: value})
+
+    def dice(self, by=(), grain='all', start_date=None, end_date=None, **where):
+        return self.query(by, grain, where, start_date, end_date)
+
+    def rollup(self, by=(), grain='all'):
+        return self.query(by, grain)
+
+    def top(self, dimension, n=5, measure='revenue', where=None, start_date=None, end_date=None):
+        """
+        Returns: [(value, measures)] of the n largest values of dimension
+        over the whole filtered range, e.g. top products in the North in December
+        """
+
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure: {measure}")
+        totals = {
+            key[1]: values
+            for key, values in self.query((dimension,), 'all', where, start_date, end_date).items()
+        }
+
+        return sorted(totals.items(), key=lambda x: x[1][measure], reverse=True)[:n]
+
+    # ---------- PERSISTENCE ----------
+
+    def to_dict(self):
+        return {
+            'version': CUBE_VERSION,
+            'product_names': self.product_names,
+            'cells': [list(key) + values for key, values in self.base.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != CUBE_VERSION:
+            raise ValueError("unsupported sales cube version")
+        cube = cls()
+        cube.product_names = dict(data['product_names'])
+        for row in data['cells']:
+            cube.base[tuple(row[:4])] = list(row[4:])
+        return cube
+
+    def save(self, path=CUBE_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_file, path)
+        return path
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def _as_set(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return set(value)
+    return {value}
+
+
+# ---------- COMMAND LINE ----------
+
+def main(argv=None):
+    """
+    Queries a saved cube, e.g.
+    python -m utils.sales_cube --by Region --grain week
+    python -m utils.sales_cube --top ProductID --where Region=North --start 2024-12-01 --end 2024-12-31
+    """
+
+    parser = argparse.ArgumentParser(description="Query the saved sales cube")
+    parser.add_argument("--cube", default=CUBE_FILE)
+    parser.add_argument("--by", action="append", default=[], choices=CUBE_DIMENSIONS)
+    parser.add_argument("--grain", default="all", choices=GRAINS)
+    parser.add_argument("--where", action="append", default=[], metavar="DIM=VALUE[,VALUE...]")
+    parser.add_argument("--start", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--end", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--top", default=None, choices=CUBE_DIMENSIONS, help="rank this dimension instead")
+    parser.add_argument("-n", type=int, default=5)
+    options = parser.parse_args(argv)
+
+    where = {}
+    for item in options.where:
+        dim, _, values = item.partition("=")
+        where[dim] = values.split(",")
+
+    cube = SalesCube.load(options.cube)
+
+    if options.top:
+        for value, measures in cube.top(options.top, options.n, where=where,
+                                        start_date=options.start, end_date=options.end):
+            name = cube.product_names.get(value, "") if options.top == 'ProductID' else ""
+            print(f"{value} {name} | {measures['revenue']:,.2f} | {measures['quantity']} | {measures['transactions']}")
+        return
+
+    for key, measures in cube.query(options.by, options.grain, where, options.start, options.end).items():
+        print(f"{' | '.join(map(str, key))} | {measures['revenue']:,.2f} | {measures['quantity']} | "
+              f"{measures['transactions']}")
+
+
+if __name__ == "__main__":
+    main()
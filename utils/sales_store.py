@@ -0,0 +1,401 @@
+import os
+import sqlite3
+
+from utils.file_handler import iter_sales_data, complete_lines_end, expand_sales_files
+from utils.data_processor import (
+    REJECTION_REASONS,
+    iter_parse_and_validate,
+    new_validation_summary,
+    merge_validation_summaries,
+    finish_validation_summary,
+    _peak_day_view
+)
+from utils.incremental import file_fingerprint
+from utils.defaults import STORE_FILE
+
+
+BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    transaction_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    customer_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    amount REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_tid ON transactions(transaction_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+CREATE INDEX IF NOT EXISTS idx_transactions_region ON transactions(region, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_customer ON transactions(customer_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_product ON transactions(product_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_amount ON transactions(amount);
+CREATE TABLE IF NOT EXISTS load_stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS loaded_files (
+    source TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    head TEXT NOT NULL,
+    tail TEXT NOT NULL
+);
+"""
+
+# load_stats keys: the validation summary counts, and one per rejection reason
+STAT_KEYS = ('total_input', 'invalid', 'duplicates')
+
+COLUMNS = {
+    'TransactionID': 'transaction_id',
+    'Date': 'date',
+    'ProductID': 'product_id',
+    'ProductName': 'product_name',
+    'Quantity': 'quantity',
+    'UnitPrice': 'unit_price',
+    'CustomerID': 'customer_id',
+    'Region': 'region'
+}
+
+
+def _where(region=None, min_amount=None, max_amount=None, start_date=None, end_date=None):
+    """
+    Returns: (WHERE clause or "", parameters) for the pushed-down filters
+    """
+
+    clauses = []
+    params = []
+
+    if region:
+        clauses.append("region = ?")
+        params.append(region)
+    if min_amount is not None:
+        clauses.append("amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        clauses.append("amount <= ?")
+        params.append(max_amount)
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("date <= ?")
+        params.append(end_date)
+
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class SalesStore:
+    """
+    Indexed SQLite copy of the validated transactions
+    TransactionID is unique, so a row that is loaded again (a retransmission,
+    or the same file twice) is counted as a duplicate instead of being added
+    a second time; load_file also remembers how far it read each file and
+    only reads what was appended since
+    Every query method takes the same filters (region, min_amount,
+    max_amount, start_date, end_date) and runs them as SQL, so filtered
+    reports use the indexes instead of re-scanning the file
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- LOADING ----------
+
+    def load_transactions(self, transactions, batch_size=BATCH_SIZE):
+        """
+        Bulk-inserts already validated transactions, one SQL transaction per
+        batch; rows whose TransactionID is already stored are skipped
+        Returns: number of rows inserted
+        """
+
+        sql = ("INSERT OR IGNORE INTO transactions (transaction_id, date, product_id, product_name, "
+               "quantity, unit_price, customer_id, region, amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+        changes = self.conn.total_changes
+        batch = []
+
+        for t in transactions:
+            batch.append((
+                t['TransactionID'], t['Date'], t['ProductID'], t['ProductName'],
+                t['Quantity'], t['UnitPrice'], t['CustomerID'], t['Region'],
+                t['Quantity'] * t['UnitPrice']
+            ))
+            if len(batch) == batch_size:
+                with self.conn:
+                    self.conn.executemany(sql, batch)
+                batch = []
+
+        if batch:
+            with self.conn:
+                self.conn.executemany(sql, batch)
+
+        return self.conn.total_changes - changes
+
+    def load_lines(self, raw_lines, batch_size=BATCH_SIZE):
+        """
+        Parses and validates raw lines and stores the valid ones
+        Returns: validation summary (see finish_validation_summary); rows
+        already in the store are counted as duplicates, not in final_count
+        """
+
+        summary = new_validation_summary()
+        self._load(raw_lines, summary, batch_size)
+        return finish_validation_summary(summary)
+
+    def _load(self, raw_lines, summary, batch_size):
+        # Stores the valid lines and adds their counts to summary and to load_stats
+        part = new_validation_summary()
+        valid = iter_parse_and_validate(raw_lines, summary=part)
+        inserted = self.load_transactions(valid, batch_size)
+        part['duplicates'] += part['final_count'] - inserted
+        part['final_count'] = inserted
+
+        stats = [(key, part[key]) for key in STAT_KEYS]
+        stats += [('rejected_' + reason, count) for reason, count in part['rejected'].items()]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO load_stats (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                stats
+            )
+
+        merge_validation_summaries(summary, part)
+
+    def load_file(self, filename, batch_size=BATCH_SIZE):
+        """
+        Loads a sales file (or every shard of a directory or glob), reading
+        only the lines appended since it was last loaded; a file that was
+        truncated or rewritten is read again from the start, and the rows
+        already stored are then dropped as duplicates
+        Returns: validation summary of the lines read
+        """
+
+        summary = new_validation_summary()
+
+        for shard in expand_sales_files(filename):
+            source = os.path.abspath(shard)
+            start = self._resume_offset(source)
+            end = complete_lines_end(shard, start)
+            if end == start:
+                continue
+
+            self._load(iter_sales_data(shard, start, end), summary, batch_size)
+
+            fingerprint = file_fingerprint(shard, end)
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO loaded_files (source, offset, head, tail) VALUES (?, ?, ?, ?)",
+                    (source, end, fingerprint['head'], fingerprint['tail'])
+                )
+
+        return finish_validation_summary(summary)
+
+    def _resume_offset(self, source):
+        row = self.conn.execute(
+            "SELECT offset, head, tail FROM loaded_files WHERE source = ?", (source,)
+        ).fetchone()
+        if row is None:
+            return 0
+
+        offset, head, tail = row
+        if os.path.getsize(source) < offset or file_fingerprint(source, offset) != {'head': head, 'tail': tail}:
+            return 0
+        return offset
+
+    # ---------- PART 1 ----------
+
+    def query_transactions(self, **filters):
+        where, params = _where(**filters)
+        cursor = self.conn.execute(
+            "SELECT transaction_id, date, product_id, product_name, quantity, unit_price, "
+            "customer_id, region FROM transactions" + where + " ORDER BY id", params
+        )
+        fields = list(COLUMNS)
+        return [dict(zip(fields, row)) for row in cursor]
+
+    def count(self, **filters):
+        where, params = _where(**filters)
+        return self.conn.execute("SELECT COUNT(*) FROM transactions" + where, params).fetchone()[0]
+
+    def validate_and_filter(self, region=None, min_amount=None, max_amount=None):
+        """
+        Same return value as data_processor.validate_and_filter, with the
+        region and amount filters run as indexed SQL
+        """
+
+        stats = dict(self.conn.execute("SELECT key, value FROM load_stats"))
+        total_valid = self.count()
+        in_region = self.count(region=region)
+        valid = self.query_transactions(region=region, min_amount=min_amount, max_amount=max_amount)
+
+        summary = {
+            'total_input': stats.get('total_input', total_valid),
+            'invalid': stats.get('invalid', 0),
+            'filtered_by_region': total_valid - in_region,
+            'filtered_by_amount': in_region - len(valid),
+            'final_count': len(valid),
+            'rejected': {reason: stats.get('rejected_' + reason, 0) for reason in REJECTION_REASONS},
+            'duplicates': stats.get('duplicates', 0)
+        }
+
+        return valid, summary['invalid'], summary
+
+    # ---------- PART 2 ----------
+
+    def calculate_total_revenue(self, **filters):
+        where, params = _where(**filters)
+        return self.conn.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions" + where, params).fetchone()[0]
+
+    def region_wise_sales(self, **filters):
+        where, params = _where(**filters)
+        rows = self.conn.execute(
+            "SELECT region, SUM(amount), COUNT(*) FROM transactions" + where +
+            " GROUP BY region ORDER BY SUM(amount) DESC, MIN(id)", params
+        ).fetchall()
+        total = sum(r[1] for r in rows)
+
+        return {
+            r: {
+                'total_sales': sales,
+                'transaction_count': count,
+                'percentage': round((sales / total) * 100, 2) if total else 0.0
+            }
+            for r, sales, count in rows
+        }
+
+    def _product_rows(self, order, having="", extra=(), limit=None, **filters):
+        where, params = _where(**filters)
+        sql = ("SELECT product_name, SUM(quantity), SUM(amount) FROM transactions" + where +
+               " GROUP BY product_name" + having + " ORDER BY " + order)
+        params = params + list(extra)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self.conn.execute(sql, params)]
+
+    def top_selling_products(self, n=5, **filters):
+        return self._product_rows("SUM(quantity) DESC, MIN(id)", limit=n, **filters)
+
+    def low_performing_products(self, threshold=10, **filters):
+        return self._product_rows("SUM(quantity), MIN(id)", " HAVING SUM(quantity) < ?", (threshold,), **filters)
+
+    def customer_analysis(self, **filters):
+        where, params = _where(**filters)
+
+        bought = {}
+        for c, p in self.conn.execute(
+            "SELECT DISTINCT customer_id, product_name FROM transactions" + where, params
+        ):
+            bought.setdefault(c, []).append(p)
+
+        customers = {}
+        for c, spent, count in self.conn.execute(
+            "SELECT customer_id, SUM(amount), COUNT(*) FROM transactions" + where +
+            " GROUP BY customer_id ORDER BY SUM(amount) DESC, MIN(id)", params
+        ):
+            customers[c] = {
+                'total_spent': spent,
+                'purchase_count': count,
+                'products_bought': bought.get(c, []),
+                'avg_order_value': round(spent / count, 2)
+            }
+
+        return customers
+
+    def top_customers(self, n=5, **filters):
+        """
+        Returns: the n biggest spenders as [(customer, info)], ranked by SQL
+        with LIMIT instead of building every customer's entry
+        """
+
+        where, params = _where(**filters)
+        rows = self.conn.execute(
+            "SELECT customer_id, SUM(amount), COUNT(*) FROM transactions" + where +
+            " GROUP BY customer_id ORDER BY SUM(amount) DESC, MIN(id) LIMIT ?", params + [n]
+        ).fetchall()
+
+        products_sql = ("SELECT DISTINCT product_name FROM transactions" + where +
+                        (" AND " if where else " WHERE ") + "customer_id = ?")
+        return [
+            (c, {
+                'total_spent': spent,
+                'purchase_count': count,
+                'products_bought': [p for (p,) in self.conn.execute(products_sql, params + [c])],
+                'avg_order_value': round(spent / count, 2)
+            })
+            for c, spent, count in rows
+        ]
+
+    def daily_sales_trend(self, **filters):
+        where, params = _where(**filters)
+        return {
+            d: {'revenue': revenue, 'transaction_count': count, 'unique_customers': unique}
+            for d, revenue, count, unique in self.conn.execute(
+                "SELECT date, SUM(amount), COUNT(*), COUNT(DISTINCT customer_id) FROM transactions" +
+                where + " GROUP BY date ORDER BY date", params
+            )
+        }
+
+    def customer_reach(self, dimension='Region', **filters):
+        """
+        Returns: {value of dimension: unique customers}, largest reach first
+        """
+
+        column = COLUMNS[dimension]
+        where, params = _where(**filters)
+        return dict(self.conn.execute(
+            f"SELECT {column}, COUNT(DISTINCT customer_id) FROM transactions" + where +
+            f" GROUP BY {column} ORDER BY COUNT(DISTINCT customer_id) DESC, MIN(id)", params
+        ))
+
+    def find_peak_sales_day(self, **filters):
+        return _peak_day_view(self.daily_sales_trend(**filters))
+
+    def build_sales_snapshot(self, n=5, threshold=10, **filters):
+        """
+        Returns: the same snapshot data_processor.build_sales_snapshot
+        produces, for the filtered rows only
+        """
+
+        where, params = _where(**filters)
+        total, count, first_date, last_date = self.conn.execute(
+            "SELECT COALESCE(SUM(amount), 0), COUNT(*), MIN(date), MAX(date) FROM transactions" + where, params
+        ).fetchone()
+        daily_trend = self.daily_sales_trend(**filters)
+
+        return {
+            'total_revenue': total,
+            'transaction_count': count,
+            'avg_order_value': total / count if count else 0,
+            'date_range': (first_date, last_date),
+            'region_sales': self.region_wise_sales(**filters),
+            'product_totals': {p: {'qty': q, 'rev': r}
+                               for p, q, r in self._product_rows("MIN(id)", **filters)},
+            'top_products': self.top_selling_products(n, **filters),
+            'top_customers': self.top_customers(n, **filters),
+            'top_mode': 'exact',
+            'top_error': {'products': 0, 'customers': 0},
+            'customers': self.customer_analysis(**filters),
+            'daily_trend': daily_trend,
+            'peak_day': _peak_day_view(daily_trend),
+            'low_products': self.low_performing_products(threshold, **filters),
+            'region_reach': self.customer_reach('Region', **filters),
+            'product_reach': self.customer_reach('ProductName', **filters),
+            'distinct_mode': 'exact',
+            'distinct_error': 0
+        }
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+from utils.file_handler import expand_sales_files
+from utils.defaults import CACHE_DIR, CACHE_LIMIT
+
+
+# Bump when the shape of a cached stage result changes
+CACHE_VERSION = 1
+
+_DIGESTS_FILE = "digests.json"
+
+
+def stage_key(*parts):
+    """
+    Returns: hex key naming one stage result: a hash of the keys it was
+    computed from and its parameters (anything JSON can encode)
+    """
+
+    payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed store for pipeline stage results under `directory`
+    Values are pickled to <key>.pkl and output files copied to <key>.blob;
+    a key is built from content hashes of the inputs and the stage
+    parameters (stage_key), so a changed input or option just misses
+    Every hit refreshes the entry's mtime, and once the entries exceed
+    `limit` bytes the least recently used ones are deleted
+    File content hashes are remembered by (size, mtime, inode) in
+    digests.json, so unchanged files are not read again to be hashed
+    """
+
+    def __init__(self, directory=CACHE_DIR, limit=CACHE_LIMIT):
+        self.directory = directory
+        self.limit = limit
+        self.hits = []
+        self.misses = []
+        os.makedirs(directory, exist_ok=True)
+        self._digests = None
+        self.evict()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    # ---------- VALUES ----------
+
+    def load(self, key, stage=None):
+        """
+        Returns: the cached value, or None on a miss
+        """
+
+        path = self._path(key, ".pkl")
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses.append(stage or key)
+            return None
+
+        self._touch(path)
+        self.hits.append(stage or key)
+        return value
+
+    def store(self, key, value):
+        path = self._path(key, ".pkl")
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, path)
+        self.evict()
+
+    # ---------- FILES ----------
+
+    def restore_file(self, key, target, stage=None):
+        """
+        Puts the cached copy of an output file at target, leaving target
+        alone if it already has the same content
+        Returns: True on a hit
+        """
+
+        blob = self._path(key, ".blob")
+        if not os.path.exists(blob):
+            self.misses.append(stage or target)
+            return False
+
+        self._touch(blob)
+        self.hits.append(stage or target)
+        if self.file_digest(target) != self.file_digest(blob):
+            directory = os.path.dirname(target)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            shutil.copyfile(blob, target)
+        return True
+
+    def store_file(self, key, source):
+        blob = self._path(key, ".blob")
+        shutil.copyfile(source, blob + ".tmp")
+        os.replace(blob + ".tmp", blob)
+        self.evict()
+
+    # ---------- CONTENT HASHES ----------
+
+    def file_digest(self, filename):
+        """
+        Returns: BLAKE2b hex digest of the file's content, or None if it is missing
+        """
+
+        if self._digests is None:
+            self._digests = self._read_digests()
+
+        try:
+            st = os.stat(filename)
+        except FileNotFoundError:
+            return None
+
+        path = os.path.abspath(filename)
+        stamp = [st.st_size, st.st_mtime_ns, st.st_ino]
+        known = self._digests.get(path)
+        if known is not None and known[0] == stamp:
+            return known[1]
+
+        h = hashlib.blake2b(digest_size=16)
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+
+        self._digests[path] = [stamp, digest]
+        self._write_digests()
+        return digest
+
+    def input_digest(self, path):
+        """
+        Returns: one digest for a sales file or all of its shards (names and contents)
+        """
+
+        shards = expand_sales_files(path)
+        return stage_key("input", [(os.path.abspath(f), self.file_digest(f)) for f in shards])
+
+    def _touch(self, path):
+        # Marks an entry as recently used; its content did not change, so
+        # a remembered digest stays valid under the new mtime
+        os.utime(path)
+        known = self._digests.get(os.path.abspath(path)) if self._digests else None
+        if known is not None:
+            st = os.stat(path)
+            known[0] = [st.st_size, st.st_mtime_ns, st.st_ino]
+            self._write_digests()
+
+    def _read_digests(self):
+        try:
+            with open(os.path.join(self.directory, _DIGESTS_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_digests(self):
+        digests = {path: entry for path, entry in self._digests.items() if os.path.exists(path)}
+        self._digests = digests
+        tmp_file = os.path.join(self.directory, _DIGESTS_FILE + ".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(digests, f)
+        os.replace(tmp_file, os.path.join(self.directory, _DIGESTS_FILE))
+
+    # ---------- EVICTION ----------
+
+    def entries(self):
+        """
+        Returns: [(mtime, size, path)] of every cached result, oldest first
+        """
+
+        result = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith((".pkl", ".blob")):
+                    st = entry.stat()
+                    result.append((st.st_mtime_ns, st.st_size, entry.path))
+        result.sort()
+        return result
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits in limit
+        Returns: number of entries deleted
+        """
+
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+
+        for _, size, path in entries:
+            if total <= self.limit:
+                break
+            os.remove(path)
+            total -= size
+            deleted += 1
+
+        return deleted
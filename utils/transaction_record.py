@@ -0,0 +1,137 @@
+import sys
+from collections.abc import Mapping
+
+
+TRANSACTION_FIELDS = (
+    'TransactionID', 'Date', 'ProductID', 'ProductName',
+    'Quantity', 'UnitPrice', 'CustomerID', 'Region'
+)
+
+_FIELD_SET = frozenset(TRANSACTION_FIELDS) | {'Amount'}
+
+intern = sys.intern
+
+
+class Transaction:
+    """
+    Compact record for one parsed sales line
+    Fields live in __slots__ instead of a per-row dict, Amount
+    (Quantity * UnitPrice) is computed once, and the parsers intern the
+    repeating strings (Date, ProductID, ProductName, CustomerID, Region) so
+    every row shares one copy of each. About a third of the memory of the
+    8-key dict it replaces, which it still behaves like: t['Region'],
+    t.get(...), keys(), items(), `in`, iteration and == against a dict.
+    Hot loops read attributes (t.Region) directly
+    """
+
+    __slots__ = TRANSACTION_FIELDS + ('Amount',)
+
+    def __init__(self, tid, date, pid, pname, qty, price, cid, region):
+        self.TransactionID = tid
+        self.Date = date
+        self.ProductID = pid
+        self.ProductName = pname
+        self.Quantity = qty
+        self.UnitPrice = price
+        self.CustomerID = cid
+        self.Region = region
+        self.Amount = qty * price
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Returns: a record from the eight field values in TRANSACTION_FIELDS
+        order; Amount is None when Quantity or UnitPrice is missing
+        """
+
+        record = cls.__new__(cls)
+        for name, value in zip(TRANSACTION_FIELDS, values):
+            setattr(record, name, value)
+        q, price = record.Quantity, record.UnitPrice
+        record.Amount = q * price if q is not None and price is not None else None
+        return record
+
+    @classmethod
+    def from_mapping(cls, t):
+        return cls.from_values(map(t.get, TRANSACTION_FIELDS))
+
+    # ---------- DICT-STYLE ACCESS ----------
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+        if key == 'Quantity' or key == 'UnitPrice':
+            self.Amount = self.Quantity * self.UnitPrice
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def __iter__(self):
+        return iter(TRANSACTION_FIELDS)
+
+    def __len__(self):
+        return len(TRANSACTION_FIELDS)
+
+    def keys(self):
+        return list(TRANSACTION_FIELDS)
+
+    def values(self):
+        return [getattr(self, name) for name in TRANSACTION_FIELDS]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in TRANSACTION_FIELDS]
+
+    def copy(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Transaction):
+            return self.values() == other.values()
+        if isinstance(other, Mapping):
+            return self.copy() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Transaction({self.copy()!r})"
+
+    def __reduce__(self):
+        # Pickles (e.g. to and from worker processes) as the eight field values
+        return (Transaction.from_values, (tuple(self.values()),))
+
+
+Mapping.register(Transaction)
+
+
+def transactions_to_columns(transactions):
+    """
+    Returns: one list per field in TRANSACTION_FIELDS order, a compact
+    shape to pickle (repeated strings are stored once)
+    """
+
+    if not transactions:
+        return [[] for _ in TRANSACTION_FIELDS]
+    return [list(column) for column in zip(*(t.values() for t in transactions))]
+
+
+def transactions_from_columns(columns):
+    return list(map(Transaction, *columns))
+
+
+def as_transaction(t):
+    """
+    Returns: t itself if it is already a Transaction, else a Transaction
+    built from a dict-like row
+    """
+
+    return t if t.__class__ is Transaction else Transaction.from_mapping(t)
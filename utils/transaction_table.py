@@ -0,0 +1,338 @@
+import numpy as np
+
+from utils.data_processor import iter_transactions, _peak_day_view, REJECTION_REASONS
+
+
+DIMENSIONS = ['Date', 'ProductID', 'ProductName', 'CustomerID', 'Region']
+
+
+def _encode(values):
+    """
+    Dictionary-encodes a column in order of first appearance, so ties in
+    the vectorized group-bys break the same way the dict-based functions do
+    Returns: (int32 code array, list of distinct values)
+    """
+
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(v, len(index)) for v in values),
+        dtype=np.int32,
+        count=len(values)
+    )
+    return codes, list(index)
+
+
+class TransactionTable:
+    """
+    Columnar store for validated transactions
+    Quantity/UnitPrice/amount are NumPy arrays; Date, ProductID, ProductName,
+    CustomerID and Region are integer codes into per-column dictionaries
+    Iterating yields the usual transaction dicts, so the table can be passed
+    anywhere a list of transactions is expected
+    """
+
+    def __init__(self, transaction_ids, quantity, unit_price, codes, values):
+        self.transaction_ids = transaction_ids
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.amount = quantity * unit_price
+        self.codes = codes
+        self.values = values
+
+    # ---------- CONSTRUCTION ----------
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        transactions = list(transactions)
+        codes = {}
+        values = {}
+
+        for dim in DIMENSIONS:
+            codes[dim], values[dim] = _encode([t[dim] for t in transactions])
+
+        return cls(
+            np.array([t['TransactionID'] for t in transactions], dtype=str),
+            np.array([t['Quantity'] for t in transactions], dtype=np.int64),
+            np.array([t['UnitPrice'] for t in transactions], dtype=np.float64),
+            codes,
+            values
+        )
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Builds a table from {field: list of values}, e.g. load_enriched_columns
+        """
+
+        codes = {}
+        values = {}
+
+        for dim in DIMENSIONS:
+            codes[dim], values[dim] = _encode(columns[dim])
+
+        return cls(
+            np.array(columns['TransactionID'], dtype=str),
+            np.array(columns['Quantity'], dtype=np.int64),
+            np.array(columns['UnitPrice'], dtype=np.float64),
+            codes,
+            values
+        )
+
+    @classmethod
+    def from_lines(cls, raw_lines):
+        return cls.from_transactions(iter_transactions(raw_lines))
+
+    def take(self, mask):
+        """
+        Returns: a new table with the rows selected by a boolean mask or index array
+        (dictionaries are shared, codes are not re-numbered)
+        """
+
+        return TransactionTable(
+            self.transaction_ids[mask],
+            self.quantity[mask],
+            self.unit_price[mask],
+            {dim: c[mask] for dim, c in self.codes.items()},
+            self.values
+        )
+
+    # ---------- COMPATIBILITY LAYER ----------
+
+    def __len__(self):
+        return len(self.quantity)
+
+    def row(self, i):
+        t = {
+            'TransactionID': str(self.transaction_ids[i]),
+            'Date': None,
+            'ProductID': None,
+            'ProductName': None,
+            'Quantity': int(self.quantity[i]),
+            'UnitPrice': float(self.unit_price[i]),
+            'CustomerID': None,
+            'Region': None
+        }
+        for dim in DIMENSIONS:
+            t[dim] = self.values[dim][self.codes[dim][i]]
+        return t
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_transactions(self):
+        return list(self)
+
+    # ---------- VECTORIZED HELPERS ----------
+
+    def _group_sum(self, dim, weights):
+        return np.bincount(self.codes[dim], weights=weights, minlength=len(self.values[dim]))
+
+    def _group_count(self, dim):
+        return np.bincount(self.codes[dim], minlength=len(self.values[dim]))
+
+    def _distinct_pairs(self, outer, inner):
+        """
+        Returns: (outer codes, inner codes) of every distinct (outer, inner) pair
+        """
+
+        width = len(self.values[inner])
+        pairs = np.unique(self.codes[outer].astype(np.int64) * width + self.codes[inner])
+        return pairs // width, pairs % width
+
+    def _dimension_mask(self, dim, predicate):
+        """
+        Evaluates predicate once per distinct value and broadcasts it to rows
+        """
+
+        ok = np.array([bool(predicate(v)) for v in self.values[dim]], dtype=bool)
+        return ok[self.codes[dim]] if len(ok) else np.zeros(len(self), dtype=bool)
+
+    # ---------- PART 1 ----------
+
+    def validate_and_filter(self, region=None, min_amount=None, max_amount=None):
+        # Each row is rejected for the first check it fails, in the order
+        # iter_valid_transactions applies them
+        rejected = dict.fromkeys(REJECTION_REASONS, 0)
+        pending = np.ones(len(self), dtype=bool)
+        for reason, ok in (
+            ('non_positive', (self.quantity > 0) & (self.unit_price > 0)),
+            ('bad_prefix', np.char.startswith(self.transaction_ids, 'T') &
+                self._dimension_mask('ProductID', lambda v: v.startswith('P')) &
+                self._dimension_mask('CustomerID', lambda v: v.startswith('C'))),
+            ('missing_region', self._dimension_mask('Region', bool))
+        ):
+            rejected[reason] = int(np.count_nonzero(pending & ~ok))
+            pending &= ok
+
+        valid = self.take(pending)
+        invalid = len(self) - len(valid)
+
+        present = np.unique(valid.codes['Region'])
+        print("Available regions:", set(self.values['Region'][c] for c in present))
+        if len(valid):
+            print("Transaction amount range:", float(valid.amount.min()), "-", float(valid.amount.max()))
+
+        total_valid = len(valid)
+
+        if region:
+            valid = valid.take(valid.codes['Region'] == _code_of(valid.values['Region'], region))
+
+        filtered_by_region = total_valid - len(valid)
+
+        keep = np.ones(len(valid), dtype=bool)
+        if min_amount is not None:
+            keep &= valid.amount >= min_amount
+        if max_amount is not None:
+            keep &= valid.amount <= max_amount
+        valid = valid.take(keep)
+
+        filtered_by_amount = total_valid - filtered_by_region - len(valid)
+
+        summary = {
+            'total_input': len(self),
+            'invalid': invalid,
+            'filtered_by_region': filtered_by_region,
+            'filtered_by_amount': filtered_by_amount,
+            'final_count': len(valid),
+            'rejected': rejected,
+            'duplicates': 0
+        }
+
+        return valid, invalid, summary
+
+    # ---------- PART 2 ----------
+
+    def calculate_total_revenue(self):
+        return float(self.amount.sum())
+
+    def region_wise_sales(self):
+        sales = self._group_sum('Region', self.amount)
+        counts = self._group_count('Region')
+        total = sales.sum()
+
+        order = np.argsort(-sales, kind='stable')
+        regions = {}
+        for c in order.tolist():
+            if counts[c] == 0:
+                continue
+            regions[self.values['Region'][c]] = {
+                'total_sales': float(sales[c]),
+                'transaction_count': int(counts[c]),
+                'percentage': round(float(sales[c] / total) * 100, 2) if total else 0.0
+            }
+        return regions
+
+    def _product_totals(self):
+        qty = self._group_sum('ProductName', self.quantity).astype(np.int64)
+        rev = self._group_sum('ProductName', self.amount)
+        present = self._group_count('ProductName') > 0
+        return qty, rev, present
+
+    def top_selling_products(self, n=5):
+        qty, rev, present = self._product_totals()
+        order = np.argsort(-qty, kind='stable')
+        names = self.values['ProductName']
+        return [(names[c], int(qty[c]), float(rev[c])) for c in order.tolist() if present[c]][:n]
+
+    def low_performing_products(self, threshold=10):
+        qty, rev, present = self._product_totals()
+        order = np.argsort(qty, kind='stable')
+        names = self.values['ProductName']
+        return [(names[c], int(qty[c]), float(rev[c])) for c in order.tolist()
+                if present[c] and qty[c] < threshold]
+
+    def customer_analysis(self):
+        spent = self._group_sum('CustomerID', self.amount)
+        counts = self._group_count('CustomerID')
+
+        bought = [[] for _ in self.values['CustomerID']]
+        names = self.values['ProductName']
+        for c, p in zip(*(a.tolist() for a in self._distinct_pairs('CustomerID', 'ProductName'))):
+            bought[c].append(names[p])
+
+        order = np.argsort(-spent, kind='stable')
+        customers = {}
+        for c in order.tolist():
+            if counts[c] == 0:
+                continue
+            customers[self.values['CustomerID'][c]] = {
+                'total_spent': float(spent[c]),
+                'purchase_count': int(counts[c]),
+                'products_bought': bought[c],
+                'avg_order_value': round(float(spent[c] / counts[c]), 2)
+            }
+        return customers
+
+    def daily_sales_trend(self):
+        revenue = self._group_sum('Date', self.amount)
+        counts = self._group_count('Date')
+        day_codes, _ = self._distinct_pairs('Date', 'CustomerID')
+        unique = np.bincount(day_codes, minlength=len(self.values['Date']))
+
+        dates = self.values['Date']
+        daily = {}
+        for c in sorted((c for c in range(len(dates)) if counts[c]), key=dates.__getitem__):
+            daily[dates[c]] = {
+                'revenue': float(revenue[c]),
+                'transaction_count': int(counts[c]),
+                'unique_customers': int(unique[c])
+            }
+        return daily
+
+    def customer_reach(self, dimension='Region'):
+        dim_codes, _ = self._distinct_pairs(dimension, 'CustomerID')
+        reach = np.bincount(dim_codes, minlength=len(self.values[dimension]))
+        present = self._group_count(dimension) > 0
+
+        order = np.argsort(-reach, kind='stable')
+        values = self.values[dimension]
+        return {values[c]: int(reach[c]) for c in order.tolist() if present[c]}
+
+    def find_peak_sales_day(self):
+        return _peak_day_view(self.daily_sales_trend())
+
+    def build_sales_snapshot(self, n=5, threshold=10):
+        """
+        Returns: the same snapshot data_processor.build_sales_snapshot produces
+        """
+
+        qty, rev, present = self._product_totals()
+        names = self.values['ProductName']
+        daily_trend = self.daily_sales_trend()
+        dates = list(daily_trend)
+        total = self.calculate_total_revenue()
+        count = len(self)
+        customers = self.customer_analysis()
+
+        return {
+            'total_revenue': total,
+            'transaction_count': count,
+            'avg_order_value': total / count if count else 0,
+            'date_range': (dates[0], dates[-1]) if dates else (None, None),
+            'region_sales': self.region_wise_sales(),
+            'product_totals': {names[c]: {'qty': int(qty[c]), 'rev': float(rev[c])}
+                               for c in range(len(names)) if present[c]},
+            'top_products': self.top_selling_products(n),
+            'top_customers': list(customers.items())[:n],
+            'top_mode': 'exact',
+            'top_error': {'products': 0, 'customers': 0},
+            'customers': customers,
+            'daily_trend': daily_trend,
+            'peak_day': _peak_day_view(daily_trend),
+            'low_products': self.low_performing_products(threshold),
+            'region_reach': self.customer_reach('Region'),
+            'product_reach': self.customer_reach('ProductName'),
+            'distinct_mode': 'exact',
+            'distinct_error': 0
+        }
+
+
+def _code_of(values, value):
+    try:
+        return values.index(value)
+    except ValueError:
+        return -1